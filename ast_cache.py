@@ -0,0 +1,236 @@
+import hashlib
+import marshal
+import os
+import sys
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from classes import Environment, Statement, BlockStatement, IfStatement, WhileStatement, PrintStatement, \
+    ExpressionStatement, FunctionStatement, ReturnStatement, VariableStatement, ArrayExpr, ArrayIndexExpr, AssignExpr, \
+    CallExpr, LogicExpr, BinaryExpr, UnaryExpr, LiteralExpr, IdentifierExpr, GroupingExpr, BreakStatement, \
+    ContinueStatement
+from lexer import Lexer, Token, TokenType
+from parser import Parser
+from statements import StatementParser
+
+INTERPRETER_VERSION = "0.1.0"
+# has to be increased whenever the encoding of the tree changes, e.g. when a node gets a new field
+CACHE_FORMAT_VERSION = 1
+CACHE_MAGIC = b"TIAST"
+CACHE_DIR_NAME = "__ticache__"
+
+# the constructor arguments of every node, in order. The global environment of a function is not stored, it is the
+# environment of the statement parser which loads the cache.
+NODE_FIELDS: Dict[Type, Tuple[str, ...]] = {
+    BlockStatement: ("block",),
+    IfStatement: ("cond", "if_branch", "else_branch", "elif_branches"),
+    WhileStatement: ("cond", "while_body"),
+    BreakStatement: (),
+    ContinueStatement: (),
+    PrintStatement: ("expr",),
+    ExpressionStatement: ("expr",),
+    FunctionStatement: ("name", "parameters", "body"),
+    ReturnStatement: ("expr",),
+    VariableStatement: ("var_type", "name", "expr"),
+    ArrayExpr: ("expressions",),
+    ArrayIndexExpr: ("identifier", "index_expr"),
+    AssignExpr: ("name", "value"),
+    CallExpr: ("callee_name", "paranthesis", "arguments"),
+    LogicExpr: ("expr", "logic_operator", "right"),
+    BinaryExpr: ("expr", "operator", "right"),
+    UnaryExpr: ("operator", "right"),
+    LiteralExpr: ("literal",),
+    IdentifierExpr: ("identifier",),
+    GroupingExpr: ("expr",),
+}
+NODE_CLASSES: Dict[str, Type] = {node_class.__name__: node_class for node_class in NODE_FIELDS}
+
+# tags of the encoded values, plain values (int, float, str, bool, None) are stored as they are
+_NODE = "N"
+_TOKEN_TYPE = "T"
+_TOKEN = "K"
+_LIST = "L"
+_TUPLE = "U"
+
+
+class CacheError(Exception):
+    """Raised if a cache file is corrupt or the tree cannot be encoded"""
+
+
+def cache_key(source: str) -> str:
+    """
+    The key of a program: the hash of its code, the interpreter version and the cache format version. The python
+    version is part of it as well, because the marshal format may change between python versions.
+    """
+    key = hashlib.sha256()
+    key.update(f"{INTERPRETER_VERSION}:{CACHE_FORMAT_VERSION}:{sys.version_info[0]}.{sys.version_info[1]}:".encode())
+    key.update(source.encode())
+    return key.hexdigest()
+
+
+def encode(value: Any) -> Any:
+    if isinstance(value, (bool, int, float, str)) or value is None:
+        return value
+    if isinstance(value, TokenType):
+        return _TOKEN_TYPE, value.name
+    if isinstance(value, Token):
+        return _TOKEN, value.type.name, value.value
+    if isinstance(value, list):
+        return (_LIST,) + tuple(encode(item) for item in value)
+    if isinstance(value, tuple):
+        return (_TUPLE,) + tuple(encode(item) for item in value)
+    fields = NODE_FIELDS.get(type(value))
+    if fields is None:
+        raise CacheError(f"Cannot encode {value}")
+    return (_NODE, type(value).__name__) + tuple(encode(getattr(value, field)) for field in fields)
+
+
+def decode(value: Any, environment: Environment) -> Any:
+    """
+    Rebuilds the tree of encode. Functions are declared in the environment, like the statement parser does it.
+    """
+    if not isinstance(value, tuple):
+        return value
+    tag = value[0]
+    if tag == _NODE:
+        node_class = NODE_CLASSES[value[1]]
+        fields = [decode(field, environment) for field in value[2:]]
+        if node_class is FunctionStatement:
+            function = FunctionStatement(*fields, global_env=environment)
+            environment.declare_variable(function.name, function, TokenType.FUN)
+            return function
+        return node_class(*fields)
+    if tag == _TOKEN_TYPE:
+        return TokenType[value[1]]
+    if tag == _TOKEN:
+        return Token(TokenType[value[1]], value[2])
+    if tag == _LIST:
+        return [decode(item, environment) for item in value[1:]]
+    if tag == _TUPLE:
+        return tuple(decode(item, environment) for item in value[1:])
+    raise CacheError(f"Unknown tag {tag}")
+
+
+class FileCache:
+    """
+    Caches marshallable data of programs. Every program has one cache file in the cache directory, which is
+    __ticache__ next to the program if no directory is given. The file starts with CACHE_MAGIC, followed by the
+    marshalled key of the program and the data. A file with another key is stale and gets replaced.
+    """
+    # the name in the statistics and the file suffix
+    name = "cache"
+    suffix = ".tic"
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.corrupt = 0
+        self.writes = 0
+
+    def __repr__(self):
+        return f"{type(self).__name__}(cache_dir={self.cache_dir})"
+
+    @property
+    def statistics(self) -> str:
+        return f"{self.name}: {self.hits} hits, {self.misses} misses ({self.stale} stale, {self.corrupt} corrupt), " \
+               f"{self.writes} writes"
+
+    def path_for(self, source_path: str) -> str:
+        source_path = os.path.abspath(source_path)
+        cache_dir = self.cache_dir or os.path.join(os.path.dirname(source_path), CACHE_DIR_NAME)
+        return os.path.join(cache_dir, os.path.basename(source_path) + self.suffix)
+
+    def key(self, source: str) -> str:
+        return cache_key(source)
+
+    def read(self, source_path: str, source: str) -> Any:
+        """
+        :return: the cached data of the program, None if there is none or it is stale or corrupt
+        """
+        try:
+            with open(self.path_for(source_path), "rb") as f:
+                data = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        try:
+            if not data.startswith(CACHE_MAGIC):
+                raise CacheError("Not a cache file")
+            key, value = marshal.loads(data[len(CACHE_MAGIC):])
+        except Exception:
+            self.misses += 1
+            self.corrupt += 1
+            return None
+        if key != self.key(source):
+            self.misses += 1
+            self.stale += 1
+            return None
+        return value
+
+    def write(self, source_path: str, source: str, value: Any):
+        try:
+            data = CACHE_MAGIC + marshal.dumps((self.key(source), value))
+        except ValueError:
+            return
+        path = self.path_for(source_path)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary_path = f"{path}.{os.getpid()}.tmp"
+            with open(temporary_path, "wb") as f:
+                f.write(data)
+            os.replace(temporary_path, path)
+        except OSError:
+            return
+        self.writes += 1
+
+
+class AstCache(FileCache):
+    """
+    Caches the parsed statements of programs, encoded as tagged tuples.
+    """
+    name = "ast cache"
+
+    def load(self, source_path: str, source: str, environment: Environment) -> Optional[List[Statement]]:
+        """
+        :return: the cached statements of the program, None if there are none or they are stale or corrupt
+        """
+        tree = self.read(source_path, source)
+        if tree is None:
+            return None
+        try:
+            statements = decode(tree, environment)
+        except Exception:
+            self.misses += 1
+            self.corrupt += 1
+            return None
+        self.hits += 1
+        return statements
+
+    def store(self, source_path: str, source: str, statements: List[Statement]):
+        try:
+            tree = encode(statements)
+        except CacheError:
+            # e.g. a tree with an unknown node, it is parsed again next time
+            return
+        self.write(source_path, source, tree)
+
+
+def parse_program(source: str, source_path: str, parser_class: Type[Parser] = Parser,
+                  cache: Optional[AstCache] = None) -> StatementParser:
+    """
+    Parses the program, or loads its statements from the cache if it has an entry for this exact code.
+    """
+    if cache is not None:
+        statement_parser = StatementParser([], parser_class=parser_class)
+        statements = cache.load(source_path, source, statement_parser.environment)
+        if statements is not None:
+            statement_parser.load_statements(statements)
+            return statement_parser
+    lexer = Lexer(source)
+    lexer.run_lexer()
+    statement_parser = StatementParser(lexer.get_token_objects(), parser_class=parser_class)
+    statement_parser.parse()
+    if cache is not None:
+        cache.store(source_path, source, statement_parser.statements)
+    return statement_parser
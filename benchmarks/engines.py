@@ -0,0 +1,69 @@
+"""
+Compares the execution time of the engines of main.py on loop heavy programs.
+
+Usage: python benchmarks/engines.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from main import ENGINES, get_tokens
+from statements import StatementParser
+
+PROGRAMS = {
+    "loop": """
+fun work(int n) {
+    int total = 0;
+    int i = 0;
+    while (i < n) {
+        int j = i * 2;
+        if (j > 100) {
+            total = total + j;
+        } else {
+            total = total - 1;
+        }
+        i = i + 1;
+    }
+    return total;
+}
+int result = work(200000);
+""",
+    "global loop": """
+int total = 0;
+int i = 0;
+while (i < 100000) {
+    if (mod(i, 3) == 0) {
+        total = total + i;
+    }
+    i = i + 1;
+}
+""",
+    "recursion": """
+fun fib(int n) {
+    if (n < 2) {
+        return n;
+    }
+    return fib(n - 1) + fib(n - 2);
+}
+int result = fib(20);
+""",
+}
+
+
+def time_engine(program: str, engine: str) -> float:
+    statement_parser = StatementParser(get_tokens(program))
+    statement_parser.parse()
+    start = time.perf_counter()
+    ENGINES[engine](statement_parser.environment).interpret(statement_parser.statements)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    for name, program in PROGRAMS.items():
+        baseline = None
+        for engine in ENGINES:
+            seconds = time_engine(program, engine)
+            baseline = baseline or seconds
+            print(f"{name:<12} {engine:<8} {seconds:.3f}s  ({baseline / seconds:.1f}x)")
@@ -0,0 +1,31 @@
+"""
+Measures how the parse time of StatementParser grows with the number of statements, it should grow linearly.
+
+Usage: python benchmarks/parse_scaling.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lexer import Lexer
+from statements import StatementParser
+
+STATEMENT = "int a{} = (1 + 2) * 3 - pow(2, 4);\n"
+
+
+def time_parse(statements: int) -> float:
+    tokens = list(Lexer("".join(STATEMENT.format(i) for i in range(statements))).iter_tokens())
+    start = time.perf_counter()
+    StatementParser(tokens).parse()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    previous = None
+    for statements in [1_000, 10_000, 100_000]:
+        seconds = time_parse(statements)
+        growth = "" if previous is None else f"  ({seconds / previous:.1f}x for 10x the statements)"
+        print(f"{statements:>7} statements: {seconds:.3f}s{growth}")
+        previous = seconds
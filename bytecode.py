@@ -0,0 +1,375 @@
+import operator
+from typing import Any, Dict, List, Optional, Tuple
+
+from classes import Statement, Expr, StaticType, BlockStatement, IfStatement, WhileStatement, PrintStatement, \
+    ExpressionStatement, FunctionStatement, ReturnStatement, VariableStatement, ArrayExpr, ArrayIndexExpr, AssignExpr, \
+    CallExpr, LogicExpr, BinaryExpr, UnaryExpr, LiteralExpr, IdentifierExpr, GroupingExpr, BreakStatement, \
+    ContinueStatement
+from errors import ParserError
+from lexer import TokenType
+
+# every instruction is an opcode followed by one argument, the argument is 0 if the opcode does not need one
+LOAD_CONST = 0  # push constants[arg]
+LOAD_LOCAL = 1  # push the local in slot arg
+LOAD_GLOBAL = 2  # push the global named constants[arg]
+DECLARE_LOCAL = 3  # pop a value and declare it in the local slot, constants[arg] is (slot, name, static type)
+DECLARE_GLOBAL = 4  # pop a value and declare it as global, constants[arg] is (name, var type)
+ASSIGN_LOCAL = 5  # assign the top of the stack to a local, constants[arg] is (slot, static type)
+ASSIGN_GLOBAL = 6  # assign the top of the stack to the global named constants[arg]
+BINARY = 7  # pop the right and the left operand, push BINARY_OPERATORS[arg](left, right)
+NEGATE = 8
+NOT = 9
+INDEX = 10  # pop the list and the index and push the element, constants[arg] is the name of the list
+BUILD_LIST = 11  # pop arg values and push them as list
+CALL = 12  # pop arg arguments and the function, push the result of the call
+POP = 13
+PRINT = 14
+JUMP = 15  # continue at the instruction arg
+POP_JUMP_IF_FALSE = 16  # pop a value and jump if it is falsy
+POP_JUMP_IF_NOT_TRUE = 17  # pop a boolean and jump if it is false, other values are errors
+JUMP_IF_FALSE_OR_POP = 18  # the left operand of &&: jump if it is false, else pop it
+JUMP_IF_TRUE_OR_POP = 19  # the left operand of ||: jump if it is true, else pop it
+RETURN = 20  # return the top of the stack from the function
+RETURN_FROM_SCRIPT = 21  # a return outside of a function, raises a ReturnError like the tree walker
+RAISE = 22  # raise the exception constants[arg]
+BINARY_CONST = 23  # pop the left operand, constants[arg] is the operator function and the constant right operand
+STORE_LOCAL = 24  # ASSIGN_LOCAL followed by POP, for assignments which are statements
+TAIL_CALL = 25  # CALL followed by RETURN, a called function replaces the code and the locals of the running one
+
+OPCODE_NAMES = {value: name for name, value in list(globals().items()) if name.isupper() and isinstance(value, int)}
+
+BINARY_OPERATORS = [
+    operator.add,
+    operator.sub,
+    operator.mul,
+    operator.truediv,
+    operator.gt,
+    operator.ge,
+    operator.lt,
+    operator.le,
+    operator.eq,
+    operator.ne,
+    lambda left, right: left and right,
+    lambda left, right: left or right,
+]
+BINARY_OPERATOR_INDICES = {
+    TokenType.PLUS: 0,
+    TokenType.MINUS: 1,
+    TokenType.MUL: 2,
+    TokenType.DIV: 3,
+    TokenType.GREATER: 4,
+    TokenType.GREATER_EQUALS: 5,
+    TokenType.LESSER: 6,
+    TokenType.LESSER_EQUALS: 7,
+    TokenType.EQUALS: 8,
+    TokenType.NOT_EQUALS: 9,
+    TokenType.AND: 10,
+    TokenType.OR: 11,
+}
+
+
+class Code:
+    """
+    The bytecode of a function or of the top level statements. The instructions are a list of (opcode, argument)
+    pairs, jumps go to the index of an instruction in this list.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.instructions: List[Tuple[int, int]] = []
+        self.constants: List[Any] = []
+        self.constant_indices: Dict[Any, int] = {}
+        # the number of local slots, the slots of blocks which are not nested reuse the same slots
+        self.local_count = 0
+
+    def __repr__(self):
+        return f"Code(name={self.name}, instructions={len(self.instructions)}, constants={len(self.constants)})"
+
+    def add_constant(self, value: Any) -> int:
+        shared = value is None or type(value) in (bool, int, float, str)
+        if shared:
+            # the type is part of the key, 1 and True are different constants
+            index = self.constant_indices.get((type(value), value))
+            if index is not None:
+                return index
+        index = len(self.constants)
+        self.constants.append(value)
+        if shared:
+            self.constant_indices[(type(value), value)] = index
+        return index
+
+    def emit(self, opcode: int, argument: int = 0) -> int:
+        """
+        :return: the index of the instruction
+        """
+        self.instructions.append((opcode, argument))
+        return len(self.instructions) - 1
+
+    def patch_jump(self, instruction: int, target: Optional[int] = None):
+        """
+        Lets the jump at instruction continue at target, the next emitted instruction if no target is given
+        """
+        opcode, _ = self.instructions[instruction]
+        self.instructions[instruction] = (opcode, len(self.instructions) if target is None else target)
+
+    def disassemble(self) -> str:
+        lines = [f"{self.name}:"]
+        for index, (opcode, argument) in enumerate(self.instructions):
+            detail = ""
+            if opcode in (LOAD_CONST, LOAD_GLOBAL, DECLARE_LOCAL, DECLARE_GLOBAL, ASSIGN_LOCAL, ASSIGN_GLOBAL, INDEX,
+                          RAISE, BINARY_CONST, STORE_LOCAL):
+                detail = f" ({self.constants[argument]!r})"
+            lines.append(f"{index:>6} {OPCODE_NAMES[opcode]:<22}{argument}{detail}")
+        return "\n".join(lines)
+
+
+class Compiler:
+    """
+    Compiles the resolved statements of StatementParser into Code. Local variables keep the slots of the resolver,
+    offset by the first slot of their block, so a function needs only one list of locals.
+    """
+
+    def __init__(self):
+        self.code: Optional[Code] = None
+        self.in_function = False
+        # the first slot of every enclosing block (or function), the innermost one is the last
+        self.scope_bases: List[int] = []
+        self.next_slot = 0
+        # the first instruction and the break jumps of every enclosing loop, the innermost one is the last
+        self.loops: List[Tuple[int, List[int]]] = []
+
+    def compile_script(self, statements: List[Statement]) -> Code:
+        self.start(Code("<script>"), in_function=False, slot_count=0)
+        for statement in statements:
+            self.compile_statement(statement)
+        self.code.emit(LOAD_CONST, self.code.add_constant(None))
+        self.code.emit(RETURN)
+        return self.code
+
+    def compile_expression(self, expr: Expr) -> Code:
+        self.start(Code("<expression>"), in_function=False, slot_count=0)
+        self.compile_expr(expr)
+        self.code.emit(RETURN)
+        return self.code
+
+    def compile_function(self, function: FunctionStatement) -> Code:
+        self.start(Code(function.name), in_function=True, slot_count=function.frame_size)
+        self.scope_bases.append(0)
+        for statement in function.body.block:
+            self.compile_statement(statement)
+        self.code.emit(LOAD_CONST, self.code.add_constant(None))
+        self.code.emit(RETURN)
+        return self.code
+
+    def start(self, code: Code, in_function: bool, slot_count: int):
+        self.code = code
+        self.in_function = in_function
+        self.scope_bases = []
+        self.next_slot = slot_count
+        self.loops = []
+        code.local_count = slot_count
+
+    def local_slot(self, depth: int, slot: int) -> int:
+        return self.scope_bases[-1 - depth] + slot
+
+    def compile_statement(self, statement: Statement):
+        if statement is None:
+            self.emit_error(ParserError("Structs are not supported yet."))
+            return
+        _STATEMENT_COMPILERS[type(statement)](self, statement)
+
+    def compile_expr(self, expr: Expr):
+        _EXPR_COMPILERS[type(expr)](self, expr)
+
+    def emit_error(self, error: Exception):
+        self.code.emit(RAISE, self.code.add_constant(error))
+
+    def compile_block(self, block: BlockStatement):
+        self.scope_bases.append(self.next_slot)
+        self.next_slot += block.slot_count
+        self.code.local_count = max(self.code.local_count, self.next_slot)
+        for statement in block.block:
+            self.compile_statement(statement)
+        self.next_slot = self.scope_bases.pop()
+
+    def compile_if(self, statement: IfStatement):
+        end_jumps = []
+        branches = [(statement.cond, statement.if_branch)] + list(statement.elif_branches)
+        for condition, branch in branches:
+            self.compile_expr(condition)
+            next_branch_jump = self.code.emit(POP_JUMP_IF_FALSE)
+            self.compile_block(branch)
+            end_jumps.append(self.code.emit(JUMP))
+            self.code.patch_jump(next_branch_jump)
+        if statement.else_branch is not None:
+            self.compile_block(statement.else_branch)
+        for end_jump in end_jumps:
+            self.code.patch_jump(end_jump)
+
+    def compile_while(self, statement: WhileStatement):
+        loop_start = len(self.code.instructions)
+        self.compile_expr(statement.cond)
+        exit_jump = self.code.emit(POP_JUMP_IF_NOT_TRUE)
+        break_jumps = []
+        self.loops.append((loop_start, break_jumps))
+        self.compile_block(statement.while_body)
+        self.loops.pop()
+        self.code.emit(JUMP, loop_start)
+        self.code.patch_jump(exit_jump)
+        for break_jump in break_jumps:
+            self.code.patch_jump(break_jump)
+
+    def compile_break(self, statement: BreakStatement):
+        self.loops[-1][1].append(self.code.emit(JUMP))
+
+    def compile_continue(self, statement: ContinueStatement):
+        self.code.emit(JUMP, self.loops[-1][0])
+
+    def compile_print(self, statement: PrintStatement):
+        self.compile_expr(statement.expr)
+        self.code.emit(PRINT)
+
+    def compile_expression_statement(self, statement: ExpressionStatement):
+        expr = statement.expr
+        if isinstance(expr, AssignExpr) and expr.slot is not None:
+            self.compile_expr(expr.value)
+            slot = self.local_slot(expr.depth, expr.slot)
+            self.code.emit(STORE_LOCAL, self.code.add_constant((slot, expr.static_type)))
+            return
+        self.compile_expr(expr)
+        self.code.emit(POP)
+
+    def compile_function_declaration(self, function: FunctionStatement):
+        # functions are declared by the statement parser, their code is compiled when they are called first
+        pass
+
+    def compile_return(self, statement: ReturnStatement):
+        if statement.expr is None:
+            self.code.emit(LOAD_CONST, self.code.add_constant(None))
+        elif statement.tail_call is not None:
+            self.compile_expr(statement.tail_call.callee_name)
+            for argument in statement.tail_call.arguments:
+                self.compile_expr(argument)
+            self.code.emit(TAIL_CALL, len(statement.tail_call.arguments))
+            return
+        else:
+            self.compile_expr(statement.expr)
+        self.code.emit(RETURN if self.in_function else RETURN_FROM_SCRIPT)
+
+    def compile_variable(self, statement: VariableStatement):
+        self.compile_expr(statement.expr)
+        if statement.slot is None:
+            self.code.emit(DECLARE_GLOBAL, self.code.add_constant((statement.name, statement.var_type)))
+        else:
+            slot = self.local_slot(0, statement.slot)
+            self.code.emit(DECLARE_LOCAL, self.code.add_constant((slot, statement.name, statement.static_type)))
+
+    def compile_array(self, expr: ArrayExpr):
+        for element in expr.expressions:
+            self.compile_expr(element)
+        self.code.emit(BUILD_LIST, len(expr.expressions))
+
+    def compile_array_index(self, expr: ArrayIndexExpr):
+        self.compile_expr(expr.index_expr)
+        self.emit_load(expr.identifier, expr.slot, expr.depth)
+        self.code.emit(INDEX, self.code.add_constant(expr.identifier))
+
+    def compile_assign(self, expr: AssignExpr):
+        self.compile_expr(expr.value)
+        if expr.slot is None:
+            self.code.emit(ASSIGN_GLOBAL, self.code.add_constant(expr.name))
+        else:
+            slot = self.local_slot(expr.depth, expr.slot)
+            self.code.emit(ASSIGN_LOCAL, self.code.add_constant((slot, expr.static_type)))
+
+    def compile_call(self, expr: CallExpr):
+        self.compile_expr(expr.callee_name)
+        for argument in expr.arguments:
+            self.compile_expr(argument)
+        self.code.emit(CALL, len(expr.arguments))
+
+    def compile_logic(self, expr: LogicExpr):
+        self.compile_expr(expr.expr)
+        if expr.logic_operator == TokenType.AND:
+            jump = self.code.emit(JUMP_IF_FALSE_OR_POP)
+        elif expr.logic_operator == TokenType.OR:
+            jump = self.code.emit(JUMP_IF_TRUE_OR_POP)
+        else:
+            self.emit_error(ParserError("Expected an logic operator in a logic operation."))
+            return
+        self.compile_expr(expr.right)
+        self.code.patch_jump(jump)
+
+    def compile_binary(self, expr: BinaryExpr):
+        self.compile_expr(expr.expr)
+        operator_index = BINARY_OPERATOR_INDICES.get(expr.operator)
+        if operator_index is not None and isinstance(expr.right, LiteralExpr) and expr.right.literal is not None:
+            # e.g. i + 1 or i < 100, the constant needs no instruction of its own
+            operand = (BINARY_OPERATORS[operator_index], expr.right.literal)
+            self.code.emit(BINARY_CONST, self.code.add_constant(operand))
+            return
+        self.compile_expr(expr.right)
+        if operator_index is None:
+            self.emit_error(ParserError("Following operator is not supported for binary expression"))
+        else:
+            self.code.emit(BINARY, operator_index)
+
+    def compile_unary(self, expr: UnaryExpr):
+        self.compile_expr(expr.right)
+        if expr.operator == TokenType.NOT:
+            self.code.emit(NOT)
+        elif expr.operator == TokenType.MINUS:
+            self.code.emit(NEGATE)
+        else:
+            self.emit_error(ParserError(f"Could not evaluate this unary expression. {expr}"))
+
+    def compile_literal(self, expr: LiteralExpr):
+        if expr.literal is None:
+            self.emit_error(ParserError("Could not evaluate None"))
+        else:
+            self.code.emit(LOAD_CONST, self.code.add_constant(expr.literal))
+
+    def compile_identifier(self, expr: IdentifierExpr):
+        if expr.identifier is None:
+            self.emit_error(ParserError("Could not evaluate None"))
+        else:
+            self.emit_load(expr.identifier, expr.slot, expr.depth)
+
+    def compile_grouping(self, expr: GroupingExpr):
+        if expr.expr is None:
+            self.emit_error(ParserError("Could not evaluate None."))
+        else:
+            self.compile_expr(expr.expr)
+
+    def emit_load(self, name: str, slot: Optional[int], depth: Optional[int]):
+        if slot is None:
+            self.code.emit(LOAD_GLOBAL, self.code.add_constant(name))
+        else:
+            self.code.emit(LOAD_LOCAL, self.local_slot(depth, slot))
+
+
+_STATEMENT_COMPILERS = {
+    BlockStatement: Compiler.compile_block,
+    IfStatement: Compiler.compile_if,
+    WhileStatement: Compiler.compile_while,
+    BreakStatement: Compiler.compile_break,
+    ContinueStatement: Compiler.compile_continue,
+    PrintStatement: Compiler.compile_print,
+    ExpressionStatement: Compiler.compile_expression_statement,
+    FunctionStatement: Compiler.compile_function_declaration,
+    ReturnStatement: Compiler.compile_return,
+    VariableStatement: Compiler.compile_variable,
+}
+
+_EXPR_COMPILERS = {
+    ArrayExpr: Compiler.compile_array,
+    ArrayIndexExpr: Compiler.compile_array_index,
+    AssignExpr: Compiler.compile_assign,
+    CallExpr: Compiler.compile_call,
+    LogicExpr: Compiler.compile_logic,
+    BinaryExpr: Compiler.compile_binary,
+    UnaryExpr: Compiler.compile_unary,
+    LiteralExpr: Compiler.compile_literal,
+    IdentifierExpr: Compiler.compile_identifier,
+    GroupingExpr: Compiler.compile_grouping,
+}
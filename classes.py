@@ -46,7 +46,6 @@ def convert_token_type_to_static_type(token_type: TokenType):
 
 
 def convert_value_to_static_type(value: Any):
-    print("converting", value)
     if isinstance(value, bool):
         return StaticType.BOOLEAN
     elif isinstance(value, float):
@@ -63,8 +62,35 @@ def convert_value_to_static_type(value: Any):
         raise RuntimeError(f"Could not infer the type of {value}")
 
 
+def check_declared_type(name: str, value: Any, expected_static_type: StaticType):
+    """
+    Checks if the value of a new variable has the declared type
+    :raises: RuntimeError if the types don't match
+    """
+    if hasattr(value, "static_type"):
+        actual_value_type = StaticType.FUNCTION
+    else:
+        actual_value_type = convert_value_to_static_type(value)
+    if expected_static_type != actual_value_type:
+        raise RuntimeError(
+            f"Cannot assign {actual_value_type} ({value}) to type {expected_static_type} (name: {name})")
+
+
+def check_assigned_type(value: Any, static_type: StaticType):
+    """
+    Checks if the value can be assigned to a local variable of the static type
+    :raises: RuntimeError if the types don't match
+    """
+    value_type = convert_value_to_static_type(value)
+    if static_type != value_type:
+        raise RuntimeError(f"Incompatible type of variable (of type {static_type}) and {value} (of type {value_type})")
+
+
 class Environment:
-    def __init__(self, enclosing: Optional[Any] = None):
+    # the tiered engine of the program, set on the global environment only
+    tiering = None
+
+    def __init__(self, enclosing: Optional[Any] = None, size: int = 0):
         """
         Example env:
         {
@@ -77,18 +103,22 @@ class Environment:
                 value: "Hello World!"
             )
         }
+        Local variables are not stored by name but in the slots of values, the resolver gives every local variable
+        its slot.
+
         :param enclosing:
+        :param size: the number of slots
         """
         self.environment: Dict[str, Tuple[StaticType, Any]] = {}
-        if enclosing is None:
-            self.enclosing = None
-        else:
-            self.enclosing = enclosing
+        self.enclosing = enclosing
+        self.globals = self if enclosing is None else enclosing.globals
+        self.values: List[Any] = [None] * size
 
     def declare_variable(self, name, value: Any, var_type: Optional[TokenType],
                          _static_type: Optional[StaticType] = None):
         """
-        Declares a new (probably undefined) variable
+        Declares a new (probably undefined) variable. Shadowing variables of the enclosing environments is forbidden by
+        the resolver.
 
         :param name:
         :param value:
@@ -96,38 +126,34 @@ class Environment:
         :param _static_type:
         :return:
         """
-        # we use this try catch statement to know if the variable was already declared.
-        variable_already_use = True
-        try:
-            var_type = self.get_variable_value(name)
-        except RuntimeError:
-            variable_already_use = False
-        if variable_already_use:
-            raise RuntimeError(f"Variable {name} was already declared. Cannot redeclare the variable.")
-
         expected_static_type = StaticType.ANY
         if _static_type is not None:
             expected_static_type = _static_type
         elif var_type is not None:
             expected_static_type = convert_token_type_to_static_type(var_type)
-
-        actual_value_type = StaticType.ANY
-        if hasattr(value, "static_type"):
-            actual_value_type = StaticType.FUNCTION
-        else:
-            actual_value_type = convert_value_to_static_type(value)
-        print("actual value type", actual_value_type, name, value)
-        value_tuple = (expected_static_type, value)
-
-        if expected_static_type != actual_value_type:
-            print("raise error", name, value, var_type, _static_type)
-            raise RuntimeError(
-                f"Cannot assign {actual_value_type} ({value}) to type {expected_static_type} (name: {name})")
+        check_declared_type(name, value, expected_static_type)
         if name not in self.environment:
-            self.environment[name] = value_tuple
+            self.environment[name] = (expected_static_type, value)
         else:
             raise ParserError(f"Cannot redefine already defined variable '{name}'")
 
+    def declare_verified(self, name, value: Any, static_type: StaticType):
+        """
+        Declares a variable whose value has the static type, the type checker verified it
+        """
+        self.environment[name] = (static_type, value)
+
+    def assign_verified(self, name, value: Any):
+        """
+        Assigns a global variable to a value of its type, the type checker verified it
+
+        :raises: RuntimeError if the variable was not declared yet
+        """
+        entry = self.environment.get(name)
+        if entry is None:
+            raise RuntimeError(f"Undefined variable {name}")
+        self.environment[name] = (entry[0], value)
+
     def assign_variable(self, name, value):
         """
         Assigns a variable, the variable has to be defined before.
@@ -164,6 +190,28 @@ class Environment:
             return self.enclosing.get_variable_value(name)
         raise RuntimeError(f"Undefined variable {name}.")
 
+    def ancestor(self, depth: int) -> "Environment":
+        environment = self
+        while depth:
+            environment = environment.enclosing
+            depth -= 1
+        return environment
+
+    def get_at(self, depth: int, slot: int):
+        """
+        Gets the local variable in the slot of the environment depth levels up
+        """
+        return self.ancestor(depth).values[slot]
+
+    def assign_at(self, depth: int, slot: int, value: Any, static_type: StaticType):
+        """
+        Assigns the local variable in the slot of the environment depth levels up
+
+        :raises: RuntimeError if the value does not have the static type of the variable
+        """
+        check_assigned_type(value, static_type)
+        self.ancestor(depth).values[slot] = value
+
     @property
     def store(self) -> Dict[str, Any]:
         return self.environment
@@ -193,12 +241,42 @@ class Environment:
         return f"Environment(environment={self.environment}, enclosing={self.enclosing})"
 
 
+class Completion(Enum):
+    """
+    The ways a statement can complete abruptly. Statements which complete normally return None from execute, the
+    others return a tuple of the completion and its value.
+    """
+    BREAK = "BREAK"
+    CONTINUE = "CONTINUE"
+    # the value is the returned value
+    RETURN = "RETURN"
+    # the value is the called function and its arguments, the caller runs the function in place of the returning one
+    TAIL_CALL = "TAIL_CALL"
+
+
+BREAK_COMPLETION = (Completion.BREAK, None)
+CONTINUE_COMPLETION = (Completion.CONTINUE, None)
+
+
 class Statement(ABC):
     @abstractmethod
     def execute(self, env: Environment):
+        """
+        :return: None if the statement completed normally, otherwise a completion and its value
+        """
         pass
 
 
+def execute_script(statements: List[Statement], env: Environment):
+    """
+    Executes the top level statements, a return outside of a function raises a ReturnError
+    """
+    for statement in statements:
+        completion = statement.execute(env)
+        if completion is not None:
+            raise ReturnError(completion[1])
+
+
 class Expr(ABC):
     @abstractmethod
     def evaluate(self, env: Environment):
@@ -213,16 +291,16 @@ class Expr(ABC):
 class BlockStatement(Statement):
     def __init__(self, block):
         self.block: List[Statement] = block
+        # the number of variables declared in the block, set by the resolver
+        self.slot_count = 0
 
     def execute(self, env):
-        environment = Environment(env)
-        previous_env = env
-        env = environment
-        try:
-            for statement in self.block:
-                statement.execute(env)
-        finally:
-            env = previous_env
+        environment = Environment(env, self.slot_count)
+        for statement in self.block:
+            completion = statement.execute(environment)
+            if completion is not None:
+                return completion
+        return None
 
     def __repr__(self):
         return f"BlockStatement(block={self.block})"
@@ -239,16 +317,13 @@ class IfStatement(Statement):
     def execute(self, env: Environment):
         condition = self.cond.evaluate(env)
         if condition:
-            self.if_branch.execute(env)
-            return
+            return self.if_branch.execute(env)
         for elif_branch_cond, elif_branch_body in self.elif_branches:
             if elif_branch_cond.evaluate(env):
-                elif_branch_body.execute(env)
-                return
+                return elif_branch_body.execute(env)
         if not condition and self.else_branch is not None:
-            self.else_branch.execute(env)
-            return
-        return
+            return self.else_branch.execute(env)
+        return None
 
     def __repr__(self):
         return f"IfStatement({self.cond}, {self.if_branch}, {self.else_branch})"
@@ -258,17 +333,51 @@ class WhileStatement(Statement):
     def __init__(self, cond: Expr, while_body: BlockStatement):
         self.cond = cond
         self.while_body = while_body
+        # set by the type checker if the condition is always a boolean
+        self.verified = False
 
     def execute(self, env):
-        condition = get_bool(self.cond, env)
-        while condition:
-            self.while_body.execute(env)
-            condition = get_bool(self.cond, env)
+        tiering = env.globals.tiering
+        if tiering is not None:
+            return tiering.execute_while(self, env)
+        if self.verified:
+            while self.cond.evaluate(env):
+                completion = self.while_body.execute(env)
+                if completion is not None:
+                    if completion is BREAK_COMPLETION:
+                        break
+                    if completion is not CONTINUE_COMPLETION:
+                        return completion
+            return None
+        while get_bool(self.cond, env):
+            completion = self.while_body.execute(env)
+            if completion is not None:
+                if completion is BREAK_COMPLETION:
+                    break
+                if completion is not CONTINUE_COMPLETION:
+                    return completion
+        return None
 
     def __repr__(self):
         return f"WhileStatement(cond={self.cond}, while_body={self.while_body})"
 
 
+class BreakStatement(Statement):
+    def execute(self, env: Environment):
+        return BREAK_COMPLETION
+
+    def __repr__(self):
+        return "BreakStatement()"
+
+
+class ContinueStatement(Statement):
+    def execute(self, env: Environment):
+        return CONTINUE_COMPLETION
+
+    def __repr__(self):
+        return "ContinueStatement()"
+
+
 def get_bool(expr: Expr, env):
     value = expr.evaluate(env)
     if isinstance(value, bool):
@@ -305,22 +414,44 @@ class FunctionStatement(Statement):
         self.arity = len(parameters)
         self.body = body
         self.global_environment = global_env
+        # the parameters and the variables of the body, set by the resolver
+        self.frame_size = self.arity
+        # set by the type checker if the function is only called with arguments of the parameter types
+        self.verified = False
 
     def execute(self, env: Environment):
         pass
 
     def call(self, arguments, env: Environment):
-        # TODO: create the global environment
-        # functions get their own environment
-        environment = Environment(env)
-        for (arg_type, arg_token_name), arg_value in zip(self.parameters, arguments):
-            check_correct_type(arg_type, arg_value)
-            environment.declare_variable(arg_token_name.value, arg_value, arg_type)
-        try:
-            self.body.execute(environment)
-        except ReturnError as r:
-            return r.return_value
-        return None
+        tiering = self.global_environment.tiering
+        if tiering is not None:
+            return tiering.call_function(self, arguments)
+        return self.interpret_call(arguments)
+
+    def interpret_call(self, arguments):
+        function = self
+        # tail calls run in this loop, so they don't grow the python stack
+        while True:
+            # functions get their own environment, enclosed by the global environment. The parameters are in the
+            # first slots, followed by the variables of the body.
+            environment = Environment(function.global_environment, function.frame_size)
+            values = environment.values
+            if function.verified:
+                values[:function.arity] = arguments
+            else:
+                for slot, ((arg_type, arg_token_name), arg_value) in enumerate(zip(function.parameters, arguments)):
+                    check_correct_type(arg_type, arg_value)
+                    values[slot] = arg_value
+            for statement in function.body.block:
+                completion = statement.execute(environment)
+                if completion is not None:
+                    break
+            else:
+                return None
+            if completion[0] is Completion.TAIL_CALL:
+                function, arguments = completion[1]
+                continue
+            return completion[1]
 
     @staticmethod
     @property
@@ -367,15 +498,31 @@ def check_correct_type(token_type: TokenType, value: Any):
 class ReturnStatement(Statement):
     def __init__(self, expr: Expr):
         self.expr = expr
+        # the returned call if it is a tail call of a function, set by the resolver
+        self.tail_call: Optional["CallExpr"] = None
 
     def execute(self, env):
+        if self.tail_call is not None:
+            function, arguments = self.tail_call.evaluate_callee(env)
+            if type(function) is FunctionStatement:
+                return Completion.TAIL_CALL, (function, arguments)
+            return Completion.RETURN, function.call(arguments=arguments, env=env)
         value = None
         if self.expr is not None:
             value = self.expr.evaluate(env)
-        raise ReturnError(value)
+        return Completion.RETURN, value
+
+    def __repr__(self):
+        return f"ReturnStatement(expr={self.expr})"
 
 
 class NativeFunctionStatement(Statement):
+    # pure functions only compute their result from the arguments, the optimizer calls them on constant arguments
+    pure = False
+    # the signature used by the type checker, the parameter types are not checked if they are None
+    parameter_types: Optional[List[StaticType]] = None
+    return_type = StaticType.ANY
+
     @abstractmethod
     def call(self, arguments: List[Any], environment: Environment):
         pass
@@ -391,10 +538,24 @@ class VariableStatement(Statement):
         self.var_type = var_type
         self.name = name
         self.expr = expr
+        # set by the resolver, global variables have no slot
+        self.slot: Optional[int] = None
+        self.static_type: Optional[StaticType] = None
+        # set by the type checker if the value always has the declared type
+        self.verified = False
 
     def execute(self, env):
         value = self.expr.evaluate(env)
-        env.declare_variable(self.name, value, self.var_type)
+        if self.verified:
+            if self.slot is None:
+                env.declare_verified(self.name, value, self.static_type)
+            else:
+                env.values[self.slot] = value
+        elif self.slot is None:
+            env.declare_variable(self.name, value, self.var_type)
+        else:
+            check_declared_type(self.name, value, self.static_type)
+            env.values[self.slot] = value
         # print(f"Following value was assigned to {self.name}: {value}")
 
     def __repr__(self):
@@ -420,12 +581,15 @@ class ArrayIndexExpr(Expr):
     def __init__(self, identifier, index_expr: Expr):
         self.identifier = identifier
         self.index_expr = index_expr
+        # set by the resolver, see IdentifierExpr
+        self.depth: Optional[int] = None
+        self.slot: Optional[int] = None
 
     def evaluate(self, env: Environment):
         index = self.index_expr.evaluate(env)
         if not isinstance(index, int):
             raise ParserError(f"Expected an integer got {type(index)} ({index})")
-        array = env.get_variable_value(self.identifier)
+        array = lookup_variable(env, self.identifier, self.depth, self.slot)
         if not isinstance(array, list):
             raise ParserError(f"Expected a list got {type(array)} ({array})")
         try:
@@ -441,10 +605,27 @@ class AssignExpr(Expr):
     def __init__(self, name, value: Expr):
         self.name = name
         self.value = value
+        # set by the resolver, see IdentifierExpr
+        self.depth: Optional[int] = None
+        self.slot: Optional[int] = None
+        self.static_type: Optional[StaticType] = None
+        # set by the type checker if the value always has the type of the variable
+        self.verified = False
 
     def evaluate(self, env: Environment):
-        env.assign_variable(self.name, self.value.evaluate(env))
-        return self.value
+        value = self.value.evaluate(env)
+        if self.verified:
+            if self.slot is not None:
+                env.ancestor(self.depth).values[self.slot] = value
+            else:
+                env.globals.assign_verified(self.name, value)
+        elif self.slot is not None:
+            env.assign_at(self.depth, self.slot, value, self.static_type)
+        elif self.depth is not None:
+            env.globals.assign_variable(self.name, value)
+        else:
+            env.assign_variable(self.name, value)
+        return value
 
     def __repr__(self):
         return f"AssignExpr(name={self.name}, value={self.value})"
@@ -455,17 +636,25 @@ class CallExpr(Expr):
         self.callee_name = callee_name
         self.paranthesis = paranthesis
         self.arguments = arguments
+        # set by the type checker if the callee is a function with the arity of the arguments
+        self.verified = False
 
     def evaluate(self, env: Environment):
-        callee = self.callee_name.evaluate(env)
-        arguments = [arguments.evaluate(env) for arguments in self.arguments]
-        function = callee
-        if len(arguments) != function.arity:
-            raise RuntimeError(f"Expected {function.arity} arguments, got {len(arguments)} arguments.")
+        function, arguments = self.evaluate_callee(env)
         # if not isinstance(type(callee), FunctionStatement) or not isinstance(type(callee)):
         #    raise RuntimeError(f"Cant call a {type(callee)} statement.")
         return function.call(arguments=arguments, env=env)
 
+    def evaluate_callee(self, env: Environment):
+        """
+        :return: the called function and the evaluated arguments
+        """
+        callee = self.callee_name.evaluate(env)
+        arguments = [arguments.evaluate(env) for arguments in self.arguments]
+        if not self.verified and len(arguments) != callee.arity:
+            raise RuntimeError(f"Expected {callee.arity} arguments, got {len(arguments)} arguments.")
+        return callee, arguments
+
     def __repr__(self):
         return f"CallExpr(callee_name={self.callee_name}, paranthesis={self.paranthesis}, arguments={self.arguments})"
 
@@ -589,9 +778,25 @@ class LiteralExpr(Expr):
         return self.literal
 
 
+def lookup_variable(env: Environment, name: str, depth: Optional[int], slot: Optional[int]):
+    """
+    Gets a variable via its resolved location: local variables have a slot, global variables only a depth. Variables
+    which were not resolved are searched through all environments.
+    """
+    if slot is not None:
+        return env.get_at(depth, slot)
+    if depth is not None:
+        return env.globals.get_variable_value(name)
+    return env.get_variable_value(name)
+
+
 class IdentifierExpr(Expr):
     def __init__(self, identifier):
         self.identifier = identifier
+        # set by the resolver: local variables have the depth and slot of their declaration, global variables the
+        # depth GLOBAL_DEPTH and no slot
+        self.depth: Optional[int] = None
+        self.slot: Optional[int] = None
 
     def __repr__(self):
         return f"LiteralExpr(literal={self.identifier})"
@@ -604,7 +809,7 @@ class IdentifierExpr(Expr):
     def evaluate(self, env: Environment):
         if self.identifier is None:
             raise ParserError("Could not evaluate None")
-        return env.get_variable_value(self.identifier)
+        return lookup_variable(env, self.identifier, self.depth, self.slot)
 
 
 class GroupingExpr(Expr):
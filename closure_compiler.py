@@ -0,0 +1,549 @@
+from typing import Any, Callable, Dict, List, Optional
+
+from classes import Environment, Statement, Expr, FunctionStatement, BlockStatement, IfStatement, WhileStatement, \
+    PrintStatement, ExpressionStatement, ReturnStatement, VariableStatement, ArrayExpr, ArrayIndexExpr, AssignExpr, \
+    CallExpr, LogicExpr, BinaryExpr, UnaryExpr, LiteralExpr, IdentifierExpr, GroupingExpr, StaticType, BreakStatement, \
+    ContinueStatement, Completion, BREAK_COMPLETION, CONTINUE_COMPLETION, check_correct_type, check_declared_type, \
+    check_assigned_type
+from errors import ParserError, ReturnError
+from lexer import TokenType
+from vm import STATIC_TYPES
+
+# a compiled node gets the local variables of the running function (or of the top level blocks). Compiled statements
+# return their completion like Statement.execute, compiled expressions their value.
+Frame = List[Any]
+Closure = Callable[[Frame], Any]
+
+
+class CompiledFunction:
+    """
+    The compiled body of a function and the number of its local slots
+    """
+
+    def __init__(self, body: Closure, local_count: int):
+        self.body = body
+        self.local_count = local_count
+
+
+def _raise(error: Exception) -> Closure:
+    def run(frame):
+        raise error
+    return run
+
+
+def _binary(operator: TokenType, left: Closure, right: Closure) -> Closure:
+    """
+    One closure per operator, so the operator is not compared again on every evaluation
+    """
+    if operator == TokenType.PLUS:
+        return lambda frame: left(frame) + right(frame)
+    if operator == TokenType.MINUS:
+        return lambda frame: left(frame) - right(frame)
+    if operator == TokenType.MUL:
+        return lambda frame: left(frame) * right(frame)
+    if operator == TokenType.DIV:
+        return lambda frame: left(frame) / right(frame)
+    if operator == TokenType.GREATER:
+        return lambda frame: left(frame) > right(frame)
+    if operator == TokenType.GREATER_EQUALS:
+        return lambda frame: left(frame) >= right(frame)
+    if operator == TokenType.LESSER:
+        return lambda frame: left(frame) < right(frame)
+    if operator == TokenType.LESSER_EQUALS:
+        return lambda frame: left(frame) <= right(frame)
+    if operator == TokenType.EQUALS:
+        return lambda frame: left(frame) == right(frame)
+    if operator == TokenType.NOT_EQUALS:
+        return lambda frame: left(frame) != right(frame)
+    if operator == TokenType.AND:
+        return lambda frame: left(frame) and right(frame)
+    if operator == TokenType.OR:
+        return lambda frame: left(frame) or right(frame)
+
+    def run(frame):
+        left(frame)
+        right(frame)
+        raise ParserError("Following operator is not supported for binary expression")
+    return run
+
+
+def _binary_constant(operator: TokenType, left: Closure, right: Any) -> Optional[Closure]:
+    """
+    The closures of the most frequent operators with a constant right operand, like i + 1 or i < 100
+    """
+    if operator == TokenType.PLUS:
+        return lambda frame: left(frame) + right
+    if operator == TokenType.MINUS:
+        return lambda frame: left(frame) - right
+    if operator == TokenType.MUL:
+        return lambda frame: left(frame) * right
+    if operator == TokenType.LESSER:
+        return lambda frame: left(frame) < right
+    if operator == TokenType.GREATER:
+        return lambda frame: left(frame) > right
+    if operator == TokenType.EQUALS:
+        return lambda frame: left(frame) == right
+    return None
+
+
+class ClosureCompiler:
+    """
+    Compiles every node of the resolved statements once into a Python closure and runs them. Like in the vm, local
+    variables are slots of one list per function call, global variables are stored in the environment.
+    """
+
+    def __init__(self, environment: Environment):
+        self.environment = environment
+        self.global_store = environment.environment
+        self.compiled_functions: Dict[FunctionStatement, CompiledFunction] = {}
+        # the first slot of every enclosing block (or function), the innermost one is the last
+        self.scope_bases: List[int] = []
+        self.next_slot = 0
+        self.local_count = 0
+
+    def interpret(self, statements: List[Statement]) -> Dict[str, Any]:
+        run = self.compile_script(statements)
+        completion = run([None] * self.local_count)
+        if completion is not None:
+            # a return outside of a function
+            raise ReturnError(completion[1])
+        return self.environment.evaluated_store
+
+    def evaluate(self, expr: Expr):
+        self.start(0)
+        return self.compile_expr(expr)([None] * self.local_count)
+
+    def start(self, slot_count: int):
+        self.scope_bases = []
+        self.next_slot = slot_count
+        self.local_count = slot_count
+
+    def compile_script(self, statements: List[Statement]) -> Closure:
+        self.start(0)
+        return self.compile_sequence(statements)
+
+    def compile_function(self, function: FunctionStatement) -> CompiledFunction:
+        """
+        Compiles the body of the function, the first slots of its frame are the parameters
+        """
+        compiled = self.compiled_functions.get(function)
+        if compiled is not None:
+            return compiled
+        enclosing_state = self.scope_bases, self.next_slot, self.local_count
+        self.start(function.frame_size)
+        self.scope_bases.append(0)
+        body = self.compile_sequence(function.body.block)
+        compiled = self.compiled_functions[function] = CompiledFunction(body, self.local_count)
+        self.scope_bases, self.next_slot, self.local_count = enclosing_state
+        return compiled
+
+    def compile_nested(self, statement: Statement, scope_sizes: List[int]) -> CompiledFunction:
+        """
+        Compiles a statement which runs inside of scopes entered by another engine. The locals of these scopes are the
+        first slots of the frame.
+
+        :param scope_sizes: the number of slots of every enclosing scope, the outermost first
+        """
+        enclosing_state = self.scope_bases, self.next_slot, self.local_count
+        self.start(sum(scope_sizes))
+        base = 0
+        for size in scope_sizes:
+            self.scope_bases.append(base)
+            base += size
+        compiled = CompiledFunction(self.compile_statement(statement), self.local_count)
+        self.scope_bases, self.next_slot, self.local_count = enclosing_state
+        return compiled
+
+    def call_function(self, function: FunctionStatement, arguments: List[Any]):
+        # tail calls run in this loop, so they don't grow the python stack
+        while True:
+            compiled = self.compiled_functions.get(function) or self.compile_function(function)
+            frame = [None] * compiled.local_count
+            if function.verified:
+                frame[:function.arity] = arguments
+            else:
+                for slot, ((arg_type, _), arg_value) in enumerate(zip(function.parameters, arguments)):
+                    check_correct_type(arg_type, arg_value)
+                    frame[slot] = arg_value
+            completion = compiled.body(frame)
+            if completion is None:
+                return None
+            if completion[0] is Completion.TAIL_CALL:
+                function, arguments = completion[1]
+                continue
+            return completion[1]
+
+    def local_slot(self, depth: int, slot: int) -> int:
+        return self.scope_bases[-1 - depth] + slot
+
+    ##########################################################################
+    # Statements
+    ##########################################################################
+
+    def compile_statement(self, statement: Statement) -> Closure:
+        if statement is None:
+            return _raise(ParserError("Structs are not supported yet."))
+        return _STATEMENT_COMPILERS[type(statement)](self, statement)
+
+    def compile_sequence(self, statements: List[Statement]) -> Closure:
+        closures = tuple(self.compile_statement(statement) for statement in statements)
+        if len(closures) == 1:
+            return closures[0]
+
+        def run(frame):
+            for closure in closures:
+                completion = closure(frame)
+                if completion is not None:
+                    return completion
+            return None
+        return run
+
+    def compile_block(self, block: BlockStatement) -> Closure:
+        self.scope_bases.append(self.next_slot)
+        self.next_slot += block.slot_count
+        self.local_count = max(self.local_count, self.next_slot)
+        run = self.compile_sequence(block.block)
+        self.next_slot = self.scope_bases.pop()
+        return run
+
+    def compile_if(self, statement: IfStatement) -> Closure:
+        condition = self.compile_expr(statement.cond)
+        if_branch = self.compile_block(statement.if_branch)
+        elif_branches = tuple((self.compile_expr(elif_condition), self.compile_block(elif_branch))
+                              for elif_condition, elif_branch in statement.elif_branches)
+        else_branch = None if statement.else_branch is None else self.compile_block(statement.else_branch)
+        if not elif_branches:
+            if else_branch is None:
+                def run(frame):
+                    if condition(frame):
+                        return if_branch(frame)
+                    return None
+            else:
+                def run(frame):
+                    if condition(frame):
+                        return if_branch(frame)
+                    return else_branch(frame)
+            return run
+
+        def run(frame):
+            if condition(frame):
+                return if_branch(frame)
+            for elif_condition, elif_branch in elif_branches:
+                if elif_condition(frame):
+                    return elif_branch(frame)
+            if else_branch is not None:
+                return else_branch(frame)
+            return None
+        return run
+
+    def compile_while(self, statement: WhileStatement) -> Closure:
+        condition = self.compile_expr(statement.cond)
+        body = self.compile_block(statement.while_body)
+        if statement.verified:
+            def run(frame):
+                while condition(frame):
+                    completion = body(frame)
+                    if completion is not None:
+                        if completion is BREAK_COMPLETION:
+                            break
+                        if completion is not CONTINUE_COMPLETION:
+                            return completion
+                return None
+            return run
+
+        def run(frame):
+            value = condition(frame)
+            while value is True:
+                completion = body(frame)
+                if completion is not None:
+                    if completion is BREAK_COMPLETION:
+                        return None
+                    if completion is not CONTINUE_COMPLETION:
+                        return completion
+                value = condition(frame)
+            if value is not False:
+                raise RuntimeError("Expected a boolean.")
+            return None
+        return run
+
+    def compile_break(self, statement: BreakStatement) -> Closure:
+        return lambda frame: BREAK_COMPLETION
+
+    def compile_continue(self, statement: ContinueStatement) -> Closure:
+        return lambda frame: CONTINUE_COMPLETION
+
+    def compile_print(self, statement: PrintStatement) -> Closure:
+        expr = self.compile_expr(statement.expr)
+        return lambda frame: print(expr(frame))
+
+    def compile_expression_statement(self, statement: ExpressionStatement) -> Closure:
+        if isinstance(statement.expr, AssignExpr) and statement.expr.slot is not None:
+            return self.compile_store(statement.expr)
+        expr = self.compile_expr(statement.expr)
+
+        def run(frame):
+            expr(frame)
+        return run
+
+    def compile_function_declaration(self, function: FunctionStatement) -> Closure:
+        # functions are declared by the statement parser, their body is compiled when they are called first
+        return lambda frame: None
+
+    def compile_return(self, statement: ReturnStatement) -> Closure:
+        if statement.expr is None:
+            return lambda frame: (Completion.RETURN, None)
+        if statement.tail_call is not None:
+            return self.compile_tail_call(statement.tail_call)
+        expr = self.compile_expr(statement.expr)
+        return lambda frame: (Completion.RETURN, expr(frame))
+
+    def compile_tail_call(self, expr: CallExpr) -> Closure:
+        callee_expr = self.compile_expr(expr.callee_name)
+        argument_exprs = tuple(self.compile_expr(argument) for argument in expr.arguments)
+        environment = self.environment
+        verified = expr.verified
+
+        def run(frame):
+            function = callee_expr(frame)
+            arguments = [argument(frame) for argument in argument_exprs]
+            if not verified and len(arguments) != function.arity:
+                raise RuntimeError(f"Expected {function.arity} arguments, got {len(arguments)} arguments.")
+            if type(function) is FunctionStatement:
+                return Completion.TAIL_CALL, (function, arguments)
+            return Completion.RETURN, function.call(arguments=arguments, env=environment)
+        return run
+
+    def compile_variable(self, statement: VariableStatement) -> Closure:
+        expr = self.compile_expr(statement.expr)
+        name = statement.name
+        if statement.slot is None:
+            var_type = statement.var_type
+            environment = self.environment
+            return lambda frame: environment.declare_variable(name, expr(frame), var_type)
+        slot = self.local_slot(0, statement.slot)
+        static_type = statement.static_type
+        if statement.verified:
+            def run(frame):
+                frame[slot] = expr(frame)
+            return run
+
+        def run(frame):
+            value = expr(frame)
+            if STATIC_TYPES.get(type(value)) is not static_type:
+                check_declared_type(name, value, static_type)
+            frame[slot] = value
+        return run
+
+    ##########################################################################
+    # Expressions
+    ##########################################################################
+
+    def compile_expr(self, expr: Expr) -> Closure:
+        return _EXPR_COMPILERS[type(expr)](self, expr)
+
+    def compile_array(self, expr: ArrayExpr) -> Closure:
+        elements = tuple(self.compile_expr(element) for element in expr.expressions)
+        return lambda frame: [element(frame) for element in elements]
+
+    def compile_array_index(self, expr: ArrayIndexExpr) -> Closure:
+        index_expr = self.compile_expr(expr.index_expr)
+        array_expr = self.compile_load(expr.identifier, expr.slot, expr.depth)
+        name = expr.identifier
+
+        def run(frame):
+            index = index_expr(frame)
+            if not isinstance(index, int):
+                raise ParserError(f"Expected an integer got {type(index)} ({index})")
+            array = array_expr(frame)
+            if not isinstance(array, list):
+                raise ParserError(f"Expected a list got {type(array)} ({array})")
+            try:
+                return array[index]
+            except IndexError:
+                raise RuntimeError(f"Index out of bounds for {name}. Got {index} but max length is {len(array)}")
+        return run
+
+    def compile_assign(self, expr: AssignExpr) -> Closure:
+        value_expr = self.compile_expr(expr.value)
+        if expr.slot is None:
+            name = expr.name
+            global_store = self.global_store
+            environment = self.environment
+
+            def run(frame):
+                value = value_expr(frame)
+                entry = global_store.get(name)
+                if entry is not None and STATIC_TYPES.get(type(value)) is entry[0]:
+                    global_store[name] = (entry[0], value)
+                else:
+                    environment.assign_variable(name, value)
+                return value
+            return run
+        slot = self.local_slot(expr.depth, expr.slot)
+        static_type: StaticType = expr.static_type
+        if expr.verified:
+            def run(frame):
+                value = frame[slot] = value_expr(frame)
+                return value
+            return run
+
+        def run(frame):
+            value = value_expr(frame)
+            if STATIC_TYPES.get(type(value)) is not static_type:
+                check_assigned_type(value, static_type)
+            frame[slot] = value
+            return value
+        return run
+
+    def compile_store(self, expr: AssignExpr) -> Closure:
+        """
+        An assignment of a local which is a statement, unlike the assignment expression it does not return the value
+        """
+        value_expr = self.compile_expr(expr.value)
+        slot = self.local_slot(expr.depth, expr.slot)
+        static_type: StaticType = expr.static_type
+        if expr.verified:
+            def run(frame):
+                frame[slot] = value_expr(frame)
+            return run
+
+        def run(frame):
+            value = value_expr(frame)
+            if STATIC_TYPES.get(type(value)) is not static_type:
+                check_assigned_type(value, static_type)
+            frame[slot] = value
+        return run
+
+    def compile_call(self, expr: CallExpr) -> Closure:
+        callee_expr = self.compile_expr(expr.callee_name)
+        argument_exprs = tuple(self.compile_expr(argument) for argument in expr.arguments)
+        environment = self.environment
+        call_function = self.call_function
+        if expr.verified:
+            def run(frame):
+                function = callee_expr(frame)
+                arguments = [argument(frame) for argument in argument_exprs]
+                if type(function) is FunctionStatement:
+                    return call_function(function, arguments)
+                return function.call(arguments=arguments, env=environment)
+            return run
+
+        def run(frame):
+            function = callee_expr(frame)
+            arguments = [argument(frame) for argument in argument_exprs]
+            if len(arguments) != function.arity:
+                raise RuntimeError(f"Expected {function.arity} arguments, got {len(arguments)} arguments.")
+            if type(function) is FunctionStatement:
+                return call_function(function, arguments)
+            return function.call(arguments=arguments, env=environment)
+        return run
+
+    def compile_logic(self, expr: LogicExpr) -> Closure:
+        left = self.compile_expr(expr.expr)
+        right = self.compile_expr(expr.right)
+        operator = expr.logic_operator
+        if operator == TokenType.AND:
+            def run(frame):
+                value = left(frame)
+                if value is False:
+                    return False
+                if value is not True:
+                    raise RuntimeError("Expected a boolean type for logic operators.")
+                return right(frame)
+        elif operator == TokenType.OR:
+            def run(frame):
+                value = left(frame)
+                if value is True:
+                    return True
+                if value is not False:
+                    raise RuntimeError("Expected a boolean type for logic operators.")
+                return right(frame)
+        else:
+            def run(frame):
+                if not isinstance(left(frame), bool):
+                    raise RuntimeError("Expected a boolean type for logic operators.")
+                raise ParserError("Expected an logic operator in a logic operation.")
+        return run
+
+    def compile_binary(self, expr: BinaryExpr) -> Closure:
+        left = self.compile_expr(expr.expr)
+        if isinstance(expr.right, LiteralExpr) and expr.right.literal is not None:
+            run = _binary_constant(expr.operator, left, expr.right.literal)
+            if run is not None:
+                return run
+        return _binary(expr.operator, left, self.compile_expr(expr.right))
+
+    def compile_unary(self, expr: UnaryExpr) -> Closure:
+        right = self.compile_expr(expr.right)
+        if expr.operator == TokenType.NOT:
+            return lambda frame: not right(frame)
+        if expr.operator == TokenType.MINUS:
+            def run(frame):
+                value = right(frame)
+                if isinstance(value, float) or isinstance(value, int):
+                    return -value
+                raise ParserError(f"Cannot negate a non number: {value}")
+            return run
+        error = ParserError(f"Could not evaluate this unary expression. {expr}")
+
+        def run(frame):
+            right(frame)
+            raise error
+        return run
+
+    def compile_literal(self, expr: LiteralExpr) -> Closure:
+        if expr.literal is None:
+            return _raise(ParserError("Could not evaluate None"))
+        literal = expr.literal
+        return lambda frame: literal
+
+    def compile_identifier(self, expr: IdentifierExpr) -> Closure:
+        if expr.identifier is None:
+            return _raise(ParserError("Could not evaluate None"))
+        return self.compile_load(expr.identifier, expr.slot, expr.depth)
+
+    def compile_grouping(self, expr: GroupingExpr) -> Closure:
+        if expr.expr is None:
+            return _raise(ParserError("Could not evaluate None."))
+        return self.compile_expr(expr.expr)
+
+    def compile_load(self, name: str, slot: Optional[int], depth: Optional[int]) -> Closure:
+        if slot is not None:
+            slot = self.local_slot(depth, slot)
+            return lambda frame: frame[slot]
+        global_store = self.global_store
+        environment = self.environment
+
+        def run(frame):
+            entry = global_store.get(name)
+            if entry is None:
+                return environment.get_variable_value(name)
+            return entry[1]
+        return run
+
+
+_STATEMENT_COMPILERS = {
+    BlockStatement: ClosureCompiler.compile_block,
+    IfStatement: ClosureCompiler.compile_if,
+    WhileStatement: ClosureCompiler.compile_while,
+    BreakStatement: ClosureCompiler.compile_break,
+    ContinueStatement: ClosureCompiler.compile_continue,
+    PrintStatement: ClosureCompiler.compile_print,
+    ExpressionStatement: ClosureCompiler.compile_expression_statement,
+    FunctionStatement: ClosureCompiler.compile_function_declaration,
+    ReturnStatement: ClosureCompiler.compile_return,
+    VariableStatement: ClosureCompiler.compile_variable,
+}
+
+_EXPR_COMPILERS = {
+    ArrayExpr: ClosureCompiler.compile_array,
+    ArrayIndexExpr: ClosureCompiler.compile_array_index,
+    AssignExpr: ClosureCompiler.compile_assign,
+    CallExpr: ClosureCompiler.compile_call,
+    LogicExpr: ClosureCompiler.compile_logic,
+    BinaryExpr: ClosureCompiler.compile_binary,
+    UnaryExpr: ClosureCompiler.compile_unary,
+    LiteralExpr: ClosureCompiler.compile_literal,
+    IdentifierExpr: ClosureCompiler.compile_identifier,
+    GroupingExpr: ClosureCompiler.compile_grouping,
+}
@@ -1,6 +1,6 @@
 from lexer import LocationInformation
 
-from typing import Optional
+from typing import List, Optional
 
 
 class Error(Exception):
@@ -15,7 +15,7 @@ class ParserError(Error):
         if position is None:
             self.location_str = "Following error occurred: "
         else:
-            self.location_str = f"Following error occurred at line: {position.start_line}, col: {position.start_col - position.end_col}."
+            self.location_str = f"Following error occurred at line: {position.start_line}, col: {position.start_col}. "
         super(ParserError, self).__init__(self.location_str + message)
 
 
@@ -24,10 +24,16 @@ class LexerError(Error):
         if position is None:
             self.location_str = "Following error occurred: "
         else:
-            self.location_str = f"Following error occurred at line: {position.start_line}, col: {position.start_col - position.end_col}."
+            self.location_str = f"Following error occurred at line: {position.start_line}, col: {position.start_col}. "
         super(LexerError, self).__init__(self.location_str + message)
 
 
+class TypeCheckError(Error):
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        super(TypeCheckError, self).__init__(f"Found {len(errors)} type errors:\n" + "\n".join(errors))
+
+
 class ReturnError(Error):
     def __init__(self, value):
         self.value = value
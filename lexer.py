@@ -1,12 +1,16 @@
+from array import array
+from bisect import bisect_right
 from enum import Enum
 import re
-from typing import Pattern, AnyStr, List, Optional, Tuple, Union
+from typing import Pattern, AnyStr, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
 
 
 class TokenType(Enum):
     IDENTIFIER = "IDENTIFIER"
     FUN = "FUN"
     RETURN = "RETURN"
+    BREAK = "BREAK"
+    CONTINUE = "CONTINUE"
     STRUCT = "STRUCT"
     CLASS = "CLASS"
     # types
@@ -113,6 +117,80 @@ ALLOWED_VARIABLE_CHARS_REGEX: Pattern[AnyStr] = re.compile("^([A-Z]|[a-z])([A-Z]
 LITERAL_REGEX = re.compile("^([0-9][0-9]*)$|^([1-9][0-9]*).([0-9]*)$|^(\"[\w]\")$|false|true")
 INT_REGEX = re.compile("^([0-9][0-9]*)$")
 DOUBLE_REGEX = re.compile("^([1-9][0-9]*)(.)([0-9]*)$")
+WORD_CHAR_REGEX = re.compile("([A-Z]|[a-z]|[0-9])")
+DIGIT_REGEX = re.compile("([0-9])")
+
+KEYWORDS: Dict[str, TokenType] = {
+    "int": TokenType.INT,
+    "double": TokenType.DOUBLE,
+    "str": TokenType.STRING,
+    "List": TokenType.LIST,
+    "bool": TokenType.BOOLEAN,
+    "for": TokenType.FOR,
+    "in": TokenType.IN,
+    "while": TokenType.WHILE,
+    "if": TokenType.IF,
+    "elif": TokenType.ELIF,
+    "else": TokenType.ELSE,
+    "write": TokenType.WRITE,
+    "fun": TokenType.FUN,
+    "struct": TokenType.STRUCT,
+    "class": TokenType.CLASS,
+    "return": TokenType.RETURN,
+    "break": TokenType.BREAK,
+    "continue": TokenType.CONTINUE,
+}
+
+OPERATORS: Dict[str, TokenType] = {
+    ">=": TokenType.GREATER_EQUALS,
+    "<=": TokenType.LESSER_EQUALS,
+    "==": TokenType.EQUALS,
+    "!=": TokenType.NOT_EQUALS,
+    "&&": TokenType.AND,
+    "||": TokenType.OR,
+    ">": TokenType.GREATER,
+    "<": TokenType.LESSER,
+    "=": TokenType.ASSIGNMENT,
+    "!": TokenType.NOT,
+    ";": TokenType.SEMICOLON,
+    "-": TokenType.MINUS,
+    "+": TokenType.PLUS,
+    "*": TokenType.MUL,
+    "/": TokenType.DIV,
+    "(": TokenType.LEFT_BRACKET,
+    ")": TokenType.RIGHT_BRACKET,
+    "{": TokenType.LEFT_CURLY_BRACKET,
+    "}": TokenType.RIGHT_CURLY_BRACKET,
+    "[": TokenType.LEFT_CORNERED_BRACKET,
+    "]": TokenType.RIGHT_CORNERED_BRACKET,
+    ",": TokenType.COMMA,
+}
+
+OPERATOR_ERRORS: Dict[str, str] = {
+    "&": "Expected a '&' after a '&'",
+    "|": "Expected a '|' after a '|'",
+}
+
+# tokens without a value are immutable in practice, so the lexer shares one instance per token type
+_KEYWORD_TOKENS: Dict[str, Token] = {word: Token(token_type) for word, token_type in KEYWORDS.items()}
+_OPERATOR_TOKENS: Dict[str, Token] = {operator: Token(token_type) for operator, token_type in OPERATORS.items()}
+_TRUE_TOKEN = Token(TokenType.TRUE)
+_FALSE_TOKEN = Token(TokenType.FALSE)
+
+# The master pattern of the lexer. Characters that cannot start a token (whitespace, unknown characters) are never
+# matched and therefore skipped by finditer, line breaks are matched to keep track of the line numbers.
+TOKEN_REGEX = re.compile(
+    r'(?P<NEWLINE>\n)'
+    r'|(?P<WORD>[A-Za-z][A-Za-z0-9]*)'
+    # a two character operator is only recognized if it is not at the very end of the code
+    r'|(?P<OPERATOR>[<>=!]=(?!\Z)|&&(?!\Z)|\|\|(?!\Z)|[<>=!&|;\-+*/(){}\[\],])'
+    r'|(?P<SECOND_POINT>[0-9]+\.[0-9]*\.)'
+    # the character after a lonely point is swallowed as well
+    r'|(?P<LONELY_POINT>[0-9]+\.[^0-9.])'
+    r'|(?P<NUMBER>[0-9]+(?:\.[0-9]*)?)'
+    r'|(?P<STRING>"[^"]*")'
+    r'|(?P<UNTERMINATED_STRING>"[^"]*)'
+)
 
 
 def is_allowed_identifier(identifier: str) -> bool:
@@ -130,13 +208,123 @@ class Lexer:
         self.code = code
         self.tokens: List[TokenObject] = []
         self.index = 0
+        # running cursor: current line number and the index at which that line starts
         self.line = 1
-        self.column = 1
+        self.line_start = 0
 
     def run_lexer(self):
-        while self.index < len(self.code):
-            self.go_forward()
-        self.tokens.append(TokenObject(Token(TokenType.EOF), LocationInformation(0, 0, 0, 0)))
+        self.tokens.extend(self.iter_tokens())
+
+    def iter_tokens(self, chunks: Optional[Iterable[str]] = None) -> Iterator[TokenObject]:
+        """
+        Lazily lexes the code and yields the tokens one by one, the last one is the EOF token. This emits the same
+        tokens as calling go_forward until the end of the code.
+
+        :param chunks: if given, the code is read from these chunks instead of self.code. Tokens can be split over
+                       chunk boundaries, only the unfinished part of the current chunk is kept in memory.
+        """
+        for token, _, _, start_line, start_col, end_line, end_col in self.scan(chunks):
+            yield TokenObject(token, LocationInformation(start_line, end_line, start_col, end_col))
+        yield TokenObject(Token(TokenType.EOF), LocationInformation(0, 0, 0, 0))
+
+    def run_compact_lexer(self) -> "TokenStream":
+        """
+        Lexes the rest of the code into a TokenStream, which is a lot smaller than the list of token objects.
+        """
+        stream = TokenStream(self.code)
+        for token, start, end, _, _, _, _ in self.scan():
+            stream.append(token, start, end)
+        stream.append(Token(TokenType.EOF), -1, -1)
+        return stream
+
+    def scan(self, chunks: Optional[Iterable[str]] = None) -> Iterator[Tuple[Token, int, int, int, int, int, int]]:
+        """
+        Lexes the code with the master pattern (TOKEN_REGEX), this only needs one regex match and one dict lookup per
+        token. The EOF token is not part of the result.
+
+        :param chunks: see iter_tokens
+        :return: tuples of the token, its start and end index in the code, start line, start column, end line and
+                 end column
+        """
+        if chunks is None:
+            buffer = self.code
+            position = self.index
+            base = 0
+            chunks = iter(())
+            final = True
+        else:
+            buffer = ""
+            position = 0
+            base = self.index
+            chunks = iter(chunks)
+            final = False
+        line = self.line
+        line_start = self.line_start
+        while True:
+            for match in TOKEN_REGEX.finditer(buffer, position):
+                start, end = match.span()
+                if not final and end >= len(buffer) - 1:
+                    # the token (or the operator after it) might continue in the next chunk
+                    position = start
+                    break
+                position = end
+                kind = match.lastgroup
+                if kind == "NEWLINE":
+                    line += 1
+                    line_start = base + end
+                    continue
+                start += base
+                start_line = line
+                start_col = start - line_start
+                lexeme = match.group()
+                token = None
+                if kind == "WORD":
+                    token = _KEYWORD_TOKENS.get(lexeme)
+                    if token is not None:
+                        pass
+                    elif lexeme == "true":
+                        token = _TRUE_TOKEN
+                    elif lexeme == "false":
+                        token = _FALSE_TOKEN
+                    elif lexeme.startswith(("true", "false")):
+                        # LITERAL_REGEX matches these words, but they are neither a literal nor an identifier
+                        pass
+                    elif len(lexeme) <= 51:
+                        token = Token(TokenType.IDENTIFIER, lexeme)
+                elif kind == "OPERATOR":
+                    token = _OPERATOR_TOKENS.get(lexeme)
+                    if token is None:
+                        token = Token(TokenType.ERROR, OPERATOR_ERRORS[lexeme])
+                elif kind == "NUMBER":
+                    if "." not in lexeme:
+                        token = Token(TokenType.INT, int(lexeme))
+                    elif lexeme[0] != "0":
+                        token = Token(TokenType.DOUBLE, float(lexeme))
+                elif kind == "STRING":
+                    token = Token(TokenType.STRING, lexeme[1:-1])
+                elif kind == "SECOND_POINT":
+                    token = Token(TokenType.ERROR, "Expected only one . for a number.")
+                elif kind == "LONELY_POINT":
+                    token = Token(TokenType.ERROR, f"No lonely point allowed for double. Write {lexeme[:-1]}0 instead")
+                else:
+                    token = Token(TokenType.ERROR, "String never ended.")
+                if kind in ("STRING", "UNTERMINATED_STRING", "LONELY_POINT") and "\n" in lexeme:
+                    line += lexeme.count("\n")
+                    line_start = start + lexeme.rindex("\n") + 1
+                if token is not None:
+                    yield token, start, base + end, start_line, start_col, line, base + end - line_start
+            else:
+                position = len(buffer)
+                if final:
+                    break
+            chunk = next(chunks, "")
+            final = chunk == ""
+            buffer = buffer[position:] + chunk
+            base += position
+            position = 0
+        self.index = base + position
+        self.line = line
+        self.line_start = line_start
 
     def get_token_objects(self) -> List[TokenObject]:
         return self.tokens
@@ -144,17 +332,20 @@ class Lexer:
     def get_tokens(self) -> List[Token]:
         return [token_obj.get_token() for token_obj in self.tokens]
 
-    def advance(self, increment_value: int = 1, column_length: Optional[int] = None):
+    def advance(self, increment_value: int = 1):
+        end = min(self.index + increment_value, len(self.code))
+        line_breaks = self.code.count("\n", self.index, end)
+        if line_breaks:
+            self.line += line_breaks
+            self.line_start = self.code.rindex("\n", self.index, end) + 1
         self.index += increment_value
-        if column_length is None:
-            self.column += increment_value
-        else:
-            self.column = column_length
 
     def get_current_location(self) -> Tuple[int, int]:
-        line_number = len(self.code[0:self.index].split("\n"))
-        col_number = len(self.code[0:self.index].split("\n")[-1])
-        return line_number, col_number
+        """
+        Returns the (line, column) of the cursor. The column is the number of characters between the start of the
+        line and the cursor, so this is O(1) instead of re-splitting the already lexed part of the code.
+        """
+        return self.line, min(self.index, len(self.code)) - self.line_start
 
     def go_forward(self):
         if self.index == len(self.code):
@@ -165,11 +356,8 @@ class Lexer:
         start_line, start_col = self.get_current_location()
         skip_length = 1
         token = None
-        if current_char in [" ", "\t"]:
-            self.column += 1
-        elif current_char == "\n":
-            self.line += 1
-            self.column = 1
+        if current_char in [" ", "\t", "\n"]:
+            pass
         elif current_char == ">":
             if next_char == "=":
                 token = Token(TokenType.GREATER_EQUALS)
@@ -233,52 +421,20 @@ class Lexer:
         elif current_char == ",":
             token = Token(TokenType.COMMA)
         elif current_char == "\"":
-            string, error = self.get_string_from_text(text=self.code[self.index:])
-            column_length = self.column
+            string, error = self.get_string_from_text(start=self.index)
             if error is None:
                 skip_length = len(string) + 2
                 token = Token(TokenType.STRING, string)
             else:
                 token = Token(TokenType.ERROR, error)
                 skip_length = len(string) + 1
-        elif (identifier_param := self.get_full_identifier(text=self.code[self.index:]))[0] != "":
+        elif (identifier_param := self.get_full_identifier(start=self.index))[0] != "":
             full_word, length, error = identifier_param
             skip_length = length
-            column_length = self.column
             if error is not None:
                 token = Token(TokenType.ERROR, error)
-            elif full_word == "int":
-                token = Token(TokenType.INT)
-            elif full_word == "double":
-                token = Token(TokenType.DOUBLE)
-            elif full_word == "str":
-                token = Token(TokenType.STRING)
-            elif full_word == "List":
-                token = Token(TokenType.LIST)
-            elif full_word == "bool":
-                token = Token(TokenType.BOOLEAN)
-            elif full_word == "for":
-                token = Token(TokenType.FOR)
-            elif full_word == "in":
-                token = Token(TokenType.IN)
-            elif full_word == "while":
-                token = Token(TokenType.WHILE)
-            elif full_word == "if":
-                token = Token(TokenType.IF)
-            elif full_word == "elif":
-                token = Token(TokenType.ELIF)
-            elif full_word == "else":
-                token = Token(TokenType.ELSE)
-            elif full_word == "write":
-                token = Token(TokenType.WRITE)
-            elif full_word == "fun":
-                token = Token(TokenType.FUN)
-            elif full_word == "struct":
-                token = Token(TokenType.STRUCT)
-            elif full_word == "class":
-                token = Token(TokenType.CLASS)
-            elif full_word == "return":
-                token = Token(TokenType.RETURN)
+            elif full_word in KEYWORDS:
+                token = Token(KEYWORDS[full_word])
             elif re.match(LITERAL_REGEX, full_word):
                 if full_word == "true":
                     token = Token(TokenType.TRUE)
@@ -302,58 +458,194 @@ class Lexer:
         if token is not None:
             self.tokens.append(TokenObject(token=token, location_info=location_info))
 
-    def get_string_from_text(self, text: str) -> Tuple[str, Optional[str]]:
+    def get_string_from_text(self, start: int) -> Tuple[str, Optional[str]]:
         """
         This function gets called when a " character gets spotted
-        :param text:
-        :return:
+        :param start: the index of the opening " in the code
+        :return: the content of the string, optional error message
         """
-        if text[0] != "\"":
+        if self.code[start] != "\"":
             return "", "Something went horribly wrong when parsing a string."
-        string = ""
-        for i in range(1, len(text)):
-            if text[i] == "\"":
-                return string, None
-            else:
-                string += text[i]
-                if text[i] == "\n":
-                    self.line += 1
-                    self.column = 1
-                else:
-                    self.column += 1
-        return string, "String never ended."
+        end = self.code.find("\"", start + 1)
+        if end == -1:
+            return self.code[start + 1:], "String never ended."
+        return self.code[start + 1:end], None
 
-    def get_full_identifier(self, text: str) -> Tuple[str, int, Optional[str]]:
+    def get_full_identifier(self, start: int) -> Tuple[str, int, Optional[str]]:
         """
-        This function gets the next full viable word in the text
-        :param text: The trimmed down text
+        This function gets the next full viable word in the code
+        :param start: the index in the code where the word starts
         :return: the identifier, length of the identifier, optional error message
         """
-        identifier = ""
-        word_regex = re.compile("([A-Z]|[a-z]|[0-9])")
-        digit_regex = re.compile("([0-9])")
+        code = self.code
+        index = start
         # this means that we look for a number
-        if re.match(digit_regex, text[0]):
+        if re.match(DIGIT_REGEX, code[start]):
             after_point = False
-            for i in range(len(text)):
-                if re.match(digit_regex, text[i]):
-                    identifier += text[i]
-                elif text[i] == "." and after_point:
+            while index < len(code):
+                if re.match(DIGIT_REGEX, code[index]):
+                    pass
+                elif code[index] == "." and after_point:
+                    identifier = code[start:index]
                     return identifier, len(identifier) + 1, "Expected only one . for a number."
-                elif text[i] == ".":
+                elif code[index] == ".":
                     after_point = True
-                    identifier += "."
                 else:
-                    if text[i - 1] == ".":
+                    identifier = code[start:index]
+                    if code[index - 1] == ".":
                         return identifier, len(
                             identifier) + 1, f"No lonely point allowed for double. Write {identifier}0 instead"
                     return identifier, len(identifier), None
+                index += 1
+            identifier = code[start:]
             return identifier, len(identifier), None
         else:
-            for i in range(0, len(text)):
-                if re.match(word_regex, text[i]):
-                    identifier += text[i]
-                else:
-                    break
-
+            while index < len(code) and re.match(WORD_CHAR_REGEX, code[index]):
+                index += 1
+            identifier = code[start:index]
             return identifier, len(identifier), None
+
+
+def tokenize_stream(fileobj: TextIO, chunk_size: int = 1 << 16) -> Iterator[TokenObject]:
+    """
+    Lazily lexes the code read from a file object in chunks of chunk_size characters.
+    """
+    return Lexer("").iter_tokens(iter(lambda: fileobj.read(chunk_size), ""))
+
+
+class TokenBuffer:
+    """
+    Gives list-like access to a token iterator, e.g. the one of tokenize_stream. Tokens are pulled from the iterator
+    when they are accessed for the first time and dropped again once the reader moved on, so only a small window of
+    tokens is kept in memory. The iterator has to end with the EOF token.
+    """
+
+    def __init__(self, tokens: Iterator[TokenObject], keep: int = 64):
+        self.iterator = tokens
+        self.tokens: List[TokenObject] = []
+        # index of the first token in self.tokens
+        self.offset = 0
+        # number of tokens kept before the last accessed token
+        self.keep = keep
+
+    def __repr__(self):
+        return f"TokenBuffer(offset={self.offset}, tokens={self.tokens})"
+
+    def __getitem__(self, index: int) -> TokenObject:
+        position = index - self.offset
+        if position < 0:
+            raise IndexError(f"Token {index} was already dropped from the token buffer.")
+        while position >= len(self.tokens):
+            try:
+                self.tokens.append(next(self.iterator))
+            except StopIteration:
+                raise IndexError(f"Token {index} is behind the end of the token stream.")
+        if position > 2 * self.keep:
+            del self.tokens[:position - self.keep]
+            self.offset += position - self.keep
+            position = self.keep
+        return self.tokens[position]
+
+
+TOKEN_TYPES: List[TokenType] = list(TokenType)
+_TOKEN_TYPE_CODES: Dict[TokenType, int] = {token_type: code for code, token_type in enumerate(TOKEN_TYPES)}
+_SHARED_TOKENS: Dict[TokenType, Token] = {token_type: Token(token_type) for token_type in TokenType}
+
+
+class TokenStream:
+    """
+    A compact list of tokens. Instead of three objects per token, the token types and the start/end index of every
+    token in the code are stored in parallel arrays and the token values are interned in a value table. Lines and
+    columns are only computed when they are needed, e.g. for an error message, by bisecting the line starts of the code.
+    Indexing a token stream returns a TokenView, so it can be used like a list of token objects.
+    """
+
+    def __init__(self, code: str):
+        self.code = code
+        self.kinds = array("i")
+        self.starts = array("i")
+        self.ends = array("i")
+        # index into self.value_table, -1 if the token has no value
+        self.values = array("i")
+        self.value_table: List[Union[str, int, float]] = []
+        self.value_indices: Dict[Tuple[type, Union[str, int, float]], int] = {}
+        self.line_starts: Optional[array] = None
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, index: int) -> "TokenView":
+        if index < 0:
+            index += len(self.kinds)
+        if not 0 <= index < len(self.kinds):
+            raise IndexError(f"Token {index} is behind the end of the token stream.")
+        return TokenView(self, index)
+
+    def __repr__(self):
+        return f"TokenStream(tokens={len(self)})"
+
+    def append(self, token: Token, start: int, end: int):
+        self.kinds.append(_TOKEN_TYPE_CODES[token.type])
+        self.starts.append(start)
+        self.ends.append(end)
+        if token.value is None:
+            self.values.append(-1)
+            return
+        key = (type(token.value), token.value)
+        value_index = self.value_indices.get(key)
+        if value_index is None:
+            value_index = len(self.value_table)
+            self.value_indices[key] = value_index
+            self.value_table.append(token.value)
+        self.values.append(value_index)
+
+    def token_type(self, index: int) -> TokenType:
+        return TOKEN_TYPES[self.kinds[index]]
+
+    def token_value(self, index: int) -> Optional[Union[str, int, float]]:
+        value_index = self.values[index]
+        return None if value_index == -1 else self.value_table[value_index]
+
+    def token(self, index: int) -> Token:
+        value_index = self.values[index]
+        if value_index == -1:
+            return _SHARED_TOKENS[TOKEN_TYPES[self.kinds[index]]]
+        return Token(TOKEN_TYPES[self.kinds[index]], self.value_table[value_index])
+
+    def location(self, index: int) -> LocationInformation:
+        start = self.starts[index]
+        if start == -1:
+            # the EOF token
+            return LocationInformation(0, 0, 0, 0)
+        start_line, start_col = self.line_and_column(start)
+        end_line, end_col = self.line_and_column(self.ends[index])
+        return LocationInformation(start_line=start_line, end_line=end_line, start_col=start_col, end_col=end_col)
+
+    def line_and_column(self, offset: int) -> Tuple[int, int]:
+        if self.line_starts is None:
+            self.line_starts = array("i", [0])
+            self.line_starts.extend(match.end() for match in re.finditer("\n", self.code))
+        line = bisect_right(self.line_starts, offset)
+        return line, offset - self.line_starts[line - 1]
+
+    def get_tokens(self) -> List[Token]:
+        return [self.token(index) for index in range(len(self))]
+
+
+class TokenView(TokenObject):
+    """
+    The token object of a TokenStream at the given index. The token and its location are created when accessed.
+    """
+    __slots__ = ("stream", "index")
+
+    def __init__(self, stream: TokenStream, index: int):
+        self.stream = stream
+        self.index = index
+
+    @property
+    def token(self) -> Token:
+        return self.stream.token(self.index)
+
+    @property
+    def location_info(self) -> LocationInformation:
+        return self.stream.location(self.index)
@@ -1,10 +1,19 @@
+import argparse
 import sys
+from typing import Any, Dict, List, Optional, TextIO, Type
 
+from ast_cache import AstCache, parse_program
+from closure_compiler import ClosureCompiler
 from evaluator import Evaluator
-from lexer import Lexer
-from parser import Parser
+from lexer import Lexer, TokenBuffer, tokenize_stream
+from optimizer import Optimizer, OPTIMIZATION_LEVELS, NO_OPTIMIZATION, ELIMINATE_DEAD_BRANCHES, dump
+from parser import Parser, PrattParser
 from statements import StatementParser
-from classes import Environment
+from tiered import TieredEngine, DEFAULT_THRESHOLD
+from transpiler import CodeCache, PythonEngine
+from type_checker import TypeChecker
+from classes import Environment, Statement, execute_script
+from vm import VirtualMachine, DEFAULT_MAX_DEPTH
 
 
 def evaluate_string(string: str):
@@ -22,30 +31,174 @@ def get_tokens(code: str):
     return lexer.get_token_objects()
 
 
-def execute(string: str):
+PARSERS = {"descent": Parser, "pratt": PrattParser}
+
+
+class TreeWalker:
+    """
+    Executes the statements by calling execute on every node, like StatementParser.interpret
+    """
+
+    def __init__(self, environment: Environment):
+        self.environment = environment
+
+    def interpret(self, statements: List[Statement]) -> Dict[str, Any]:
+        execute_script(statements, self.environment)
+        return self.environment.evaluated_store
+
+
+ENGINES = {"tree": TreeWalker, "vm": VirtualMachine, "closure": ClosureCompiler, "python": PythonEngine,
+           "tiered": TieredEngine}
+
+
+def optimize(statement_parser: StatementParser, optimization_level: int) -> List[Statement]:
+    statement_parser.statements = Optimizer(statement_parser.environment, optimization_level) \
+        .optimize(statement_parser.statements)
+    return statement_parser.statements
+
+
+def execute(string: str, parser_class: Type[Parser] = Parser, engine: str = "tree",
+            engine_options: Optional[Dict[str, Any]] = None, optimization_level: int = NO_OPTIMIZATION,
+            verify: bool = False):
+    """
+    :param engine_options: the keyword arguments of the engine, like the threshold of the tiered engine
+    :param optimization_level: one of the OPTIMIZATION_LEVELS of the optimizer
+    :param verify: check the types before running the program and skip the verified runtime checks
+    """
     tokens = get_tokens(string)
 
     #print(tokens)
-    statement_parser = StatementParser(tokens)
+    statement_parser = StatementParser(tokens, parser_class=parser_class)
     statement_parser.parse()
-    statement_parser.interpret()
+    optimize(statement_parser, optimization_level)
+    if verify:
+        TypeChecker(statement_parser.environment).check(statement_parser.statements)
+    ENGINES[engine](statement_parser.environment, **(engine_options or {})).interpret(statement_parser.statements)
     return statement_parser.get_store(), statement_parser.get_clean_store()
 
 
-if __name__ == "__main__":
-    args = sys.argv
-    file_name = "program.ti"
-    try:
-        file_name = args[1]
-    except IndexError:
-        print(f"You need to give a file name as the first argument")
+def execute_stream(file: TextIO, parser_class: Type[Parser] = Parser, engine: str = "tree",
+                   engine_options: Optional[Dict[str, Any]] = None, optimization_level: int = NO_OPTIMIZATION):
+    statement_parser = StatementParser(TokenBuffer(tokenize_stream(file)), parser_class=parser_class)
+    interpreter = ENGINES[engine](statement_parser.environment, **(engine_options or {}))
+    optimizer = Optimizer(statement_parser.environment, optimization_level)
+    for statement in statement_parser.iter_parse():
+        interpreter.interpret(optimizer.optimize([statement]))
+    return statement_parser.get_store(), statement_parser.get_clean_store()
 
-    with open(file_name) as f:
-        program_string = f.read()
 
-    store, ev_store = execute(program_string)
-    print(ev_store)
+def execute_file(file_name: str, parser_class: Type[Parser] = Parser, cache: Optional[AstCache] = None,
+                 engine: str = "tree", code_cache: Optional[CodeCache] = None,
+                 engine_options: Optional[Dict[str, Any]] = None, optimization_level: int = NO_OPTIMIZATION,
+                 verify: bool = False):
+    """
+    :param code_cache: the cache of the transpiled code of the python engine
+    :param engine_options: the keyword arguments of the engine, like the threshold of the tiered engine
+    :param optimization_level: one of the OPTIMIZATION_LEVELS of the optimizer
+    :param verify: check the types before running the program and skip the verified runtime checks
+    """
+    with open(file_name) as f:
+        source = f.read()
+    statement_parser = parse_program(source, file_name, parser_class=parser_class, cache=cache)
+    optimize(statement_parser, optimization_level)
+    if verify:
+        TypeChecker(statement_parser.environment).check(statement_parser.statements)
+    if engine == "python":
+        interpreter = PythonEngine(statement_parser.environment, code_cache, file_name, source)
+    else:
+        interpreter = ENGINES[engine](statement_parser.environment, **(engine_options or {}))
+    interpreter.interpret(statement_parser.statements)
+    return statement_parser.get_store(), statement_parser.get_clean_store()
 
 
+def compile_file(file_name: str, code_cache: CodeCache, parser_class: Type[Parser] = Parser,
+                 cache: Optional[AstCache] = None, optimization_level: int = NO_OPTIMIZATION) -> str:
+    """
+    Transpiles the program to python and caches the compiled code, without running it.
+    :return: the path of the cached code
+    """
+    with open(file_name) as f:
+        source = f.read()
+    statement_parser = parse_program(source, file_name, parser_class=parser_class, cache=cache)
+    optimize(statement_parser, optimization_level)
+    PythonEngine(statement_parser.environment, code_cache, file_name, source).compile(statement_parser.statements)
+    return code_cache.path_for(file_name)
+
+
+def dump_file(file_name: str, optimization_level: int, parser_class: Type[Parser] = Parser,
+              cache: Optional[AstCache] = None) -> str:
+    """
+    :return: the optimized statements of the program, without running it
+    """
+    with open(file_name) as f:
+        source = f.read()
+    statement_parser = parse_program(source, file_name, parser_class=parser_class, cache=cache)
+    return dump(optimize(statement_parser, optimization_level))
 
 
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Runs a Titanite program.")
+    arg_parser.add_argument("file", nargs="?", default="program.ti", help="the Titanite program (default: program.ti)")
+    arg_parser.add_argument("--stream", action="store_true",
+                            help="read, parse and execute the program statement by statement")
+    arg_parser.add_argument("--parser", choices=PARSERS.keys(), default="descent",
+                            help="the expression parser: recursive descent or pratt (default: descent)")
+    arg_parser.add_argument("--engine", choices=ENGINES.keys(), default="tree",
+                            help="execute the program by walking the tree, on the bytecode vm, as compiled closures "
+                                 "or transpiled to python. The tiered engine walks the tree and compiles hot functions "
+                                 "and loops (default: tree)")
+    arg_parser.add_argument("--tier-threshold", type=int, default=DEFAULT_THRESHOLD,
+                            help=f"the number of calls or loop iterations after which the tiered engine compiles a "
+                                 f"function or loop (default: {DEFAULT_THRESHOLD})")
+    arg_parser.add_argument("--trace-tiering", action="store_true",
+                            help="print the functions and loops compiled by the tiered engine and the compile time")
+    arg_parser.add_argument("--max-depth", type=int, default=DEFAULT_MAX_DEPTH,
+                            help="the maximum number of nested function calls on the vm, which does not use the python "
+                                 f"stack for calls (default: {DEFAULT_MAX_DEPTH})")
+    arg_parser.add_argument("--compile", action="store_true",
+                            help="transpile the program to python and cache the code for the python engine, without "
+                                 "running it")
+    arg_parser.add_argument("-O", dest="optimization_level", type=int, nargs="?", choices=OPTIMIZATION_LEVELS,
+                            default=NO_OPTIMIZATION, const=ELIMINATE_DEAD_BRANCHES,
+                            help="the optimization level: 1 folds constant expressions, 2 also removes dead branches "
+                                 f"(default: {NO_OPTIMIZATION}, -O alone: {ELIMINATE_DEAD_BRANCHES})")
+    arg_parser.add_argument("--verify", action="store_true",
+                            help="check the types of the whole program before running it, report all type errors and "
+                                 "skip the runtime checks the type checker verified")
+    arg_parser.add_argument("--dump-optimized", action="store_true",
+                            help="print the optimized statements instead of running the program")
+    arg_parser.add_argument("--no-cache", action="store_true",
+                            help="always parse and transpile the program, ignore the ast and code cache")
+    arg_parser.add_argument("--cache-dir", default=None,
+                            help="the directory of the caches (default: __ticache__ next to the program)")
+    arg_parser.add_argument("--cache-stats", action="store_true", help="print the cache hits and misses")
+    args = arg_parser.parse_args()
+    if args.verify and args.stream:
+        arg_parser.error("--verify checks the whole program, it cannot be combined with --stream")
+
+    engine_options = {}
+    if args.engine == "tiered":
+        engine_options = {"threshold": args.tier_threshold, "trace": sys.stderr if args.trace_tiering else None}
+    elif args.engine == "vm":
+        engine_options = {"max_depth": args.max_depth}
+    ast_cache = None if args.no_cache else AstCache(args.cache_dir)
+    code_cache = None if args.no_cache else CodeCache(args.cache_dir)
+    if args.dump_optimized:
+        print(dump_file(args.file, args.optimization_level, parser_class=PARSERS[args.parser], cache=ast_cache))
+    elif args.compile:
+        print(compile_file(args.file, code_cache or CodeCache(args.cache_dir), parser_class=PARSERS[args.parser],
+                           cache=ast_cache, optimization_level=args.optimization_level))
+    elif args.stream:
+        with open(args.file) as f:
+            store, ev_store = execute_stream(f, parser_class=PARSERS[args.parser], engine=args.engine,
+                                             engine_options=engine_options,
+                                             optimization_level=args.optimization_level)
+        print(ev_store)
+    else:
+        store, ev_store = execute_file(args.file, parser_class=PARSERS[args.parser], cache=ast_cache,
+                                       engine=args.engine, code_cache=code_cache, engine_options=engine_options,
+                                       optimization_level=args.optimization_level, verify=args.verify)
+        print(ev_store)
+    if args.cache_stats and ast_cache is not None:
+        print(ast_cache.statistics, file=sys.stderr)
+        print(code_cache.statistics, file=sys.stderr)
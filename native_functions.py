@@ -1,10 +1,14 @@
 from abc import ABC
 from typing import List, Any
 
-from classes import NativeFunctionStatement
+from classes import NativeFunctionStatement, StaticType
 
 
 class ModStatementFunction(NativeFunctionStatement):
+    pure = True
+    parameter_types = [StaticType.INT, StaticType.INT]
+    return_type = StaticType.INT
+
     def __init__(self):
         self.name = "mod"
         self.arity = 2
@@ -18,6 +22,11 @@ class ModStatementFunction(NativeFunctionStatement):
 
 
 class PowStatementFunction(NativeFunctionStatement):
+    pure = True
+    parameter_types = [StaticType.INT, StaticType.INT]
+    # negative exponents give a double
+    return_type = StaticType.ANY
+
     def __init__(self):
         self.name = "pow"
         self.arity = 2
@@ -40,6 +49,9 @@ def _check_types(function_name: str, arity: int, arguments: List[Any], types: Li
 
 
 class NumsStatementFunction(NativeFunctionStatement):
+    parameter_types = [StaticType.INT, StaticType.INT]
+    return_type = StaticType.LIST
+
     def __init__(self):
         self.name = "nums"
         self.arity = 2
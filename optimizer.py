@@ -0,0 +1,243 @@
+from typing import List, Optional
+
+from classes import Environment, Statement, Expr, BlockStatement, IfStatement, WhileStatement, PrintStatement, \
+    ExpressionStatement, FunctionStatement, ReturnStatement, VariableStatement, ArrayExpr, ArrayIndexExpr, AssignExpr, \
+    CallExpr, LogicExpr, BinaryExpr, UnaryExpr, LiteralExpr, IdentifierExpr, GroupingExpr, NativeFunctionStatement, \
+    BreakStatement, ContinueStatement
+from lexer import TokenType
+
+# no optimizations
+NO_OPTIMIZATION = 0
+# folds the constant expressions and the calls of pure native functions with constant arguments
+FOLD_CONSTANTS = 1
+# also removes the branches of if and while statements which can never run
+ELIMINATE_DEAD_BRANCHES = 2
+
+OPTIMIZATION_LEVELS = [NO_OPTIMIZATION, FOLD_CONSTANTS, ELIMINATE_DEAD_BRANCHES]
+
+# the types of the values which can be folded into a literal
+CONSTANT_TYPES = (bool, int, float, str)
+
+
+def is_constant(expr: Expr) -> bool:
+    return isinstance(expr, LiteralExpr) and isinstance(expr.literal, CONSTANT_TYPES)
+
+
+class Optimizer:
+    """
+    Rewrites the resolved statements before they are interpreted. Expressions are only folded if evaluating them
+    succeeds, expressions which raise an error are kept so the error is raised when the program runs. The bodies of
+    the functions are optimized in place, because the engines get the functions from the environment.
+    """
+
+    def __init__(self, environment: Environment, level: int = ELIMINATE_DEAD_BRANCHES):
+        """
+        :param environment: the global environment, the native functions are looked up in it
+        :param level: one of OPTIMIZATION_LEVELS
+        """
+        self.environment = environment
+        self.level = level
+
+    def optimize(self, statements: List[Statement]) -> List[Statement]:
+        if self.level == NO_OPTIMIZATION:
+            return statements
+        return self.optimize_statements(statements)
+
+    def optimize_statements(self, statements: List[Statement]) -> List[Statement]:
+        optimized = []
+        for statement in statements:
+            if statement is None:
+                # struct declarations are not parsed into statements yet
+                optimized.append(statement)
+                continue
+            statement = _STATEMENT_OPTIMIZERS[type(statement)](self, statement)
+            if statement is not None:
+                optimized.append(statement)
+        return optimized
+
+    ##########################################################################
+    # Statements
+    ##########################################################################
+
+    def optimize_block(self, block: BlockStatement) -> BlockStatement:
+        block.block = self.optimize_statements(block.block)
+        return block
+
+    def optimize_if(self, statement: IfStatement) -> Optional[Statement]:
+        statement.cond = self.optimize_expr(statement.cond)
+        self.optimize_block(statement.if_branch)
+        statement.elif_branches = [(self.optimize_expr(condition), self.optimize_block(branch))
+                                   for condition, branch in statement.elif_branches]
+        if statement.else_branch is not None:
+            self.optimize_block(statement.else_branch)
+        if self.level < ELIMINATE_DEAD_BRANCHES:
+            return statement
+
+        # the branches are chosen by the truthiness of the condition
+        branches = [(statement.cond, statement.if_branch)] + statement.elif_branches
+        while branches and is_constant(branches[0][0]):
+            condition, branch = branches.pop(0)
+            if condition.literal:
+                return branch
+        branches = [(condition, branch) for condition, branch in branches
+                    if not is_constant(condition) or condition.literal]
+        if not branches:
+            return statement.else_branch
+        # a constant true condition after the first branch makes the following branches unreachable
+        for index, (condition, branch) in enumerate(branches):
+            if is_constant(condition):
+                return IfStatement(branches[0][0], branches[0][1], branch, branches[1:index])
+        return IfStatement(branches[0][0], branches[0][1], statement.else_branch, branches[1:])
+
+    def optimize_while(self, statement: WhileStatement) -> Optional[Statement]:
+        statement.cond = self.optimize_expr(statement.cond)
+        self.optimize_block(statement.while_body)
+        if self.level >= ELIMINATE_DEAD_BRANCHES and is_constant(statement.cond) and statement.cond.literal is False:
+            return None
+        return statement
+
+    def optimize_nothing(self, statement: Statement) -> Statement:
+        return statement
+
+    def optimize_print(self, statement: PrintStatement) -> Statement:
+        statement.expr = self.optimize_expr(statement.expr)
+        return statement
+
+    def optimize_expression_statement(self, statement: ExpressionStatement) -> Statement:
+        statement.expr = self.optimize_expr(statement.expr)
+        return statement
+
+    def optimize_function(self, function: FunctionStatement) -> Statement:
+        self.optimize_block(function.body)
+        return function
+
+    def optimize_return(self, statement: ReturnStatement) -> Statement:
+        if statement.expr is not None:
+            statement.expr = self.optimize_expr(statement.expr)
+        return statement
+
+    def optimize_variable(self, statement: VariableStatement) -> Statement:
+        statement.expr = self.optimize_expr(statement.expr)
+        return statement
+
+    ##########################################################################
+    # Expressions
+    ##########################################################################
+
+    def optimize_expr(self, expr: Expr) -> Expr:
+        return _EXPR_OPTIMIZERS[type(expr)](self, expr)
+
+    def fold(self, expr: Expr) -> Expr:
+        """
+        Replaces the expression by its value if the value is a constant
+        """
+        try:
+            value = expr.evaluate(self.environment)
+        except Exception:
+            return expr
+        if not isinstance(value, CONSTANT_TYPES):
+            return expr
+        return LiteralExpr(value)
+
+    def optimize_array(self, expr: ArrayExpr) -> Expr:
+        expr.expressions = [self.optimize_expr(element) for element in expr.expressions]
+        return expr
+
+    def optimize_array_index(self, expr: ArrayIndexExpr) -> Expr:
+        expr.index_expr = self.optimize_expr(expr.index_expr)
+        return expr
+
+    def optimize_assign(self, expr: AssignExpr) -> Expr:
+        expr.value = self.optimize_expr(expr.value)
+        return expr
+
+    def optimize_call(self, expr: CallExpr) -> Expr:
+        expr.arguments = [self.optimize_expr(argument) for argument in expr.arguments]
+        callee = expr.callee_name
+        if not isinstance(callee, IdentifierExpr) or callee.slot is not None \
+                or not all(is_constant(argument) for argument in expr.arguments):
+            return expr
+        entry = self.environment.environment.get(callee.identifier)
+        if entry is None or not isinstance(entry[1], NativeFunctionStatement) or not entry[1].pure:
+            return expr
+        return self.fold(expr)
+
+    def optimize_logic(self, expr: LogicExpr) -> Expr:
+        expr.expr = self.optimize_expr(expr.expr)
+        expr.right = self.optimize_expr(expr.right)
+        left = expr.expr
+        if not is_constant(left) or not isinstance(left.literal, bool):
+            return expr
+        # the right operand is not evaluated if the left one decides the result, otherwise it is the result
+        if expr.logic_operator == TokenType.AND:
+            return expr.right if left.literal else left
+        if expr.logic_operator == TokenType.OR:
+            return left if left.literal else expr.right
+        return expr
+
+    def optimize_binary(self, expr: BinaryExpr) -> Expr:
+        expr.expr = self.optimize_expr(expr.expr)
+        expr.right = self.optimize_expr(expr.right)
+        if is_constant(expr.expr) and is_constant(expr.right):
+            return self.fold(expr)
+        return expr
+
+    def optimize_unary(self, expr: UnaryExpr) -> Expr:
+        expr.right = self.optimize_expr(expr.right)
+        if is_constant(expr.right):
+            return self.fold(expr)
+        return expr
+
+    def optimize_literal(self, expr: LiteralExpr) -> Expr:
+        return expr
+
+    def optimize_identifier(self, expr: IdentifierExpr) -> Expr:
+        return expr
+
+    def optimize_grouping(self, expr: GroupingExpr) -> Expr:
+        if expr.expr is None:
+            return expr
+        return self.optimize_expr(expr.expr)
+
+
+def dump(statements: List[Statement]) -> str:
+    """
+    The statements and the bodies of the functions, one statement per line
+    """
+    lines = []
+    for statement in statements:
+        if isinstance(statement, FunctionStatement):
+            parameters = ", ".join(f"{parameter_type.value.lower()} {name.value}" for parameter_type, name in
+                                   statement.parameters)
+            lines.append(f"fun {statement.name}({parameters})")
+            lines.extend(f"    {body_statement}" for body_statement in statement.body.block)
+        else:
+            lines.append(str(statement))
+    return "\n".join(lines)
+
+
+_STATEMENT_OPTIMIZERS = {
+    BlockStatement: Optimizer.optimize_block,
+    IfStatement: Optimizer.optimize_if,
+    WhileStatement: Optimizer.optimize_while,
+    BreakStatement: Optimizer.optimize_nothing,
+    ContinueStatement: Optimizer.optimize_nothing,
+    PrintStatement: Optimizer.optimize_print,
+    ExpressionStatement: Optimizer.optimize_expression_statement,
+    FunctionStatement: Optimizer.optimize_function,
+    ReturnStatement: Optimizer.optimize_return,
+    VariableStatement: Optimizer.optimize_variable,
+}
+
+_EXPR_OPTIMIZERS = {
+    ArrayExpr: Optimizer.optimize_array,
+    ArrayIndexExpr: Optimizer.optimize_array_index,
+    AssignExpr: Optimizer.optimize_assign,
+    CallExpr: Optimizer.optimize_call,
+    LogicExpr: Optimizer.optimize_logic,
+    BinaryExpr: Optimizer.optimize_binary,
+    UnaryExpr: Optimizer.optimize_unary,
+    LiteralExpr: Optimizer.optimize_literal,
+    IdentifierExpr: Optimizer.optimize_identifier,
+    GroupingExpr: Optimizer.optimize_grouping,
+}
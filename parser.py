@@ -1,6 +1,6 @@
 from lexer import Token, TokenType, TokenObject
-from errors import ParserError
-from typing import List
+from errors import ParserError, LexerError
+from typing import Dict, List, Optional, Tuple
 from classes import VariableStatement, AssignExpr, BinaryExpr, UnaryExpr, IdentifierExpr, LiteralExpr, GroupingExpr, \
     LogicExpr, CallExpr, ArrayIndexExpr, Expr, ArrayExpr
 
@@ -10,10 +10,14 @@ class Parser:
     This parser
     """
 
-    def __init__(self, tokens: List[TokenObject]):
+    def __init__(self, tokens: List[TokenObject], index: int = 0):
+        """
+        :param tokens: the tokens, they are only read and never copied, so the parser can share them (and the cursor
+                       index) with the statement parser
+        :param index: the index of the first token of the expression
+        """
         self.tokens = tokens
-        self.index: int = 0
-        self.length_of_expr = 0
+        self.index: int = index
 
     def __repr__(self):
         return f"Parser(tokens={self.tokens})"
@@ -22,11 +26,9 @@ class Parser:
         return self.expression()
 
     def advance(self):
-        if self.index < len(self.tokens) - 1:
+        # the tokens always end with an EOF token, the parser never moves past it
+        if self.tokens[self.index].token.type != TokenType.EOF:
             self.index += 1
-            self.length_of_expr += 1
-        else:
-            self.length_of_expr += 1
 
     def current_token_type_is(self, token_obj: TokenObject):
         return self.tokens[self.index].token.type == token_obj.token.type
@@ -226,8 +228,10 @@ class Parser:
             else:
                 self.advance()
                 return GroupingExpr(expr)
+        elif self.current_token_type == TokenType.ERROR:
+            raise LexerError(self.current_token.value, self.current_location)
         else:
-            raise ParserError(f"Expected an expression. Got {self.current_token}")
+            raise ParserError(f"Expected an expression. Got {self.current_token}", self.current_location)
 
     def arguments(self):
         """
@@ -245,12 +249,16 @@ class Parser:
         if self.current_token_type == token_type:
             self.advance()
             return True
-        raise ParserError(error)
+        raise ParserError(error, self.current_location)
 
     @property
     def current_token(self):
         return self.tokens[self.index].token
 
+    @property
+    def current_location(self):
+        return self.tokens[self.index].location_info
+
     def match_types(self, token_types: List[TokenType]) -> bool:
         """
         Returns true if the current token is one of token in the params
@@ -262,3 +270,189 @@ class Parser:
                 self.advance()
                 return True
         return False
+
+
+# Binding powers of the infix operators as (left binding power, right binding power). An operator only takes the
+# expression on its left if its left binding power is at least the right binding power of the operator before it. A
+# right binding power above the left one makes the operator left associative, the assignment is right associative.
+BINDING_POWERS: Dict[TokenType, Tuple[int, int]] = {
+    TokenType.ASSIGNMENT: (1, 1),
+    TokenType.OR: (2, 3),
+    TokenType.AND: (3, 4),
+    TokenType.EQUALS: (4, 5),
+    TokenType.NOT_EQUALS: (4, 5),
+    TokenType.GREATER: (5, 6),
+    TokenType.GREATER_EQUALS: (5, 6),
+    TokenType.LESSER: (5, 6),
+    TokenType.LESSER_EQUALS: (5, 6),
+    TokenType.MINUS: (6, 7),
+    TokenType.PLUS: (6, 7),
+    TokenType.DIV: (7, 8),
+    TokenType.MUL: (7, 8),
+}
+# hashing the name is a lot cheaper than hashing the enum member
+_BINDING_POWERS_BY_NAME: Dict[str, Tuple[int, int]] = {token_type._name_: powers
+                                                       for token_type, powers in BINDING_POWERS.items()}
+
+# kinds of the contexts on the stack of the pratt parser, which wait for an operand
+_UNARY = 0
+_BINARY = 1
+_GROUPING = 2
+_ARRAY_INDEX = 3
+_ARRAY = 4
+_CALL = 5
+
+# what the pratt parser expects next
+_PREFIX = 0
+_PRIMARY_DONE = 1
+_OPERAND_DONE = 2
+
+
+class PrattParser(Parser):
+    """
+    Parses expressions with the binding powers of BINDING_POWERS instead of one method per precedence level, but builds
+    the same trees as Parser. Operators and brackets which wait for their operand are kept on an explicit stack instead
+    of the Python stack, so deeply nested expressions do not hit the recursion limit.
+    """
+
+    def expression(self):
+        tokens = self.tokens
+        # every context is a list of its kind, the binding power to restore when it is done and its parts
+        stack: List[list] = []
+        min_power = 0
+        expr = None
+        state = _PREFIX
+        while True:
+            if state == _PREFIX:
+                expr = self.primary_start(stack, min_power)
+                if expr is None:
+                    # an opening bracket was read, its content starts a new expression
+                    min_power = 0
+                    continue
+                state = _PRIMARY_DONE
+            if state == _PRIMARY_DONE:
+                if stack and stack[-1][0] == _UNARY:
+                    _, min_power, operator = stack.pop()
+                    expr = UnaryExpr(operator, expr)
+                else:
+                    # call → primary ( "(" arguments? ")" )*
+                    opened_call = False
+                    while tokens[self.index].token.type == TokenType.LEFT_BRACKET:
+                        self.advance()
+                        if tokens[self.index].token.type != TokenType.RIGHT_BRACKET:
+                            opened_call = True
+                            break
+                        self.advance()
+                        expr = CallExpr(expr, TokenType.RIGHT_BRACKET, [])
+                    if opened_call:
+                        stack.append([_CALL, min_power, expr, []])
+                        min_power = 0
+                        state = _PREFIX
+                        continue
+                state = _OPERAND_DONE
+
+            token_type = tokens[self.index].token.type
+            powers = _BINDING_POWERS_BY_NAME.get(token_type._name_)
+            if powers is not None and powers[0] >= min_power:
+                stack.append([_BINARY, min_power, expr, token_type])
+                self.advance()
+                min_power = powers[1]
+                state = _PREFIX
+                continue
+            # the expression of the innermost context is finished
+            if not stack:
+                return expr
+            context = stack.pop()
+            kind = context[0]
+            min_power = context[1]
+            if kind == _BINARY:
+                expr = self.combine(context[2], context[3], expr)
+            elif kind == _GROUPING:
+                if tokens[self.index].token.type != TokenType.RIGHT_BRACKET:
+                    raise ParserError("No right parenthesis found.")
+                self.advance()
+                expr = GroupingExpr(expr)
+                state = _PRIMARY_DONE
+            elif kind == _ARRAY_INDEX:
+                self.consume(TokenType.RIGHT_CORNERED_BRACKET, "Expected ']' at the end of the index expression.")
+                expr = ArrayIndexExpr(identifier=context[2], index_expr=expr)
+                state = _PRIMARY_DONE
+            elif kind == _ARRAY:
+                context[2].append(expr)
+                if self.match_types([TokenType.COMMA]):
+                    stack.append(context)
+                    min_power = 0
+                    state = _PREFIX
+                else:
+                    self.consume(TokenType.RIGHT_CORNERED_BRACKET, "Expected ']' as the ending of the list.")
+                    expr = ArrayExpr(expressions=context[2])
+                    state = _PRIMARY_DONE
+            else:
+                arguments = context[3]
+                arguments.append(expr)
+                if tokens[self.index].token.type == TokenType.COMMA:
+                    self.advance()
+                    if len(arguments) > 255:
+                        raise ParserError("Cannot have more than 255 arguments.")
+                    stack.append(context)
+                    min_power = 0
+                    state = _PREFIX
+                else:
+                    self.consume(TokenType.RIGHT_BRACKET, "Expected ')' for closing the arguments section.")
+                    expr = CallExpr(context[2], TokenType.RIGHT_BRACKET, arguments)
+                    state = _PRIMARY_DONE
+
+    def primary_start(self, stack: List[list], min_power: int) -> Optional[Expr]:
+        """
+        Reads a primary, possibly behind a unary operator. If the primary starts with an opening bracket, a context for
+        it is pushed on the stack and None is returned.
+        """
+        tokens = self.tokens
+        token_type = tokens[self.index].token.type
+        # the operand of a unary operator is a primary, so "- -1" is not allowed
+        if (token_type == TokenType.NOT or token_type == TokenType.MINUS) and not (stack and stack[-1][0] == _UNARY):
+            self.advance()
+            stack.append([_UNARY, min_power, token_type])
+            token_type = tokens[self.index].token.type
+        if token_type == TokenType.IDENTIFIER:
+            identifier = self.current_token.value
+            self.advance()
+            if not self.match_types([TokenType.LEFT_CORNERED_BRACKET]):
+                return IdentifierExpr(identifier)
+            stack.append([_ARRAY_INDEX, min_power, identifier])
+        elif token_type == TokenType.LEFT_CORNERED_BRACKET:
+            self.advance()
+            if self.match_types([TokenType.RIGHT_CORNERED_BRACKET]):
+                return ArrayExpr(expressions=[])
+            stack.append([_ARRAY, min_power, []])
+        elif token_type == TokenType.LEFT_BRACKET:
+            self.advance()
+            stack.append([_GROUPING, min_power])
+        elif token_type in (TokenType.INT, TokenType.DOUBLE, TokenType.STRING, TokenType.BOOLEAN) and \
+                self.current_token.value is not None:
+            literal_expr = LiteralExpr(self.current_token.value)
+            self.advance()
+            return literal_expr
+        elif token_type == TokenType.TRUE:
+            self.advance()
+            return LiteralExpr(True)
+        elif token_type == TokenType.FALSE:
+            self.advance()
+            return LiteralExpr(False)
+        elif token_type == TokenType.ERROR:
+            raise LexerError(self.current_token.value, self.current_location)
+        else:
+            raise ParserError(f"Expected an expression. Got {self.current_token}", self.current_location)
+        return None
+
+    @staticmethod
+    def combine(left: Expr, operator: TokenType, right: Expr) -> Expr:
+        if operator == TokenType.ASSIGNMENT:
+            if isinstance(left, VariableStatement):
+                return AssignExpr(left.name, right)
+            elif isinstance(left, IdentifierExpr):
+                return AssignExpr(left.identifier, right)
+            raise ParserError(f"Invalid assignment target. Was an {type(left)}")
+        if operator == TokenType.AND or operator == TokenType.OR:
+            return LogicExpr(left, operator, right)
+        return BinaryExpr(left, operator, right)
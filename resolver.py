@@ -0,0 +1,209 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from classes import Statement, Expr, StaticType, BlockStatement, IfStatement, WhileStatement, PrintStatement, \
+    ExpressionStatement, FunctionStatement, ReturnStatement, VariableStatement, ArrayExpr, ArrayIndexExpr, AssignExpr, \
+    CallExpr, LogicExpr, BinaryExpr, UnaryExpr, LiteralExpr, IdentifierExpr, GroupingExpr, BreakStatement, \
+    ContinueStatement, convert_token_type_to_static_type
+from errors import ParserError
+
+# the depth of variables which are not in a local scope, they are looked up by name in the global environment
+GLOBAL_DEPTH = -1
+
+# a local scope maps the variable names to their slot and their static type
+Scope = Dict[str, Tuple[int, StaticType]]
+
+
+class Resolver:
+    """
+    Resolves every variable of the program statically. Variables declared in a block or a function are stored in
+    slots of their environment: the resolver annotates each use of a local variable with the depth (the number of
+    environments between the use and the declaration) and the slot of the variable. Global variables keep being
+    stored by name.
+
+    The resolver also forbids redeclaring and shadowing variables, so the environments don't have to check this on
+    every declaration, and break and continue statements outside of loops.
+    """
+
+    def __init__(self, global_names: Iterable[str] = ()):
+        """
+        :param global_names: the already declared global variables, e.g. the native functions
+        """
+        self.global_names = set(global_names)
+        self.scopes: List[Scope] = []
+        self.in_function = False
+        # the number of loops around the current statement inside of the current function
+        self.loop_depth = 0
+
+    def resolve(self, statements: List[Statement]) -> List[Statement]:
+        for statement in statements:
+            self.resolve_statement(statement)
+        return statements
+
+    def resolve_statement(self, statement: Statement):
+        if statement is None:
+            # struct declarations are not parsed into statements yet
+            return
+        _STATEMENT_RESOLVERS[type(statement)](self, statement)
+
+    def resolve_expr(self, expr: Expr):
+        _EXPR_RESOLVERS[type(expr)](self, expr)
+
+    def declare(self, name: str, static_type: StaticType) -> Optional[int]:
+        """
+        :return: the slot of the variable, None for global variables
+        """
+        if self.is_declared(name):
+            raise ParserError(f"Variable {name} was already declared. Cannot redeclare the variable.")
+        if not self.scopes:
+            self.global_names.add(name)
+            return None
+        scope = self.scopes[-1]
+        slot = len(scope)
+        scope[name] = (slot, static_type)
+        return slot
+
+    def is_declared(self, name: str) -> bool:
+        return name in self.global_names or any(name in scope for scope in self.scopes)
+
+    def lookup(self, name: str) -> Tuple[int, Optional[int], Optional[StaticType]]:
+        """
+        :return: the depth, the slot and the static type of the variable, variables which are not declared in a local
+        scope are global
+        """
+        for depth, scope in enumerate(reversed(self.scopes)):
+            if name in scope:
+                slot, static_type = scope[name]
+                return depth, slot, static_type
+        return GLOBAL_DEPTH, None, None
+
+    def resolve_block(self, block: BlockStatement):
+        self.scopes.append({})
+        try:
+            for statement in block.block:
+                self.resolve_statement(statement)
+        finally:
+            block.slot_count = len(self.scopes.pop())
+
+    def resolve_if(self, statement: IfStatement):
+        self.resolve_expr(statement.cond)
+        self.resolve_block(statement.if_branch)
+        for elif_condition, elif_branch in statement.elif_branches:
+            self.resolve_expr(elif_condition)
+            self.resolve_block(elif_branch)
+        if statement.else_branch is not None:
+            self.resolve_block(statement.else_branch)
+
+    def resolve_while(self, statement: WhileStatement):
+        self.resolve_expr(statement.cond)
+        self.loop_depth += 1
+        try:
+            self.resolve_block(statement.while_body)
+        finally:
+            self.loop_depth -= 1
+
+    def resolve_break(self, statement: BreakStatement):
+        if self.loop_depth == 0:
+            raise ParserError("Cannot use break outside of a loop.")
+
+    def resolve_continue(self, statement: ContinueStatement):
+        if self.loop_depth == 0:
+            raise ParserError("Cannot use continue outside of a loop.")
+
+    def resolve_expr_statement(self, statement):
+        if statement.expr is not None:
+            self.resolve_expr(statement.expr)
+
+    def resolve_function(self, function: FunctionStatement):
+        """
+        Functions are global, their body only sees the globals, the parameters and its own variables. The parameters
+        and the top level variables of the body share one environment.
+        """
+        if self.is_declared(function.name):
+            raise ParserError(f"Variable {function.name} was already declared. Cannot redeclare the variable.")
+        self.global_names.add(function.name)
+        enclosing_scopes, enclosing_loop_depth = self.scopes, self.loop_depth
+        self.scopes = [{}]
+        self.in_function = True
+        self.loop_depth = 0
+        try:
+            for var_type, name_token in function.parameters:
+                self.declare(name_token.value, convert_token_type_to_static_type(var_type))
+            for statement in function.body.block:
+                self.resolve_statement(statement)
+            function.frame_size = len(self.scopes[0])
+        finally:
+            self.scopes, self.loop_depth = enclosing_scopes, enclosing_loop_depth
+            self.in_function = False
+
+    def resolve_return(self, statement: ReturnStatement):
+        self.resolve_expr_statement(statement)
+        # a call whose result is returned directly is a tail call, the function can be replaced by the called one
+        expr = statement.expr
+        while isinstance(expr, GroupingExpr):
+            expr = expr.expr
+        statement.tail_call = expr if self.in_function and isinstance(expr, CallExpr) else None
+
+    def resolve_variable(self, statement: VariableStatement):
+        self.resolve_expr(statement.expr)
+        statement.static_type = convert_token_type_to_static_type(statement.var_type)
+        statement.slot = self.declare(statement.name, statement.static_type)
+
+    def resolve_nothing(self, expr: Expr):
+        pass
+
+    def resolve_array(self, expr: ArrayExpr):
+        for element in expr.expressions:
+            self.resolve_expr(element)
+
+    def resolve_array_index(self, expr: ArrayIndexExpr):
+        self.resolve_expr(expr.index_expr)
+        expr.depth, expr.slot, _ = self.lookup(expr.identifier)
+
+    def resolve_assign(self, expr: AssignExpr):
+        self.resolve_expr(expr.value)
+        expr.depth, expr.slot, expr.static_type = self.lookup(expr.name)
+
+    def resolve_call(self, expr: CallExpr):
+        self.resolve_expr(expr.callee_name)
+        for argument in expr.arguments:
+            self.resolve_expr(argument)
+
+    def resolve_binary(self, expr):
+        self.resolve_expr(expr.expr)
+        self.resolve_expr(expr.right)
+
+    def resolve_unary(self, expr: UnaryExpr):
+        self.resolve_expr(expr.right)
+
+    def resolve_identifier(self, expr: IdentifierExpr):
+        expr.depth, expr.slot, _ = self.lookup(expr.identifier)
+
+    def resolve_grouping(self, expr: GroupingExpr):
+        self.resolve_expr(expr.expr)
+
+
+_STATEMENT_RESOLVERS = {
+    BlockStatement: Resolver.resolve_block,
+    IfStatement: Resolver.resolve_if,
+    WhileStatement: Resolver.resolve_while,
+    BreakStatement: Resolver.resolve_break,
+    ContinueStatement: Resolver.resolve_continue,
+    PrintStatement: Resolver.resolve_expr_statement,
+    ExpressionStatement: Resolver.resolve_expr_statement,
+    ReturnStatement: Resolver.resolve_return,
+    FunctionStatement: Resolver.resolve_function,
+    VariableStatement: Resolver.resolve_variable,
+}
+
+_EXPR_RESOLVERS = {
+    ArrayExpr: Resolver.resolve_array,
+    ArrayIndexExpr: Resolver.resolve_array_index,
+    AssignExpr: Resolver.resolve_assign,
+    CallExpr: Resolver.resolve_call,
+    LogicExpr: Resolver.resolve_binary,
+    BinaryExpr: Resolver.resolve_binary,
+    UnaryExpr: Resolver.resolve_unary,
+    LiteralExpr: Resolver.resolve_nothing,
+    IdentifierExpr: Resolver.resolve_identifier,
+    GroupingExpr: Resolver.resolve_grouping,
+}
@@ -1,39 +1,69 @@
-from typing import List, Tuple, Dict, Any, Optional
+from typing import List, Tuple, Dict, Any, Iterator, Optional, Type, Union
 
 from classes import Environment, Statement, VariableStatement, PrintStatement, ExpressionStatement, BlockStatement, \
-    IfStatement, WhileStatement, FunctionStatement, NativeFunctionStatement, Expr, ReturnStatement
-from lexer import TokenType, Token, TokenObject
+    IfStatement, WhileStatement, FunctionStatement, NativeFunctionStatement, Expr, ReturnStatement, BreakStatement, \
+    ContinueStatement, execute_script
+from lexer import TokenType, Token, TokenObject, TokenBuffer
 from native_functions import ModStatementFunction, PowStatementFunction, NumsStatementFunction
 from parser import Parser, ParserError
+from resolver import Resolver
 
 
 class StatementParser:
-    def __init__(self, tokens: List[TokenObject]):
+    def __init__(self, tokens: Union[List[TokenObject], TokenBuffer], parser_class: Type[Parser] = Parser):
+        """
+        :param tokens: the tokens of the program, ending with the EOF token
+        :param parser_class: the expression parser, Parser or PrattParser
+        """
         self.tokens = tokens
         self.index = 0
         self.statements: List[Statement] = []
         self.environment = Environment()
         self.add_native_functions()
+        self.resolver = Resolver(self.environment.store)
+        # the expression parser reads from the same tokens, its cursor is synced with self.index
+        self.expression_parser = parser_class(self.tokens)
 
     def parse(self) -> List[Statement]:
+        self.statements.extend(self.iter_parse())
+        return self.statements
+
+    def iter_parse(self) -> Iterator[Statement]:
+        """
+        Parses and resolves one top level statement at a time, only the tokens of the current statement are needed
+        for this.
+        """
         while not self.file_finished:
             statement = self.parse_declaration()
-            self.statements.append(statement)
+            self.resolver.resolve_statement(statement)
+            yield statement
 
+    def load_statements(self, statements: List[Statement]) -> List[Statement]:
+        """
+        Adds already parsed statements, e.g. from the ast cache. Their functions have to be declared already.
+        """
+        self.statements.extend(self.resolver.resolve(statements))
         return self.statements
 
     @property
     def file_finished(self):
-        return self.current_token_type == TokenType.EOF or self.index - 1 > len(self.tokens)
+        return self.current_token_type == TokenType.EOF
 
     def interpret(self) -> Dict[str, Any]:
         """
         The interpret function returns the variables stored in the environment, this is for testing better
         :return:
         """
-        for statement in self.statements:
-            statement.execute(self.environment)
+        execute_script(self.statements, self.environment)
+        return self.environment.evaluated_store
 
+    def interpret_stream(self) -> Dict[str, Any]:
+        """
+        Executes every top level statement directly after it was parsed, so the program starts running before all
+        of its tokens are lexed. Parse errors later in the program are only raised once the execution reaches them.
+        :return:
+        """
+        execute_script(self.iter_parse(), self.environment)
         return self.environment.evaluated_store
 
     def get_store(self):
@@ -92,6 +122,12 @@ class StatementParser:
             class_statement = self.struct_declaration()
         elif self.match(TokenType.RETURN):
             return self.return_statement()
+        elif self.match(TokenType.BREAK):
+            self.consume(TokenType.SEMICOLON, "Expected ';' after break.")
+            return BreakStatement()
+        elif self.match(TokenType.CONTINUE):
+            self.consume(TokenType.SEMICOLON, "Expected ';' after continue.")
+            return ContinueStatement()
         elif self.match(TokenType.LEFT_CURLY_BRACKET):
             return self.block()
         elif self.match(TokenType.IF):
@@ -106,15 +142,14 @@ class StatementParser:
             return ExpressionStatement(expr=expr)
 
     def expression(self):
-        next_tokens = self.tokens[self.index:]
-        parser = Parser(next_tokens)
-        value_of_variable = parser.parse()
-        self.index += parser.length_of_expr
+        self.expression_parser.index = self.index
+        value_of_variable = self.expression_parser.parse()
+        self.index = self.expression_parser.index
         return value_of_variable
 
     def block(self) -> BlockStatement:
         statements = []
-        while self.current_token.type != TokenType.RIGHT_CURLY_BRACKET and self.index < len(self.tokens):
+        while self.current_token.type != TokenType.RIGHT_CURLY_BRACKET and not self.file_finished:
             statements.append(self.parse_declaration())
         self.consume(TokenType.RIGHT_CURLY_BRACKET, "Expect '}' at the end of a block.")
         return BlockStatement(statements)
@@ -201,7 +236,7 @@ class StatementParser:
             current_token = self.current_token
             self.index += 1
             return current_token
-        raise ParserError(error)
+        raise ParserError(error, self.tokens[self.index].location_info)
 
     def consume_type(self) -> TokenType:
         if (token := self.matches([TokenType.INT, TokenType.STRING, TokenType.DOUBLE, TokenType.BOOLEAN])) is not None:
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+from ast_cache import AstCache, CACHE_MAGIC, encode, parse_program
+
+PROGRAM = """
+fun add(int x, int y) {
+    return x + y;
+}
+int a = add(1, 2);
+List b = [1, 2, a];
+int i = 0;
+while (i < 3) {
+    if (i == 1) { i = i + 1; } elif (i > 5) { write("never"); } else { i = i + 1; }
+}
+str c = "text";
+double d = -1.5;
+bool e = !(a > 2) || true;
+"""
+
+
+class AstCacheRoundTrip(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.source_path = os.path.join(self.directory.name, "program.ti")
+        self.cache = AstCache(os.path.join(self.directory.name, "cache"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_hit_gives_the_same_statements_and_result(self):
+        parsed = parse_program(PROGRAM, self.source_path, cache=self.cache)
+        loaded = parse_program(PROGRAM, self.source_path, cache=self.cache)
+        self.assertEqual((1, 1, 1), (self.cache.hits, self.cache.misses, self.cache.writes))
+        self.assertEqual(encode(parsed.statements), encode(loaded.statements))
+        parsed.interpret()
+        loaded.interpret()
+        for store in [parsed.get_clean_store(), loaded.get_clean_store()]:
+            self.assertEqual({"a": 3, "b": [1, 2, 3], "i": 3, "c": "text", "d": -1.5, "e": True},
+                             {name: store[name][1] for name in "abicde"})
+
+    def test_changed_source_is_stale(self):
+        parse_program(PROGRAM, self.source_path, cache=self.cache)
+        statement_parser = parse_program(PROGRAM + "int f = 1;", self.source_path, cache=self.cache)
+        self.assertEqual(1, self.cache.stale)
+        self.assertEqual(0, self.cache.hits)
+        self.assertEqual(1, statement_parser.interpret()["f"][1])
+        parse_program(PROGRAM + "int f = 1;", self.source_path, cache=self.cache)
+        self.assertEqual(1, self.cache.hits)
+
+    def test_corrupt_file_falls_back_to_parsing(self):
+        parse_program(PROGRAM, self.source_path, cache=self.cache)
+        for content in [b"garbage", CACHE_MAGIC + b"\x00\x01garbage"]:
+            with open(self.cache.path_for(self.source_path), "wb") as f:
+                f.write(content)
+            statement_parser = parse_program(PROGRAM, self.source_path, cache=self.cache)
+            self.assertEqual(3, statement_parser.interpret()["a"][1])
+        self.assertEqual(2, self.cache.corrupt)
+        # the corrupt file got replaced
+        parse_program(PROGRAM, self.source_path, cache=self.cache)
+        self.assertEqual(1, self.cache.hits)
@@ -0,0 +1,33 @@
+import unittest
+
+from classes import Environment
+from closure_compiler import ClosureCompiler
+from lexer import Lexer
+from parser import Parser
+from statements import StatementParser
+from tests.vm.vm_test import PROGRAMS, run
+
+
+class ClosuresMatchTreeWalker(unittest.TestCase):
+    def test_programs(self):
+        for program in PROGRAMS:
+            with self.subTest(program=program):
+                self.assertEqual(run(program, "tree"), run(program, "closure"))
+
+    def test_expressions(self):
+        for code in ["1 + 2 * 3", "(2/5)/(6/2)", "1- -(-1)", "!(1 == 2) && true", '"a" + "b"', "2 >= 3 || 1 <= 1"]:
+            with self.subTest(code=code):
+                lexer = Lexer(code)
+                lexer.run_lexer()
+                expr = Parser(lexer.get_token_objects()).parse()
+                self.assertEqual(expr.evaluate(Environment()), ClosureCompiler(Environment()).evaluate(expr))
+
+    def test_functions_are_compiled_once(self):
+        code = "fun f(int x) { return x + 1; } int a = f(1); int b = f(a);"
+        lexer = Lexer(code)
+        lexer.run_lexer()
+        statement_parser = StatementParser(lexer.get_token_objects())
+        compiler = ClosureCompiler(statement_parser.environment)
+        compiler.interpret(statement_parser.parse())
+        self.assertEqual(3, statement_parser.get_clean_store()["b"][1])
+        self.assertEqual(1, len(compiler.compiled_functions))
@@ -1,6 +1,10 @@
+import io
+import time
+import tracemalloc
 import unittest
 
-from lexer import TokenType, TokenObject, Token, is_allowed_identifier, Lexer
+from lexer import TokenType, TokenObject, Token, is_allowed_identifier, Lexer, LocationInformation, tokenize_stream, \
+    TokenBuffer, TokenStream
 from tests.lexer.lexer_snap_test import fizzbuzz_tokens
 
 
@@ -82,5 +86,123 @@ class Simple_Statements(unittest.TestCase):
         self.assertListEqual(tokens, fizzbuzz_tokens)
 
 
+class LexerLocations(unittest.TestCase):
+    def test_locations_over_multiple_lines(self):
+        lexer = Lexer('int a = 5;\nstr b = "x\ny";\n  write(b);')
+        lexer.run_lexer()
+        token_objects = lexer.get_token_objects()
+        self.assertEqual(LocationInformation(start_line=1, end_line=1, start_col=0, end_col=3),
+                         token_objects[0].location_info)
+        # the string spans two lines
+        self.assertEqual(Token(TokenType.STRING, "x\ny"), token_objects[8].token)
+        self.assertEqual(LocationInformation(start_line=2, end_line=3, start_col=8, end_col=2),
+                         token_objects[8].location_info)
+        self.assertEqual(Token(TokenType.WRITE), token_objects[10].token)
+        self.assertEqual(LocationInformation(start_line=4, end_line=4, start_col=2, end_col=7),
+                         token_objects[10].location_info)
+
+
+class TableDrivenLexer(unittest.TestCase):
+    @staticmethod
+    def step_lexer(code: str):
+        lexer = Lexer(code)
+        while lexer.index < len(lexer.code):
+            lexer.go_forward()
+        return lexer.get_token_objects()
+
+    def test_same_tokens_as_stepping_through_the_code(self):
+        programs = [
+            'int a = 5;\nwrite("Hello World!");\nbool b = (a >= 3) && true || !false;',
+            'fun foo(int a, double b) {\n\treturn a <= b != c == d;\n}\nList l = [1, 2.5, 3];',
+            'str s = "multi\nline" ; int x = l[0] / 2 * 3 - -1;',
+            '1.2.3 4. x 5.\n0.5 trueish falsey a & b | c @ d_e >=',
+            '"never ending\nstring',
+        ]
+        for program in programs:
+            lexer = Lexer(program)
+            lexer.run_lexer()
+            self.assertListEqual(self.step_lexer(program) + [lexer.get_token_objects()[-1]],
+                                 lexer.get_token_objects())
+
+
+class StreamingLexer(unittest.TestCase):
+    program = 'int abc = 1234;\nstr s = "a longer\nstring";\ndouble d = 12.5;\nbool b = abc >= 3 && s != "x";\n1.2.3 4.\n'
+
+    def test_tokens_are_split_over_chunks(self):
+        lexer = Lexer(self.program)
+        lexer.run_lexer()
+        for chunk_size in [1, 2, 3, 7, 64]:
+            tokens = list(tokenize_stream(io.StringIO(self.program), chunk_size=chunk_size))
+            self.assertListEqual(lexer.get_token_objects(), tokens)
+
+    def test_tokens_are_lexed_lazily(self):
+        lexer = Lexer(self.program)
+        tokens = lexer.iter_tokens()
+        self.assertEqual(Token(TokenType.INT), next(tokens).token)
+        self.assertEqual(Token(TokenType.IDENTIFIER, "abc"), next(tokens).token)
+        self.assertLess(lexer.index, len(self.program))
+
+    def test_token_buffer_only_keeps_a_window(self):
+        buffer = TokenBuffer(tokenize_stream(io.StringIO("int a = 1;\n" * 1000), chunk_size=16), keep=8)
+        index = 0
+        while buffer[index].token.type != TokenType.EOF:
+            index += 1
+        self.assertEqual(5000, index)
+        self.assertLessEqual(len(buffer.tokens), 17)
+        with self.assertRaises(IndexError):
+            buffer[0]
+
+
+class CompactTokenStream(unittest.TestCase):
+    program = 'int abc = 1234;\nstr s = "a longer\nstring";\ndouble d = 12.5;\nbool b = abc >= 3 && s != "x";\n1.2.3 4.\n'
+
+    def test_token_stream_has_the_same_tokens(self):
+        lexer = Lexer(self.program)
+        lexer.run_lexer()
+        stream = Lexer(self.program).run_compact_lexer()
+        self.assertEqual(len(lexer.get_token_objects()), len(stream))
+        for token_object, token_view in zip(lexer.get_token_objects(), stream):
+            self.assertEqual(token_object, token_view)
+        self.assertListEqual(lexer.get_tokens(), stream.get_tokens())
+
+    def test_values_are_interned(self):
+        stream = Lexer("int a = 1; a = a + 1; double b = 1.0;").run_compact_lexer()
+        self.assertListEqual(["a", 1, "b", 1.0], stream.value_table)
+        self.assertIsNone(stream.line_starts)
+        self.assertEqual(LocationInformation(start_line=1, end_line=1, start_col=11, end_col=12), stream[5].location_info)
+
+    def test_token_stream_is_much_smaller(self):
+        program = self.program * 200
+        tracemalloc.start()
+        lexer = Lexer(program)
+        lexer.run_lexer()
+        token_objects_size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        tracemalloc.start()
+        stream = Lexer(program).run_compact_lexer()
+        stream_size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        self.assertIsInstance(stream, TokenStream)
+        self.assertGreater(token_objects_size / stream_size, 5)
+
+
+class LexerScaling(unittest.TestCase):
+    @staticmethod
+    def time_lexer(lines: int) -> float:
+        code = 'int a = 5;\nwrite("Hello World!");\nbool b = (a >= 3) && true;\n' * lines
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            Lexer(code).run_lexer()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    def test_lexing_time_grows_linearly(self):
+        small = self.time_lexer(200)
+        large = self.time_lexer(1600)
+        # 8 times the input: linear lexing stays around 8x, quadratic lexing would be around 64x
+        self.assertLess(large / small, 20)
+
+
 if __name__ == '__main__':
     unittest.main()
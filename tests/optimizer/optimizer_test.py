@@ -0,0 +1,87 @@
+import contextlib
+import io
+import unittest
+
+from classes import BlockStatement, IfStatement, LiteralExpr
+from lexer import Lexer
+from main import ENGINES
+from optimizer import Optimizer, FOLD_CONSTANTS, ELIMINATE_DEAD_BRANCHES
+from statements import StatementParser
+from tests.vm.vm_test import PROGRAMS, run
+
+
+def optimize(code: str, level: int = ELIMINATE_DEAD_BRANCHES):
+    lexer = Lexer(code)
+    lexer.run_lexer()
+    statement_parser = StatementParser(lexer.get_token_objects())
+    statement_parser.parse()
+    return statement_parser, Optimizer(statement_parser.environment, level).optimize(statement_parser.statements)
+
+
+def run_optimized(code: str, engine: str):
+    output = io.StringIO()
+    try:
+        statement_parser, statements = optimize(code)
+        with contextlib.redirect_stdout(output):
+            ENGINES[engine](statement_parser.environment).interpret(statements)
+    except Exception as e:
+        return type(e), str(e), output.getvalue()
+    store = {name: value for name, value in statement_parser.get_clean_store().items()
+             if value[0].value != "FUNCTION"}
+    return store, output.getvalue()
+
+
+class ConstantFolding(unittest.TestCase):
+    def test_constant_expressions_are_folded(self):
+        for code, value in [("int a = pow(2, 10) * 3;", 3072), ("bool b = !(1 < 2) || (2 == 2);", True),
+                            ('str s = "a" + ("b" + "c");', "abc"), ("double d = -(1.5 * 2.0);", -3.0),
+                            ("int m = mod(7, 4) + 1;", 4)]:
+            with self.subTest(code=code):
+                _, statements = optimize(code, FOLD_CONSTANTS)
+                self.assertEqual(LiteralExpr(value), statements[0].expr)
+
+    def test_errors_are_not_folded(self):
+        for code in ["int a = 1 / 0;", "int a = mod(1, 0);", 'int a = -"text";', "bool b = 1 && true;"]:
+            with self.subTest(code=code):
+                _, statements = optimize(code, FOLD_CONSTANTS)
+                self.assertNotIsInstance(statements[0].expr, LiteralExpr)
+
+    def test_variables_are_not_folded(self):
+        _, statements = optimize("int a = 1; int b = a + 2;", FOLD_CONSTANTS)
+        self.assertNotIsInstance(statements[1].expr, LiteralExpr)
+
+
+class DeadBranches(unittest.TestCase):
+    def test_constant_conditions(self):
+        _, statements = optimize("int a = 0; if (1 == 1) { a = 1; } elif (a == 0) { a = 2; } "
+                                 "if (false) { a = 3; } while (1 > 2) { a = 4; }")
+        self.assertEqual(2, len(statements))
+        self.assertIsInstance(statements[1], BlockStatement)
+
+    def test_false_branches_are_removed(self):
+        _, statements = optimize("int a = 0; if (false) { a = 1; } elif (a == 0) { a = 2; } elif (true) { a = 3; } "
+                                 "elif (a == 1) { a = 4; } else { a = 5; }")
+        statement = statements[1]
+        self.assertIsInstance(statement, IfStatement)
+        self.assertEqual([], statement.elif_branches)
+        self.assertIsInstance(statement.else_branch.block[0].expr.value, LiteralExpr)
+        self.assertEqual(3, statement.else_branch.block[0].expr.value.literal)
+
+    def test_function_bodies_are_optimized(self):
+        statement_parser, _ = optimize("fun f() { if (true) { return 2 * 3; } return 0; }")
+        function = statement_parser.environment.get_variable_value("f")
+        self.assertIsInstance(function.body.block[0], BlockStatement)
+        self.assertEqual(LiteralExpr(6), function.body.block[0].block[0].expr)
+
+
+class OptimizedProgramsMatchTreeWalker(unittest.TestCase):
+    def test_programs(self):
+        programs = PROGRAMS + [
+            'int a = 0; if (0) { a = 1; } elif ("") { a = 2; } elif (2 - 2) { a = 3; } else { a = pow(2, 3); }',
+            'int a = 0; while (false) { a = 1; } { if (true && (1 < 2)) { int b = 4; a = b; } }',
+            'bool b = false || (1 == 2) || true; bool c = true && (3 > 4);',
+        ]
+        for engine in ["tree", "vm", "python"]:
+            for program in programs:
+                with self.subTest(program=program, engine=engine):
+                    self.assertEqual(run(program, "tree"), run_optimized(program, engine))
@@ -1,7 +1,8 @@
 import unittest
 
 from lexer import Lexer, TokenObject, TokenType
-from parser import Parser, LiteralExpr, BinaryExpr, GroupingExpr, UnaryExpr
+from errors import ParserError
+from parser import Parser, PrattParser, LiteralExpr, BinaryExpr, GroupingExpr, UnaryExpr
 from tests.parser.parser_snap import tokens_for_plus_and_minus, parser_tree_for_all_arithmetic_operations, \
     parser_tree_for_plus_and_minus, double_minus_tree
 
@@ -34,3 +35,52 @@ class SimpleArithmeticsExpressions(unittest.TestCase):
         parser = Parser(tokens)
         parsed_tree = (parser.parse())
         self.assertEqual(parser_tree_for_all_arithmetic_operations, parsed_tree)
+
+
+class ParserErrorLocations(unittest.TestCase):
+    def test_error_location_is_resolved_from_a_token_stream(self):
+        stream = Lexer("1 +\n  (2 * )").run_compact_lexer()
+        with self.assertRaises(ParserError) as context:
+            Parser(stream).parse()
+        self.assertIn("line: 2, col: 7.", context.exception.message)
+
+
+class PrattParserExpressions(unittest.TestCase):
+    expressions = [
+        "1 + 2 - 5 + 6 - 8575",
+        "2 - -5 * 6",
+        "1 + 2 * 5 - 6 / 9",
+        "a = b = 1 + 2 * 3 <= 4 == true || !false && c",
+        "f(1, g(2)(3), [1, 2, [3]], x[1 + y[2]]) * -(a)",
+        "(((1 < 2) != (3 >= 4)) && [] == [a]) || -x[0] > 0",
+    ]
+
+    def test_same_trees_as_recursive_descent(self):
+        for expression in self.expressions:
+            tokens = get_tokens(expression)
+            descent_parser = Parser(tokens)
+            pratt_parser = PrattParser(tokens)
+            self.assertEqual(repr(descent_parser.parse()), repr(pratt_parser.parse()))
+            self.assertEqual(descent_parser.index, pratt_parser.index)
+        self.assertEqual(parser_tree_for_all_arithmetic_operations, PrattParser(get_tokens("1 + 2 * 5 - 6 / 9")).parse())
+
+    def test_same_errors_as_recursive_descent(self):
+        for expression in ["1 - --1", "(1 + 2", "1 + 2 = 3", "f(1,", "[1, 2"]:
+            tokens = get_tokens(expression)
+            with self.assertRaises(ParserError) as descent_error:
+                Parser(tokens).parse()
+            with self.assertRaises(ParserError) as pratt_error:
+                PrattParser(tokens).parse()
+            self.assertEqual(descent_error.exception.message, pratt_error.exception.message)
+
+    def test_deeply_nested_expressions(self):
+        depth = 10000
+        tree = PrattParser(get_tokens("(" * depth + "1" + ")" * depth)).parse()
+        for _ in range(depth):
+            self.assertIsInstance(tree, GroupingExpr)
+            tree = tree.expr
+        self.assertEqual(LiteralExpr(1), tree)
+        tree = PrattParser(get_tokens("f(" * depth + ")" * depth)).parse()
+        for _ in range(depth - 1):
+            tree = tree.arguments[0]
+        self.assertEqual([], tree.arguments)
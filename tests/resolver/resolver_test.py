@@ -0,0 +1,135 @@
+import unittest
+
+from errors import ParserError
+from lexer import Lexer
+from resolver import GLOBAL_DEPTH
+from statements import StatementParser
+
+
+def parse(code: str) -> StatementParser:
+    lexer = Lexer(code)
+    lexer.run_lexer()
+    statement_parser = StatementParser(lexer.get_token_objects())
+    statement_parser.parse()
+    return statement_parser
+
+
+def execute(code: str):
+    statement_parser = parse(code)
+    statement_parser.interpret()
+    return {name: value for name, (_, value) in statement_parser.get_clean_store().items()}
+
+
+class ResolvedSlots(unittest.TestCase):
+    def test_locals_get_depth_and_slot(self):
+        statements = parse("""
+        int a = 1;
+        {
+            int b = 2;
+            int c = b;
+            {
+                c = a + b;
+            }
+        }
+        """).statements
+        variable_a, block = statements
+        self.assertIsNone(variable_a.slot)
+        self.assertEqual(2, block.slot_count)
+        variable_b, variable_c, inner_block = block.block
+        self.assertEqual((0, 1), (variable_b.slot, variable_c.slot))
+        self.assertEqual((0, 0), (variable_c.expr.depth, variable_c.expr.slot))
+        assign = inner_block.block[0].expr
+        self.assertEqual((1, 1), (assign.depth, assign.slot))
+        self.assertEqual((GLOBAL_DEPTH, None), (assign.value.expr.depth, assign.value.expr.slot))
+        self.assertEqual((1, 0), (assign.value.right.depth, assign.value.right.slot))
+
+    def test_blocks_use_their_slots(self):
+        store = execute("""
+        int a = 0;
+        int i = 0;
+        while (i < 5) {
+            int b = i * 2;
+            if (b > 4) {
+                int c = b + 1;
+                a = a + c;
+            }
+            i = i + 1;
+        }
+        """)
+        self.assertEqual({"a": 7 + 9, "i": 5}, store)
+
+    def test_local_assignments_are_type_checked(self):
+        with self.assertRaises(RuntimeError):
+            execute('{ int a = 1; a = "text"; }')
+
+
+class LexicalFunctions(unittest.TestCase):
+    def test_recursive_function(self):
+        store = execute("""
+        fun fib(int n) {
+            if (n < 2) {
+                return n;
+            }
+            return fib(n - 1) + fib(n - 2);
+        }
+        int result = fib(15);
+        """)
+        self.assertEqual(610, store["result"])
+
+    def test_functions_see_globals_but_not_the_locals_of_the_caller(self):
+        store = execute("""
+        int a = 2;
+        fun twice(int x) {
+            int y = x * a;
+            return y;
+        }
+        int b = twice(4);
+        """)
+        self.assertEqual(8, store["b"])
+        with self.assertRaises(RuntimeError):
+            execute("""
+            fun get() {
+                return hidden;
+            }
+            {
+                int hidden = 1;
+                get();
+            }
+            """)
+
+
+class TailCalls(unittest.TestCase):
+    def test_returned_calls_of_functions_are_tail_calls(self):
+        function, top_level_return = parse(
+            "fun f(int n) { if (n == 0) { return (f(1)); } return n + f(n - 1); } return f(2);").statements
+        if_statement, return_statement = function.body.block
+        self.assertIs(if_statement.if_branch.block[0].expr.expr, if_statement.if_branch.block[0].tail_call)
+        self.assertIsNone(return_statement.tail_call)
+        self.assertIsNone(top_level_return.tail_call)
+
+    def test_deep_tail_recursion(self):
+        store = execute("fun sum(int n, int acc) { if (n == 0) { return acc; } return sum(n - 1, acc + n); } "
+                        "int s = sum(20000, 0);")
+        self.assertEqual(200010000, store["s"])
+
+
+class ResolveTimeErrors(unittest.TestCase):
+    def test_redeclaration_is_a_parser_error(self):
+        with self.assertRaises(ParserError):
+            parse("int a = 1; int a = 2;")
+        with self.assertRaises(ParserError):
+            parse("{ int a = 1; int a = 2; }")
+        with self.assertRaises(ParserError):
+            parse("fun foo(int a) { int a = 1; }")
+
+    def test_shadowing_is_a_parser_error(self):
+        with self.assertRaises(ParserError):
+            parse("int a = 1; { int a = 2; }")
+        with self.assertRaises(ParserError):
+            parse("{ int a = 1; { int a = 2; } }")
+        with self.assertRaises(ParserError):
+            parse("int mod = 1;")
+
+    def test_variables_of_finished_blocks_can_be_declared_again(self):
+        store = execute("{ int a = 1; } { int a = 2; } int a = 3;")
+        self.assertEqual(3, store["a"])
@@ -1,7 +1,9 @@
+import io
+import time
 import unittest
 
 from classes import FunctionStatement, BlockStatement, Environment
-from lexer import Lexer, TokenObject, TokenType
+from lexer import Lexer, TokenObject, TokenType, TokenBuffer, tokenize_stream
 from parser import Parser, LiteralExpr, BinaryExpr, GroupingExpr, UnaryExpr
 from evaluator import Evaluator
 from errors import ParserError, LexerError
@@ -89,4 +91,41 @@ class FunctionStatements(unittest.TestCase):
         fun foo() {}
         
         foo();
-        """)
\ No newline at end of file
+        """)
+
+
+class StreamedStatements(unittest.TestCase):
+    def test_statements_are_parsed_from_a_stream(self):
+        program = """
+        int a = 1;
+        while (a < 5) {
+            a = a + 1;
+        }
+        """
+        statement_parser = StatementParser(TokenBuffer(tokenize_stream(io.StringIO(program), chunk_size=4)))
+        store = statement_parser.interpret_stream()
+        self.assertEqual(5, store["a"][1])
+
+    def test_first_statement_runs_before_the_rest_is_parsed(self):
+        statement_parser = StatementParser(TokenBuffer(tokenize_stream(io.StringIO("int a = 1;\nint b = ;"))))
+        with self.assertRaises(ParserError):
+            statement_parser.interpret_stream()
+        self.assertEqual(1, statement_parser.get_store()["a"][1])
+
+
+class ParserScaling(unittest.TestCase):
+    @staticmethod
+    def time_parse(statements: int) -> float:
+        tokens = get_tokens("".join(f"int a{i} = (1 + 2) * 3 - pow(2, 4);\n" for i in range(statements)))
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            StatementParser(tokens).parse()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    def test_parse_time_grows_linearly(self):
+        small = self.time_parse(250)
+        large = self.time_parse(2000)
+        # 8 times the statements: linear parsing stays around 8x, quadratic parsing would be around 64x
+        self.assertLess(large / small, 20)
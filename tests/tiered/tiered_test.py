@@ -0,0 +1,51 @@
+import io
+import unittest
+
+from lexer import Lexer
+from statements import StatementParser
+from tests.vm.vm_test import PROGRAMS, run
+from tiered import TieredEngine
+
+
+def interpret(code: str, threshold: int):
+    lexer = Lexer(code)
+    lexer.run_lexer()
+    statement_parser = StatementParser(lexer.get_token_objects())
+    statement_parser.parse()
+    trace = io.StringIO()
+    engine = TieredEngine(statement_parser.environment, threshold=threshold, trace=trace)
+    engine.interpret(statement_parser.statements)
+    return statement_parser.get_clean_store(), engine, trace.getvalue()
+
+
+class TieredEngineMatchesTreeWalker(unittest.TestCase):
+    def test_programs(self):
+        programs = PROGRAMS + [
+            'fun f(int n) { int total = 0; { int i = 0; while (i < n) { total = total + i; i = i + 1; } } '
+            'return total; } int a = f(10); int b = f(20);',
+            'int i = 0; while (i < 10) { int j = 0; while (j < i) { j = j + 1; } i = i + 1; }',
+            'fun f(int n) { int i = 0; while (true) { i = i + 1; if (i == n) { return i; } } } int a = f(5);',
+        ]
+        for threshold in [1, 3, 1000]:
+            for program in programs:
+                with self.subTest(program=program, threshold=threshold):
+                    self.assertEqual(run(program, "tree"), run(program, "tiered", threshold=threshold))
+
+
+class Promotions(unittest.TestCase):
+    def test_hot_function_is_compiled(self):
+        code = 'fun fib(int n) { if (n < 2) { return n; } return fib(n - 1) + fib(n - 2); } ' \
+               'fun once() { return 1; } int r = fib(10) + once();'
+        store, engine, trace = interpret(code, threshold=5)
+        self.assertEqual(56, store["r"][1])
+        self.assertEqual(["fib"], [promotion.node.name for promotion in engine.promotions])
+        self.assertIn("promoted function fib after 5 calls", trace)
+
+    def test_hot_loop_keeps_the_enclosing_locals(self):
+        code = 'int result = 0; { int total = 0; int i = 0; while (i < 100) { int j = i * 2; total = total + j; ' \
+               'i = i + 1; } result = total; } int i = 0; while (i < 3) { i = i + 1; }'
+        store, engine, trace = interpret(code, threshold=10)
+        self.assertEqual(9900, store["result"][1])
+        self.assertEqual(1, len(engine.promotions))
+        self.assertEqual(10, engine.promotions[0].count)
+        self.assertIn("after 10 iterations", trace)
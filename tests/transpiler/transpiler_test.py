@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+from lexer import Lexer
+from statements import StatementParser
+from tests.vm.vm_test import PROGRAMS, run
+from transpiler import CodeCache, PythonEngine
+
+
+def parse(code: str) -> StatementParser:
+    lexer = Lexer(code)
+    lexer.run_lexer()
+    statement_parser = StatementParser(lexer.get_token_objects())
+    statement_parser.parse()
+    return statement_parser
+
+
+class TranspiledProgramsMatchTreeWalker(unittest.TestCase):
+    def test_programs(self):
+        programs = PROGRAMS + [
+            'int a = 1; a = "text";',
+            'fun f() { a = 2.5; } int a = 1; f();',
+            'fun f() { a = a + 1; return a; } int a = 1; int b = f() + f();',
+            'int a = 1; int b = 2; int c = a; { int d = c; c = d + b; }',
+            'List list = [1, 2]; str print = "keywords are fine"; int None = 3;',
+        ]
+        for program in programs:
+            with self.subTest(program=program):
+                self.assertEqual(run(program, "tree"), run(program, "python"))
+
+    def test_functions_become_defs_and_loops_whiles(self):
+        statement_parser = parse("fun f(int n) { int i = 0; while (i < n) { i = i + 1; } return i; } int a = f(3);")
+        source = PythonEngine(statement_parser.environment).transpile(statement_parser.statements)
+        self.assertIn("def g_f(l0):", source)
+        self.assertIn("while ", source)
+
+
+class CachedCode(unittest.TestCase):
+    def test_code_is_cached(self):
+        source = "fun f(int n) { return n * 2; } int a = f(21);"
+        with tempfile.TemporaryDirectory() as directory:
+            source_path = os.path.join(directory, "program.ti")
+            cache = CodeCache(directory)
+            for _ in range(2):
+                statement_parser = parse(source)
+                PythonEngine(statement_parser.environment, cache, source_path, source) \
+                    .interpret(statement_parser.statements)
+                self.assertEqual(42, statement_parser.get_clean_store()["a"][1])
+            self.assertEqual((1, 1, 1), (cache.hits, cache.misses, cache.writes))
+            statement_parser = parse(source + "int b = 1;")
+            PythonEngine(statement_parser.environment, cache, source_path, source + "int b = 1;") \
+                .interpret(statement_parser.statements)
+            self.assertEqual(1, cache.stale)
@@ -0,0 +1,88 @@
+import contextlib
+import io
+import unittest
+
+from errors import TypeCheckError
+from lexer import Lexer
+from main import ENGINES
+from statements import StatementParser
+from tests.vm.vm_test import PROGRAMS, run
+from type_checker import TypeChecker
+
+
+def check(code: str):
+    lexer = Lexer(code)
+    lexer.run_lexer()
+    statement_parser = StatementParser(lexer.get_token_objects())
+    statement_parser.parse()
+    checker = TypeChecker(statement_parser.environment)
+    checker.check(statement_parser.statements)
+    return statement_parser, checker
+
+
+def run_verified(code: str, engine: str):
+    output = io.StringIO()
+    try:
+        statement_parser, _ = check(code)
+        with contextlib.redirect_stdout(output):
+            ENGINES[engine](statement_parser.environment).interpret(statement_parser.statements)
+    except TypeCheckError:
+        raise
+    except Exception as e:
+        return type(e), str(e), output.getvalue()
+    store = {name: value for name, value in statement_parser.get_clean_store().items()
+             if value[0].value != "FUNCTION"}
+    return store, output.getvalue()
+
+
+class TypeErrors(unittest.TestCase):
+    def test_all_errors_are_reported(self):
+        with self.assertRaises(TypeCheckError) as context:
+            check('int a = "text"; fun f(double x) { return x + "s"; } bool b = 1 && true; f(); while (a) { }')
+        self.assertEqual(5, len(context.exception.errors))
+
+    def test_errors(self):
+        for code in ['int a = 1; a = "text";', 'int a = -"text";', "int b = c + 1;",
+                     'fun f(int x) { return x; } f("text");', "fun f() { return 1; } str s = f();",
+                     "int a = 1; int b = a[0];", 'List a = [1]; int b = a["0"];', 'bool b = 1 < "2";']:
+            with self.subTest(code=code):
+                with self.assertRaises(TypeCheckError):
+                    check(code)
+
+    def test_runtime_errors_are_not_type_errors(self):
+        for code in ["List a = [1]; int b = a[3];", "double a = 1 / 0;", "return 3;", "int a = pow(2, 3);",
+                     "fun f(int n) { return n; } int a = f(true);"]:
+            with self.subTest(code=code):
+                check(code)
+
+
+class Verification(unittest.TestCase):
+    def test_recursive_function_is_verified(self):
+        statement_parser, checker = check("fun fib(int n) { if (n < 2) { return n; } return fib(n - 1) + fib(n - 2); } "
+                                          "int r = fib(12);")
+        fib = statement_parser.environment.get_variable_value("fib")
+        self.assertTrue(fib.verified)
+        self.assertEqual("INT", checker.return_types[fib].value)
+        self.assertTrue(statement_parser.statements[1].verified)
+
+    def test_unknown_types_keep_their_checks(self):
+        statement_parser, _ = check("fun f(int n) { return n; } List l = [1, true]; int a = f(l[1]); "
+                                    "fun g() { if (true) { return 1; } } int b = g();")
+        self.assertFalse(statement_parser.environment.get_variable_value("f").verified)
+        self.assertFalse(statement_parser.statements[2].verified)
+        self.assertFalse(statement_parser.statements[4].verified)
+
+    def test_verified_programs_match_tree_walker(self):
+        programs = PROGRAMS + [
+            'fun f(int n) { int i = 0; double d = 0.5; while (i < n) { i = i + 1; d = d * 2.0; } return i; } '
+            'int a = f(10); bool b = a > 3 && f(2) == 2;',
+            "fun f(int n) { return n; } List l = [1, true]; int a = f(l[0]); int b = f(l[1]);",
+        ]
+        for engine in ["tree", "closure", "tiered"]:
+            for program in programs:
+                with self.subTest(program=program, engine=engine):
+                    try:
+                        check(program)
+                    except (TypeCheckError, Exception):
+                        continue
+                    self.assertEqual(run(program, "tree"), run_verified(program, engine))
@@ -0,0 +1,108 @@
+import contextlib
+import io
+import unittest
+
+from bytecode import Compiler
+from classes import Environment
+from lexer import Lexer
+from main import ENGINES
+from parser import Parser
+from statements import StatementParser
+from vm import VirtualMachine
+
+PROGRAMS = [
+    'int a = 5; str b = "lalelu"; double c = 7.6; bool d = !false;',
+    'bool b = ((false && true) && (false || false)) || false;',
+    'int a = 1; int b = (a + 2) * 3 - pow(2, 4) / 2;',
+    'int a = 1; a = 2; { int b = 2; int c = 3; a = b + c; }',
+    'int a = 1; if (a > 1) { a = 2; } elif (a == 1) { a = 3; } else { a = 4; }',
+    'int a = 0; if (a) { a = 1; } else { a = 2; }',
+    'int i = 0; int total = 0; while (i < 20) { int j = i * i; if (mod(j, 2) == 0) { total = total + j; } i = i + 1; }',
+    'List a = nums(0, 10); int b = a[7]; List c = [a[1], b, -3];',
+    'fun fib(int n) { if (n < 2) { return n; } return fib(n - 1) + fib(n - 2); } int r = fib(12);',
+    'fun f(int x, str s) { write(s); { int y = x; return y * 2; } } int r = f(4, "s"); write(r);',
+    'fun f() { return; } f();',
+    'int a = 1; int b = (a = 5) + 1;',
+    'fun sum(int n, int acc) { if (n == 0) { return acc; } return sum(n - 1, acc + n); } int s = sum(2000, 0);',
+    'fun even(int n) { if (n == 0) { return true; } return odd(n - 1); } '
+    'fun odd(int n) { if (n == 0) { return false; } return (even(n - 1)); } bool e = even(2001);',
+    'fun f(int n) { return mod(n, 3); } int a = f(7);',
+    'int i = 0; int total = 0; while (true) { i = i + 1; if (i > 30) { break; } if (mod(i, 3) == 0) { continue; } '
+    'total = total + i; }',
+    'int found = 0; int i = 0; while (i < 10) { int j = 0; while (true) { j = j + 1; if (j == i) { break; } } '
+    'if (i == 7) { found = i; break; } i = i + 1; }',
+    'fun first(int n) { int i = 0; while (true) { if (i * i > n) { return i; } i = i + 1; } } int r = first(50);',
+    'fun f(int n) { while (n > 0) { n = n - 1; if (n == 3) { return f(0) + n; } } return 100; } int r = f(10);',
+    # errors
+    'int a = 1; int a = 2;',
+    'int a = "text";',
+    '{ int a = 1; a = "text"; }',
+    'int a = 1; a = "text";',
+    'while (1) { }',
+    'bool b = 1 && true;',
+    'int a = -"text";',
+    'List a = [1]; int b = a[3];',
+    'List a = [1]; int b = a[true && false];',
+    'int b = c + 1;',
+    'fun f(int x) { return x; } f();',
+    'fun f(int x) { return x; } f("text");',
+    'fun f(int x) { return x; } fun g() { return f(); } g();',
+    'fun f(int x) { return x; } fun g() { return f("text"); } g();',
+    'return 3;',
+    'break;',
+    'while (true) { fun f() { continue; } }',
+]
+
+
+def run(code: str, engine: str, **engine_options):
+    lexer = Lexer(code)
+    lexer.run_lexer()
+    output = io.StringIO()
+    try:
+        statement_parser = StatementParser(lexer.get_token_objects())
+        statement_parser.parse()
+        with contextlib.redirect_stdout(output):
+            ENGINES[engine](statement_parser.environment, **engine_options).interpret(statement_parser.statements)
+    except Exception as e:
+        return type(e), str(e), output.getvalue()
+    store = {name: value for name, value in statement_parser.get_clean_store().items()
+             if value[0].value != "FUNCTION"}
+    return store, output.getvalue()
+
+
+class VirtualMachineMatchesTreeWalker(unittest.TestCase):
+    def test_programs(self):
+        for program in PROGRAMS:
+            with self.subTest(program=program):
+                self.assertEqual(run(program, "tree"), run(program, "vm"))
+
+    def test_expressions(self):
+        for code in ["1 + 2 * 3", "(2/5)/(6/2)", "1- -(-1)", "!(1 == 2) && true", '"a" + "b"', "2 >= 3 || 1 <= 1"]:
+            with self.subTest(code=code):
+                lexer = Lexer(code)
+                lexer.run_lexer()
+                expr = Parser(lexer.get_token_objects()).parse()
+                self.assertEqual(expr.evaluate(Environment()), VirtualMachine(Environment()).evaluate(expr))
+
+
+class StacklessCalls(unittest.TestCase):
+    def test_deep_recursion(self):
+        code = "fun depth(int n) { if (n == 0) { return 0; } return depth(n - 1) + 1; } int d = depth(20000);"
+        store, output = run(code, "vm")
+        self.assertEqual(20000, store["d"][1])
+
+    def test_maximum_depth(self):
+        # 100 nested calls
+        code = "fun depth(int n) { if (n == 0) { return 0; } return depth(n - 1) + 1; } int d = depth(99);"
+        self.assertEqual(RuntimeError, run(code, "vm", max_depth=99)[0])
+        self.assertEqual(99, run(code, "vm", max_depth=100)[0]["d"][1])
+
+
+class Bytecode(unittest.TestCase):
+    def test_nested_blocks_share_the_locals_of_the_function(self):
+        lexer = Lexer("{ int a = 1; { int b = 2; } { int c = 3; int d = 4; } }")
+        lexer.run_lexer()
+        statement_parser = StatementParser(lexer.get_token_objects())
+        code = Compiler().compile_script(statement_parser.parse())
+        # a is in slot 0, b reuses slot 1 with c, d is in slot 2
+        self.assertEqual(3, code.local_count)
@@ -0,0 +1,146 @@
+import time
+from typing import Any, Dict, List, Optional, TextIO
+
+from classes import Environment, Statement, FunctionStatement, WhileStatement, BREAK_COMPLETION, \
+    CONTINUE_COMPLETION, execute_script, get_bool
+from closure_compiler import ClosureCompiler, CompiledFunction
+
+# the number of calls of a function or iterations of a loop before it is compiled
+DEFAULT_THRESHOLD = 1000
+
+
+class Promotion:
+    """
+    A function or loop which was compiled because it got hot
+    """
+
+    def __init__(self, node: Statement, count: int, seconds: float):
+        self.node = node
+        self.count = count
+        self.seconds = seconds
+
+    def __str__(self):
+        if isinstance(self.node, FunctionStatement):
+            description = f"function {self.node.name} after {self.count} calls"
+        else:
+            description = f"while loop ({str(self.node.cond):.60}) after {self.count} iterations"
+        return f"promoted {description}, compiled in {self.seconds * 1000:.2f} ms"
+
+
+class TieredCompiler(ClosureCompiler):
+    """
+    The closure compiler of the tiered engine, compiled code calls functions through the engine, so cold functions
+    stay in the tree walker even if hot code calls them.
+    """
+
+    def __init__(self, engine: "TieredEngine"):
+        super().__init__(engine.environment)
+        self.engine = engine
+
+    def call_function(self, function: FunctionStatement, arguments: List[Any]):
+        return self.engine.call_function(function, arguments)
+
+
+class TieredEngine:
+    """
+    Walks the tree like the tree walker, but counts the calls of every function and the iterations of every while
+    loop. Functions and loops which pass the threshold are compiled by the closure compiler and run compiled from then
+    on. The statements call into the engine through the tiering attribute of the global environment.
+    """
+
+    def __init__(self, environment: Environment, threshold: int = DEFAULT_THRESHOLD, trace: Optional[TextIO] = None):
+        """
+        :param threshold: the number of calls or iterations after which a function or loop is compiled
+        :param trace: the promotions are printed to this file if given
+        """
+        self.environment = environment
+        self.threshold = threshold
+        self.trace = trace
+        self.compiler = TieredCompiler(self)
+        self.counters: Dict[Statement, int] = {}
+        self.compiled_loops: Dict[WhileStatement, CompiledFunction] = {}
+        self.promotions: List[Promotion] = []
+
+    def interpret(self, statements: List[Statement]) -> Dict[str, Any]:
+        self.environment.tiering = self
+        execute_script(statements, self.environment)
+        return self.environment.evaluated_store
+
+    def promote(self, node: Statement, count: int, compile_node) -> CompiledFunction:
+        start = time.perf_counter()
+        compiled = compile_node()
+        promotion = Promotion(node, count, time.perf_counter() - start)
+        self.promotions.append(promotion)
+        if self.trace is not None:
+            print(promotion, file=self.trace)
+        return compiled
+
+    def call_function(self, function: FunctionStatement, arguments: List[Any]):
+        if function in self.compiler.compiled_functions:
+            return ClosureCompiler.call_function(self.compiler, function, arguments)
+        count = self.counters[function] = self.counters.get(function, 0) + 1
+        if count < self.threshold:
+            return function.interpret_call(arguments)
+        self.promote(function, count, lambda: self.compiler.compile_function(function))
+        return ClosureCompiler.call_function(self.compiler, function, arguments)
+
+    def execute_while(self, statement: WhileStatement, env: Environment):
+        compiled = self.compiled_loops.get(statement)
+        if compiled is None:
+            count = self.counters.get(statement, 0)
+            try:
+                while get_bool(statement.cond, env):
+                    completion = statement.while_body.execute(env)
+                    count += 1
+                    if completion is not None:
+                        if completion is BREAK_COMPLETION:
+                            return None
+                        if completion is not CONTINUE_COMPLETION:
+                            return completion
+                    if count >= self.threshold:
+                        break
+                else:
+                    return None
+            finally:
+                self.counters[statement] = count
+            # the loop got hot, the remaining iterations run compiled
+            compiled = self.compiled_loops[statement] = self.promote(
+                statement, count, lambda: self.compiler.compile_nested(statement, scope_sizes(env)))
+        return run_nested(compiled, env)
+
+
+def scopes(env: Environment) -> List[Environment]:
+    """
+    The local scopes enclosing the environment, the outermost first
+    """
+    environments = []
+    while env.enclosing is not None:
+        environments.append(env)
+        env = env.enclosing
+    environments.reverse()
+    return environments
+
+
+def scope_sizes(env: Environment) -> List[int]:
+    return [len(environment.values) for environment in scopes(env)]
+
+
+def run_nested(compiled: CompiledFunction, env: Environment):
+    """
+    Runs compiled code inside of the environment, its locals are copied into the frame and back afterwards
+
+    :return: the completion of the compiled code
+    """
+    environments = scopes(env)
+    frame = []
+    for environment in environments:
+        frame.extend(environment.values)
+    frame.extend([None] * (compiled.local_count - len(frame)))
+    try:
+        return compiled.body(frame)
+    finally:
+        base = 0
+        for environment in environments:
+            size = len(environment.values)
+            environment.values[:] = frame[base:base + size]
+            base += size
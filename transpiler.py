@@ -0,0 +1,580 @@
+from types import CodeType, FunctionType
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ast_cache import FileCache, cache_key
+from classes import Environment, Statement, Expr, FunctionStatement, NativeFunctionStatement, StaticType, \
+    BlockStatement, IfStatement, WhileStatement, PrintStatement, ExpressionStatement, ReturnStatement, \
+    VariableStatement, ArrayExpr, ArrayIndexExpr, AssignExpr, CallExpr, LogicExpr, BinaryExpr, UnaryExpr, LiteralExpr, \
+    IdentifierExpr, GroupingExpr, BreakStatement, ContinueStatement, check_correct_type, check_declared_type, \
+    check_assigned_type, convert_value_to_static_type
+from errors import ParserError, ReturnError
+from lexer import TokenType
+
+# has to be increased whenever the generated code changes
+TRANSPILER_VERSION = 3
+
+# the python types which pass the type checks of classes.py without calling them
+PYTHON_TYPES = {
+    StaticType.INT: "int",
+    StaticType.DOUBLE: "float",
+    StaticType.STRING: "str",
+    StaticType.BOOLEAN: "bool",
+    StaticType.LIST: "list",
+}
+PARAMETER_TYPES = {
+    TokenType.INT: "int",
+    TokenType.DOUBLE: "float",
+    TokenType.STRING: "str",
+    TokenType.BOOLEAN: "bool",
+}
+BINARY_OPERATORS = {
+    TokenType.PLUS: "+",
+    TokenType.MINUS: "-",
+    TokenType.MUL: "*",
+    TokenType.DIV: "/",
+    TokenType.GREATER: ">",
+    TokenType.GREATER_EQUALS: ">=",
+    TokenType.LESSER: "<",
+    TokenType.LESSER_EQUALS: "<=",
+    TokenType.EQUALS: "==",
+    TokenType.NOT_EQUALS: "!=",
+    TokenType.AND: "and",
+    TokenType.OR: "or",
+}
+GLOBAL_PREFIX = "g_"
+# the prefix of the bodies of functions which run in a trampoline
+BODY_PREFIX = "b_"
+
+
+def global_name(name: str) -> str:
+    # the prefix keeps Titanite names from clashing with python keywords, builtins and the helpers
+    return GLOBAL_PREFIX + name
+
+
+def tail_calls(statements: List[Statement]) -> Iterator[CallExpr]:
+    """
+    The tail calls of the returns in the statements and their blocks
+    """
+    for statement in statements:
+        if isinstance(statement, ReturnStatement) and statement.tail_call is not None:
+            yield statement.tail_call
+        elif isinstance(statement, BlockStatement):
+            yield from tail_calls(statement.block)
+        elif isinstance(statement, IfStatement):
+            yield from tail_calls(statement.if_branch.block)
+            for _, branch in statement.elif_branches:
+                yield from tail_calls(branch.block)
+            if statement.else_branch is not None:
+                yield from tail_calls(statement.else_branch.block)
+        elif isinstance(statement, WhileStatement):
+            yield from tail_calls(statement.while_body.block)
+
+
+##########################################################################
+# Helpers of the generated code, they raise the errors of the tree walker
+##########################################################################
+
+def _fail(error: Exception, *operands: Any):
+    """
+    Raises the error, the operands are only evaluated before like in the tree walker
+    """
+    raise error
+
+
+def _check_global_assigned(name: str, value: Any, static_type: Optional[StaticType]):
+    if static_type is None:
+        raise RuntimeError(f"Undefined variable {name}")
+    value_type = convert_value_to_static_type(value)
+    if static_type != value_type:
+        raise RuntimeError(f"Incompatible type of {name} (of type {static_type}) and {value} (of type {value_type})")
+    return value
+
+
+def _declared(name: str, value: Any, static_type: StaticType):
+    check_declared_type(name, value, static_type)
+    return value
+
+
+def _assigned(value: Any, static_type: StaticType):
+    check_assigned_type(value, static_type)
+    return value
+
+
+def _logic_operand(value: Any):
+    if not isinstance(value, bool):
+        raise RuntimeError("Expected a boolean type for logic operators.")
+    return value
+
+
+def _negate(value: Any):
+    if isinstance(value, float) or isinstance(value, int):
+        return -value
+    raise ParserError(f"Cannot negate a non number: {value}")
+
+
+def _while_condition_error(value: Any):
+    if value is not False:
+        raise RuntimeError("Expected a boolean.")
+
+
+def _index(index: Any, array: Any, name: str):
+    if not isinstance(index, int):
+        raise ParserError(f"Expected an integer got {type(index)} ({index})")
+    if not isinstance(array, list):
+        raise ParserError(f"Expected a list got {type(array)} ({array})")
+    try:
+        return array[index]
+    except IndexError:
+        raise RuntimeError(f"Index out of bounds for {name}. Got {index} but max length is {len(array)}")
+
+
+def _call(function: Any, arguments: List[Any]):
+    if len(arguments) != function.arity:
+        raise RuntimeError(f"Expected {function.arity} arguments, got {len(arguments)} arguments.")
+    return function(*arguments)
+
+
+class _TailCall:
+    """
+    Returned by the body of a function for a tail call, the trampoline of the function calls the body of the called
+    function with the arguments
+    """
+    __slots__ = ("body", "arguments")
+
+    def __init__(self, body: FunctionType, arguments: List[Any]):
+        self.body = body
+        self.arguments = arguments
+
+
+def _native(function: NativeFunctionStatement, environment: Environment):
+    def call(*arguments):
+        return function.call(arguments=list(arguments), env=environment)
+    call.arity = function.arity
+    return call
+
+
+HELPERS = {
+    "_fail": _fail,
+    "_check_global_assigned": _check_global_assigned,
+    "_declared": _declared,
+    "_assigned": _assigned,
+    "_logic_operand": _logic_operand,
+    "_negate": _negate,
+    "_while_condition_error": _while_condition_error,
+    "_index": _index,
+    "_call": _call,
+    "_TailCall": _TailCall,
+    "_check_correct_type": check_correct_type,
+    "_ParserError": ParserError,
+    "_ReturnError": ReturnError,
+    "_StaticType": StaticType,
+    "_TokenType": TokenType,
+}
+
+
+class Transpiler:
+    """
+    Translates resolved statements into python source. Functions become defs, global variables python globals and
+    local variables the python locals l0, l1, ... of their flattened slot (like in the vm). The type checks of the
+    tree walker are inlined, values of the expected python type pass them without a call.
+    """
+
+    def __init__(self, environment: Environment):
+        self.environment = environment
+        self.lines: List[str] = []
+        self.indent = 0
+        self.in_function = False
+        self.scope_bases: List[int] = []
+        self.next_slot = 0
+        self.temporaries = 0
+        # the static types of the global variables, needed to check assignments
+        self.global_types: Dict[str, StaticType] = {name: static_type for name, (static_type, _) in
+                                                    environment.store.items()}
+        # the globals assigned in the current function, they need a global declaration
+        self.assigned_globals: set = set()
+        # the functions whose body runs in a trampoline, so their tail calls don't grow the python stack
+        self.trampolined: Dict[str, FunctionStatement] = {}
+        # the name of the transpiled function, None for the top level statements
+        self.function_name: Optional[str] = None
+
+    def transpile(self, statements: List[Statement]) -> str:
+        for statement in statements:
+            if isinstance(statement, VariableStatement) and statement.slot is None:
+                self.global_types[statement.name] = statement.static_type
+        functions = [value for _, value in self.environment.store.values() if isinstance(value, FunctionStatement)]
+        for function in functions:
+            for call in tail_calls(function.body.block):
+                target = self.static_function(call)
+                if isinstance(target, FunctionStatement):
+                    self.trampolined[function.name] = function
+                    self.trampolined[target.name] = target
+        for function in functions:
+            self.function(function)
+        self.function_name = None
+        self.start(in_function=False, slot_count=0)
+        for statement in statements:
+            self.statement(statement)
+        return "\n".join(self.lines) + "\n"
+
+    def start(self, in_function: bool, slot_count: int):
+        self.in_function = in_function
+        self.scope_bases = []
+        self.next_slot = slot_count
+
+    def emit(self, line: str):
+        self.lines.append("    " * self.indent + line)
+
+    def temporary(self) -> str:
+        self.temporaries += 1
+        return f"_t{self.temporaries}"
+
+    def local_name(self, depth: int, slot: int) -> str:
+        return f"l{self.scope_bases[-1 - depth] + slot}"
+
+    def static_function(self, expr: CallExpr) -> Any:
+        """
+        :return: the global function called by the expression if it has the arity of the call, else None
+        """
+        callee = expr.callee_name
+        if isinstance(callee, IdentifierExpr) and callee.slot is None:
+            entry = self.environment.store.get(callee.identifier)
+            function = None if entry is None else entry[1]
+            if hasattr(function, "arity") and function.arity == len(expr.arguments):
+                return function
+        return None
+
+    def function(self, function: FunctionStatement):
+        name = global_name(function.name)
+        self.function_name = function.name
+        parameters = ", ".join(f"l{slot}" for slot in range(function.arity))
+        if function.name in self.trampolined:
+            # the function calls its body until it returns a value instead of a tail call
+            self.emit(f"def {name}({parameters}):")
+            self.emit(f"    _result = {BODY_PREFIX}{function.name}({parameters})")
+            self.emit("    while type(_result) is _TailCall:")
+            self.emit("        _result = _result.body(*_result.arguments)")
+            self.emit("    return _result")
+            name = BODY_PREFIX + function.name
+        self.emit(f"def {name}({parameters}):")
+        self.indent += 1
+        body_start = len(self.lines)
+        self.assigned_globals = set()
+        self.start(in_function=True, slot_count=function.frame_size)
+        self.scope_bases.append(0)
+        for slot, (arg_type, _) in enumerate(function.parameters):
+            python_type = PARAMETER_TYPES.get(arg_type)
+            if python_type is None:
+                self.emit(f"_check_correct_type(_TokenType.{arg_type.name}, l{slot})")
+            else:
+                self.emit(f"if type(l{slot}) is not {python_type}:")
+                self.emit(f"    _check_correct_type(_TokenType.{arg_type.name}, l{slot})")
+        for statement in function.body.block:
+            self.statement(statement)
+        self.emit("return None")
+        if self.assigned_globals:
+            self.lines.insert(body_start, "    " * self.indent + "global " + ", ".join(sorted(self.assigned_globals)))
+        self.indent -= 1
+        self.emit(f"{global_name(function.name)}.arity = {function.arity}")
+
+    ##########################################################################
+    # Statements
+    ##########################################################################
+
+    def statement(self, statement: Statement):
+        if statement is None:
+            self.emit('raise _ParserError("Structs are not supported yet.")')
+            return
+        _STATEMENT_TRANSPILERS[type(statement)](self, statement)
+
+    def block(self, block: BlockStatement, indented: bool = True):
+        """
+        :param indented: False for blocks which are statements on their own, they need no python block
+        """
+        self.scope_bases.append(self.next_slot)
+        self.next_slot += block.slot_count
+        if indented:
+            self.indent += 1
+        first_line = len(self.lines)
+        for statement in block.block:
+            self.statement(statement)
+        if indented:
+            if len(self.lines) == first_line:
+                self.emit("pass")
+            self.indent -= 1
+        self.next_slot = self.scope_bases.pop()
+
+    def block_statement(self, block: BlockStatement):
+        self.block(block, indented=False)
+
+    def if_statement(self, statement: IfStatement):
+        self.emit(f"if {self.expr(statement.cond)}:")
+        self.block(statement.if_branch)
+        for elif_condition, elif_branch in statement.elif_branches:
+            self.emit(f"elif {self.expr(elif_condition)}:")
+            self.block(elif_branch)
+        if statement.else_branch is not None:
+            self.emit("else:")
+            self.block(statement.else_branch)
+
+    def while_statement(self, statement: WhileStatement):
+        condition = self.temporary()
+        self.emit(f"while ({condition} := {self.expr(statement.cond)}) is True:")
+        self.block(statement.while_body)
+        # the condition is not checked after a break
+        self.emit("else:")
+        self.emit(f"    if {condition} is not False:")
+        self.emit(f"        _while_condition_error({condition})")
+
+    def break_statement(self, statement: BreakStatement):
+        self.emit("break")
+
+    def continue_statement(self, statement: ContinueStatement):
+        self.emit("continue")
+
+    def print_statement(self, statement: PrintStatement):
+        self.emit(f"print({self.expr(statement.expr)})")
+
+    def expression_statement(self, statement: ExpressionStatement):
+        if isinstance(statement.expr, AssignExpr):
+            self.assign_statement(statement.expr)
+        else:
+            self.emit(self.expr(statement.expr))
+
+    def function_declaration(self, function: FunctionStatement):
+        # every function is defined at the start of the module, like the statement parser declares them
+        pass
+
+    def return_statement(self, statement: ReturnStatement):
+        if statement.tail_call is not None and self.function_name in self.trampolined:
+            target = self.static_function(statement.tail_call)
+            if isinstance(target, FunctionStatement):
+                arguments = ", ".join(self.expr(argument) for argument in statement.tail_call.arguments)
+                self.emit(f"return _TailCall({BODY_PREFIX}{target.name}, [{arguments}])")
+                return
+        value = "None" if statement.expr is None else self.expr(statement.expr)
+        if self.in_function:
+            self.emit(f"return {value}")
+        else:
+            self.emit(f"raise _ReturnError({value})")
+
+    def variable(self, statement: VariableStatement):
+        if statement.slot is None:
+            target = global_name(statement.name)
+        else:
+            target = self.local_name(0, statement.slot)
+        check = f"_declared({statement.name!r}, {{}}, _StaticType.{statement.static_type.name})"
+        self.checked_store(target, self.expr(statement.expr), PYTHON_TYPES.get(statement.static_type), check)
+
+    def assign_statement(self, expr: AssignExpr):
+        target, python_type, check = self.assign_target(expr)
+        self.checked_store(target, self.expr(expr.value), python_type, check)
+
+    def checked_store(self, target: str, value: str, python_type: Optional[str], check: str):
+        """
+        Stores the value after the type check, the check is a format string which gets the value
+        """
+        if python_type is None:
+            self.emit(f"{target} = {check.format(value)}")
+            return
+        temporary = self.temporary()
+        self.emit(f"{temporary} = {value}")
+        self.emit(f"if type({temporary}) is not {python_type}:")
+        self.emit(f"    {check.format(temporary)}")
+        self.emit(f"{target} = {temporary}")
+
+    ##########################################################################
+    # Expressions, every expression is translated into a python expression
+    ##########################################################################
+
+    def expr(self, expr: Expr) -> str:
+        return _EXPR_TRANSPILERS[type(expr)](self, expr)
+
+    def array(self, expr: ArrayExpr) -> str:
+        return "[" + ", ".join(self.expr(element) for element in expr.expressions) + "]"
+
+    def array_index(self, expr: ArrayIndexExpr) -> str:
+        return f"_index({self.expr(expr.index_expr)}, {self.load(expr.identifier, expr.slot, expr.depth)}, " \
+               f"{expr.identifier!r})"
+
+    def assign_target(self, expr: AssignExpr) -> Tuple[str, Optional[str], str]:
+        """
+        :return: the python variable, the python type which passes the type check without a call and the type check
+        as format string
+        """
+        if expr.slot is None:
+            static_type = self.global_types.get(expr.name)
+            target = global_name(expr.name)
+            if self.in_function:
+                self.assigned_globals.add(target)
+            type_name = "None" if static_type is None else f"_StaticType.{static_type.name}"
+            return target, PYTHON_TYPES.get(static_type), f"_check_global_assigned({expr.name!r}, {{}}, {type_name})"
+        target = self.local_name(expr.depth, expr.slot)
+        return target, PYTHON_TYPES.get(expr.static_type), f"_assigned({{}}, _StaticType.{expr.static_type.name})"
+
+    def assign(self, expr: AssignExpr) -> str:
+        value = self.expr(expr.value)
+        target, python_type, check = self.assign_target(expr)
+        if python_type is None:
+            return f"({target} := {check.format(value)})"
+        temporary = self.temporary()
+        return f"({target} := ({temporary} if type({temporary} := {value}) is {python_type} " \
+               f"else {check.format(temporary)}))"
+
+    def call(self, expr: CallExpr) -> str:
+        arguments = [self.expr(argument) for argument in expr.arguments]
+        if self.static_function(expr) is not None:
+            return f"{global_name(expr.callee_name.identifier)}({', '.join(arguments)})"
+        return f"_call({self.expr(expr.callee_name)}, [{', '.join(arguments)}])"
+
+    def logic(self, expr: LogicExpr) -> str:
+        left = self.expr(expr.expr)
+        right = self.expr(expr.right)
+        if expr.logic_operator == TokenType.AND:
+            return f"({right} if _logic_operand({left}) else False)"
+        if expr.logic_operator == TokenType.OR:
+            return f"(True if _logic_operand({left}) else {right})"
+        return f"_fail(_ParserError('Expected an logic operator in a logic operation.'), _logic_operand({left}))"
+
+    def binary(self, expr: BinaryExpr) -> str:
+        left = self.expr(expr.expr)
+        right = self.expr(expr.right)
+        operator = BINARY_OPERATORS.get(expr.operator)
+        if operator is None:
+            return f"_fail(_ParserError('Following operator is not supported for binary expression'), {left}, {right})"
+        return f"({left} {operator} {right})"
+
+    def unary(self, expr: UnaryExpr) -> str:
+        right = self.expr(expr.right)
+        if expr.operator == TokenType.NOT:
+            return f"(not {right})"
+        if expr.operator == TokenType.MINUS:
+            temporary = self.temporary()
+            return f"(-{temporary} if type({temporary} := {right}) is int or type({temporary}) is float " \
+                   f"else _negate({temporary}))"
+        message = f"Could not evaluate this unary expression. {expr}"
+        return f"_fail(_ParserError({message!r}), {right})"
+
+    def literal(self, expr: LiteralExpr) -> str:
+        if expr.literal is None:
+            return "_fail(_ParserError('Could not evaluate None'))"
+        return repr(expr.literal)
+
+    def identifier(self, expr: IdentifierExpr) -> str:
+        if expr.identifier is None:
+            return "_fail(_ParserError('Could not evaluate None'))"
+        return self.load(expr.identifier, expr.slot, expr.depth)
+
+    def grouping(self, expr: GroupingExpr) -> str:
+        if expr.expr is None:
+            return "_fail(_ParserError('Could not evaluate None.'))"
+        return self.expr(expr.expr)
+
+    def load(self, name: str, slot: Optional[int], depth: Optional[int]) -> str:
+        if slot is None:
+            return global_name(name)
+        return self.local_name(depth, slot)
+
+
+_STATEMENT_TRANSPILERS = {
+    BlockStatement: Transpiler.block_statement,
+    IfStatement: Transpiler.if_statement,
+    WhileStatement: Transpiler.while_statement,
+    BreakStatement: Transpiler.break_statement,
+    ContinueStatement: Transpiler.continue_statement,
+    PrintStatement: Transpiler.print_statement,
+    ExpressionStatement: Transpiler.expression_statement,
+    FunctionStatement: Transpiler.function_declaration,
+    ReturnStatement: Transpiler.return_statement,
+    VariableStatement: Transpiler.variable,
+}
+
+_EXPR_TRANSPILERS = {
+    ArrayExpr: Transpiler.array,
+    ArrayIndexExpr: Transpiler.array_index,
+    AssignExpr: Transpiler.assign,
+    CallExpr: Transpiler.call,
+    LogicExpr: Transpiler.logic,
+    BinaryExpr: Transpiler.binary,
+    UnaryExpr: Transpiler.unary,
+    LiteralExpr: Transpiler.literal,
+    IdentifierExpr: Transpiler.identifier,
+    GroupingExpr: Transpiler.grouping,
+}
+
+
+class CodeCache(FileCache):
+    """
+    Caches the compiled code objects of transpiled programs
+    """
+    name = "code cache"
+    suffix = ".py.tic"
+
+    def key(self, source: str) -> str:
+        return f"{cache_key(source)}:{TRANSPILER_VERSION}"
+
+    def load(self, source_path: str, source: str) -> Optional[CodeType]:
+        code = self.read(source_path, source)
+        if code is None:
+            return None
+        if not isinstance(code, CodeType):
+            self.misses += 1
+            self.corrupt += 1
+            return None
+        self.hits += 1
+        return code
+
+
+class PythonEngine:
+    """
+    Executes statements by transpiling them to python and running the compiled code. The global variables are written
+    back into the environment, so the results can be read from the same store as with the other engines.
+    """
+
+    def __init__(self, environment: Environment, cache: Optional[CodeCache] = None, source_path: Optional[str] = None,
+                 source: Optional[str] = None):
+        """
+        :param cache: the cache of the code object, it is used if the source of the program is given
+        """
+        self.environment = environment
+        self.cache = cache
+        self.source_path = source_path
+        self.source = source
+        self.namespace: Dict[str, Any] = dict(HELPERS)
+
+    def transpile(self, statements: List[Statement]) -> str:
+        return Transpiler(self.environment).transpile(statements)
+
+    def compile(self, statements: List[Statement]) -> CodeType:
+        use_cache = self.cache is not None and self.source is not None
+        if use_cache:
+            code = self.cache.load(self.source_path, self.source)
+            if code is not None:
+                return code
+        code = compile(self.transpile(statements), self.source_path or "<titanite>", "exec")
+        if use_cache:
+            self.cache.write(self.source_path, self.source, code)
+        return code
+
+    def interpret(self, statements: List[Statement]) -> Dict[str, Any]:
+        self.run(self.compile(statements))
+        return self.environment.evaluated_store
+
+    def run(self, code: CodeType):
+        namespace = self.namespace
+        store = self.environment.store
+        for name, (_, value) in store.items():
+            if isinstance(value, NativeFunctionStatement):
+                namespace[global_name(name)] = _native(value, self.environment)
+            elif not isinstance(value, FunctionStatement):
+                namespace[global_name(name)] = value
+        try:
+            exec(code, namespace)
+        except NameError as e:
+            if e.name is not None and e.name.startswith(GLOBAL_PREFIX):
+                raise RuntimeError(f"Undefined variable {e.name[len(GLOBAL_PREFIX):]}.") from e
+            raise
+        finally:
+            for name, value in namespace.items():
+                if name.startswith(GLOBAL_PREFIX) and not isinstance(value, FunctionType):
+                    name = name[len(GLOBAL_PREFIX):]
+                    store[name] = (convert_value_to_static_type(value), value)
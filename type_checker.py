@@ -0,0 +1,426 @@
+from typing import Dict, List, Optional
+
+from classes import Environment, Statement, Expr, StaticType, BlockStatement, IfStatement, WhileStatement, \
+    PrintStatement, ExpressionStatement, FunctionStatement, ReturnStatement, VariableStatement, ArrayExpr, \
+    ArrayIndexExpr, AssignExpr, CallExpr, LogicExpr, BinaryExpr, UnaryExpr, LiteralExpr, IdentifierExpr, GroupingExpr, \
+    NativeFunctionStatement, BreakStatement, ContinueStatement, convert_token_type_to_static_type
+from errors import TypeCheckError
+from lexer import TokenType
+
+# the types which can be used in arithmetic, booleans are integers in python
+NUMBER_TYPES = {StaticType.INT, StaticType.DOUBLE, StaticType.BOOLEAN}
+# the types whose values are ordered
+ORDERED_TYPES = [NUMBER_TYPES, {StaticType.STRING}, {StaticType.LIST}]
+
+ARITHMETIC_OPERATORS = {TokenType.PLUS, TokenType.MINUS, TokenType.MUL, TokenType.DIV}
+ORDER_OPERATORS = {TokenType.GREATER, TokenType.GREATER_EQUALS, TokenType.LESSER, TokenType.LESSER_EQUALS}
+EQUALITY_OPERATORS = {TokenType.EQUALS, TokenType.NOT_EQUALS}
+
+# Types are StaticTypes, StaticType.ANY if the type is not known statically. While the return types of the functions
+# are inferred, None is the type of expressions which depend on a return type which was not inferred yet.
+Type = Optional[StaticType]
+
+
+def join(first: Type, second: Type) -> Type:
+    """
+    The type of a value which has one of the two types
+    """
+    if first is None:
+        return second
+    if second is None or first == second:
+        return first
+    return StaticType.ANY
+
+
+def value_type(value) -> StaticType:
+    if isinstance(value, bool):
+        return StaticType.BOOLEAN
+    if isinstance(value, int):
+        return StaticType.INT
+    if isinstance(value, float):
+        return StaticType.DOUBLE
+    if isinstance(value, str):
+        return StaticType.STRING
+    return StaticType.ANY
+
+
+def always_returns(statements: List[Statement]) -> bool:
+    """
+    If the statements return on every path
+    """
+    for statement in statements:
+        if isinstance(statement, ReturnStatement):
+            return True
+        if isinstance(statement, BlockStatement) and always_returns(statement.block):
+            return True
+        if isinstance(statement, IfStatement) and statement.else_branch is not None \
+                and always_returns(statement.if_branch.block) and always_returns(statement.else_branch.block) \
+                and all(always_returns(branch.block) for _, branch in statement.elif_branches):
+            return True
+    return False
+
+
+class TypeChecker:
+    """
+    Checks the types of the resolved statements before they are executed and reports all type errors at once.
+
+    The types of the expressions are inferred from the declared types of the variables and parameters, the signatures
+    of the native functions and the inferred return types of the functions. The nodes whose runtime checks are
+    redundant are marked as verified, the engines skip these checks:
+    - declarations and assignments of values which always have the type of the variable
+    - while loops whose condition is always a boolean
+    - calls of functions with the declared number of arguments
+    - functions which are only called directly with arguments of the parameter types
+    """
+
+    def __init__(self, environment: Environment):
+        """
+        :param environment: the global environment with the functions and native functions
+        """
+        self.environment = environment
+        self.functions: List[FunctionStatement] = [value for _, value in environment.store.values()
+                                                   if isinstance(value, FunctionStatement)]
+        self.return_types: Dict[FunctionStatement, Type] = {}
+        # the functions which are only called directly with arguments of the parameter types
+        self.verified_functions: Dict[FunctionStatement, bool] = {}
+        # the functions which are only called directly with arguments of the parameter types in the checked pass
+        self.calls: Dict[FunctionStatement, bool] = {}
+        self.global_types: Dict[str, StaticType] = {}
+        self.scopes: List[Dict[str, StaticType]] = []
+        # the return type of the checked function
+        self.return_type: Type = None
+        self.reporting = False
+        self.errors: List[str] = []
+
+    def check(self, statements: List[Statement]) -> List[Statement]:
+        """
+        :raises: TypeCheckError with all type errors of the program
+        """
+        # the return types and verified functions are inferred until they don't change anymore
+        self.verified_functions = {function: True for function in self.functions}
+        while True:
+            state = dict(self.return_types), dict(self.verified_functions)
+            self.check_program(statements)
+            if state == (self.return_types, self.verified_functions):
+                break
+        self.reporting = True
+        self.check_program(statements)
+        if self.errors:
+            raise TypeCheckError(self.errors)
+        for function in self.functions:
+            function.verified = self.verified_functions[function]
+        return statements
+
+    def check_program(self, statements: List[Statement]):
+        self.global_types = {name: static_type for name, (static_type, value) in self.environment.store.items()
+                             if isinstance(value, (FunctionStatement, NativeFunctionStatement))}
+        all_global_types = dict(self.global_types)
+        for statement in statements:
+            if isinstance(statement, VariableStatement):
+                all_global_types[statement.name] = convert_token_type_to_static_type(statement.var_type)
+        self.calls = {function: True for function in self.functions}
+        # the top level statements only see the global variables which were declared before
+        self.scopes = []
+        self.check_statements(statements)
+        # the functions can be called after all global variables are declared
+        top_level_types = self.global_types
+        self.global_types = all_global_types
+        for function in self.functions:
+            self.check_function(function)
+        self.global_types = top_level_types
+        for function in self.functions:
+            self.verified_functions[function] = self.verified_functions[function] and self.calls[function]
+
+    def error(self, message: str):
+        if self.reporting:
+            self.errors.append(message)
+
+    def unverify(self, function: FunctionStatement):
+        self.calls[function] = False
+
+    def lookup(self, name: str) -> Optional[StaticType]:
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        return self.global_types.get(name)
+
+    def declare(self, name: str, static_type: StaticType):
+        if self.scopes:
+            self.scopes[-1][name] = static_type
+        else:
+            self.global_types[name] = static_type
+
+    def check_assignable(self, node, name: str, static_type: StaticType, assigned_type: Type, message: str):
+        """
+        Marks the node as verified if the assigned value always has the type of the variable
+        """
+        node.verified = False
+        if assigned_type is None or assigned_type == StaticType.ANY:
+            return
+        if assigned_type == static_type:
+            node.verified = self.reporting
+        else:
+            self.error(message)
+
+    ##########################################################################
+    # Statements
+    ##########################################################################
+
+    def check_statements(self, statements: List[Statement]):
+        for statement in statements:
+            if statement is not None:
+                _STATEMENT_CHECKERS[type(statement)](self, statement)
+
+    def check_block(self, block: BlockStatement):
+        self.scopes.append({})
+        self.check_statements(block.block)
+        self.scopes.pop()
+
+    def check_if(self, statement: IfStatement):
+        # the branches are chosen by the truthiness of the condition, it can have any type
+        self.check_expr(statement.cond)
+        self.check_block(statement.if_branch)
+        for condition, branch in statement.elif_branches:
+            self.check_expr(condition)
+            self.check_block(branch)
+        if statement.else_branch is not None:
+            self.check_block(statement.else_branch)
+
+    def check_while(self, statement: WhileStatement):
+        condition_type = self.check_expr(statement.cond)
+        statement.verified = self.reporting and condition_type == StaticType.BOOLEAN
+        if condition_type not in (None, StaticType.ANY, StaticType.BOOLEAN):
+            self.error(f"Expected a boolean as condition of the while loop, got {condition_type}.")
+        self.check_block(statement.while_body)
+
+    def check_jump(self, statement: Statement):
+        # break and continue have no expressions
+        pass
+
+    def check_expression_statement(self, statement):
+        self.check_expr(statement.expr)
+
+    def check_function_declaration(self, function: FunctionStatement):
+        # the bodies of the functions are checked after the top level statements
+        pass
+
+    def check_function(self, function: FunctionStatement):
+        verified = self.verified_functions[function]
+        scope = {}
+        for parameter_type, name in function.parameters:
+            static_type = convert_token_type_to_static_type(parameter_type)
+            # integer parameters also accept booleans if the arguments are not verified
+            if not verified and static_type == StaticType.INT:
+                static_type = StaticType.ANY
+            scope[name.value] = static_type
+        enclosing_scopes, enclosing_return_type = self.scopes, self.return_type
+        self.scopes, self.return_type = [scope], None
+        self.check_statements(function.body.block)
+        if not always_returns(function.body.block):
+            # the function returns None at the end of the body
+            self.return_type = StaticType.ANY
+        self.return_types[function] = join(self.return_types.get(function), self.return_type)
+        self.scopes, self.return_type = enclosing_scopes, enclosing_return_type
+
+    def check_return(self, statement: ReturnStatement):
+        if statement.expr is None:
+            self.return_type = StaticType.ANY
+            return
+        self.return_type = join(self.return_type, self.check_expr(statement.expr))
+
+    def check_variable(self, statement: VariableStatement):
+        expr_type = self.check_expr(statement.expr)
+        static_type = convert_token_type_to_static_type(statement.var_type)
+        self.check_assignable(statement, statement.name, static_type, expr_type,
+                              f"Cannot assign {expr_type} to type {static_type} (name: {statement.name})")
+        self.declare(statement.name, static_type)
+
+    ##########################################################################
+    # Expressions
+    ##########################################################################
+
+    def check_expr(self, expr: Expr) -> Type:
+        return _EXPR_CHECKERS[type(expr)](self, expr)
+
+    def check_array(self, expr: ArrayExpr) -> Type:
+        for element in expr.expressions:
+            self.check_expr(element)
+        return StaticType.LIST
+
+    def check_array_index(self, expr: ArrayIndexExpr) -> Type:
+        index_type = self.check_expr(expr.index_expr)
+        if index_type not in (None, StaticType.ANY, StaticType.INT, StaticType.BOOLEAN):
+            self.error(f"Expected an integer as index of {expr.identifier}, got {index_type}.")
+        array_type = self.check_identifier_name(expr.identifier)
+        if array_type not in (None, StaticType.ANY, StaticType.LIST):
+            self.error(f"Expected a list, got {expr.identifier} of type {array_type}.")
+        # the elements of lists are not typed
+        return StaticType.ANY
+
+    def check_assign(self, expr: AssignExpr) -> Type:
+        value_type = self.check_expr(expr.value)
+        static_type = self.lookup(expr.name)
+        if static_type is None:
+            self.error(f"Undefined variable {expr.name}.")
+            expr.verified = False
+            return value_type
+        self.check_assignable(expr, expr.name, static_type, value_type,
+                              f"Incompatible type of {expr.name} (of type {static_type}) and value of type "
+                              f"{value_type}")
+        return value_type
+
+    def check_call(self, expr: CallExpr) -> Type:
+        argument_types = [self.check_expr(argument) for argument in expr.arguments]
+        expr.verified = False
+        callee = expr.callee_name
+        if not isinstance(callee, IdentifierExpr) or callee.slot is not None:
+            self.check_expr(callee)
+            return StaticType.ANY
+        entry = self.environment.store.get(callee.identifier)
+        function = None if entry is None else entry[1]
+        if isinstance(function, FunctionStatement):
+            return self.check_function_call(expr, function, argument_types)
+        if isinstance(function, NativeFunctionStatement):
+            return self.check_native_call(expr, function, argument_types)
+        callee_type = self.check_expr(callee)
+        if callee_type not in (None, StaticType.ANY, StaticType.FUNCTION):
+            self.error(f"Cannot call {callee.identifier} of type {callee_type}.")
+        return StaticType.ANY
+
+    def check_arity(self, expr: CallExpr, function) -> bool:
+        if len(expr.arguments) != function.arity:
+            self.error(f"Expected {function.arity} arguments, got {len(expr.arguments)} arguments "
+                       f"(function: {function.name}).")
+            return False
+        expr.verified = self.reporting
+        return True
+
+    def check_function_call(self, expr: CallExpr, function: FunctionStatement, argument_types: List[Type]) -> Type:
+        if not self.check_arity(expr, function):
+            self.unverify(function)
+            return StaticType.ANY
+        for (parameter_type, name), argument_type in zip(function.parameters, argument_types):
+            static_type = convert_token_type_to_static_type(parameter_type)
+            if argument_type is None:
+                continue
+            if argument_type != static_type:
+                self.unverify(function)
+            if argument_type == StaticType.ANY \
+                    or (static_type == StaticType.INT and argument_type == StaticType.BOOLEAN):
+                continue
+            if argument_type != static_type:
+                self.error(f"Expected {static_type} for the parameter {name.value} of {function.name}, got "
+                           f"{argument_type}.")
+        return self.return_types.get(function)
+
+    def check_native_call(self, expr: CallExpr, function: NativeFunctionStatement,
+                          argument_types: List[Type]) -> Type:
+        if not self.check_arity(expr, function):
+            return StaticType.ANY
+        if function.parameter_types is not None:
+            for static_type, argument_type in zip(function.parameter_types, argument_types):
+                if argument_type in (None, StaticType.ANY, static_type) \
+                        or (static_type == StaticType.INT and argument_type == StaticType.BOOLEAN):
+                    continue
+                self.error(f"Expected {static_type} for the arguments of {function.name}, got {argument_type}.")
+        return function.return_type
+
+    def check_logic(self, expr: LogicExpr) -> Type:
+        left_type = self.check_expr(expr.expr)
+        right_type = self.check_expr(expr.right)
+        if left_type not in (None, StaticType.ANY, StaticType.BOOLEAN):
+            self.error(f"Expected a boolean type for logic operators, got {left_type}.")
+        # the result is either the left boolean or the right value
+        return join(StaticType.BOOLEAN, right_type)
+
+    def check_binary(self, expr: BinaryExpr) -> Type:
+        left_type = self.check_expr(expr.expr)
+        right_type = self.check_expr(expr.right)
+        operator = expr.operator
+        if operator in EQUALITY_OPERATORS:
+            return StaticType.BOOLEAN
+        if operator in ORDER_OPERATORS:
+            # the values of different types can't be compared, otherwise the result is a boolean
+            if StaticType.ANY not in (left_type, right_type) and None not in (left_type, right_type) \
+                    and not any(left_type in types and right_type in types for types in ORDERED_TYPES):
+                self.error(f"Cannot compare {left_type} and {right_type}.")
+            return StaticType.BOOLEAN
+        if left_type is None or right_type is None:
+            return None
+        if operator not in ARITHMETIC_OPERATORS or StaticType.ANY in (left_type, right_type):
+            return StaticType.ANY
+        if left_type in NUMBER_TYPES and right_type in NUMBER_TYPES:
+            if operator == TokenType.DIV or StaticType.DOUBLE in (left_type, right_type):
+                return StaticType.DOUBLE
+            return StaticType.INT
+        if operator == TokenType.PLUS and left_type == right_type and left_type in (StaticType.STRING, StaticType.LIST):
+            return left_type
+        if operator == TokenType.MUL:
+            # repeated strings and lists
+            for sequence_type, count_type in [(left_type, right_type), (right_type, left_type)]:
+                if sequence_type in (StaticType.STRING, StaticType.LIST) \
+                        and count_type in (StaticType.INT, StaticType.BOOLEAN):
+                    return sequence_type
+        self.error(f"Unsupported operand types for {operator.value}: {left_type} and {right_type}.")
+        return StaticType.ANY
+
+    def check_unary(self, expr: UnaryExpr) -> Type:
+        right_type = self.check_expr(expr.right)
+        if expr.operator == TokenType.NOT:
+            return StaticType.BOOLEAN
+        if right_type is None or right_type == StaticType.ANY:
+            return right_type
+        if expr.operator == TokenType.MINUS and right_type in NUMBER_TYPES:
+            return StaticType.DOUBLE if right_type == StaticType.DOUBLE else StaticType.INT
+        self.error(f"Cannot negate a non number of type {right_type}.")
+        return StaticType.ANY
+
+    def check_literal(self, expr: LiteralExpr) -> Type:
+        return value_type(expr.literal)
+
+    def check_identifier(self, expr: IdentifierExpr) -> Type:
+        if expr.slot is None:
+            entry = self.environment.store.get(expr.identifier)
+            if entry is not None and isinstance(entry[1], FunctionStatement):
+                # the function can be called indirectly with any arguments
+                self.unverify(entry[1])
+        return self.check_identifier_name(expr.identifier)
+
+    def check_identifier_name(self, name: str) -> Type:
+        static_type = self.lookup(name)
+        if static_type is None:
+            self.error(f"Undefined variable {name}.")
+            return StaticType.ANY
+        if static_type == StaticType.NATIVE_FUNCTION:
+            return StaticType.FUNCTION
+        return static_type
+
+    def check_grouping(self, expr: GroupingExpr) -> Type:
+        return self.check_expr(expr.expr)
+
+
+_STATEMENT_CHECKERS = {
+    BlockStatement: TypeChecker.check_block,
+    IfStatement: TypeChecker.check_if,
+    WhileStatement: TypeChecker.check_while,
+    BreakStatement: TypeChecker.check_jump,
+    ContinueStatement: TypeChecker.check_jump,
+    PrintStatement: TypeChecker.check_expression_statement,
+    ExpressionStatement: TypeChecker.check_expression_statement,
+    FunctionStatement: TypeChecker.check_function_declaration,
+    ReturnStatement: TypeChecker.check_return,
+    VariableStatement: TypeChecker.check_variable,
+}
+
+_EXPR_CHECKERS = {
+    ArrayExpr: TypeChecker.check_array,
+    ArrayIndexExpr: TypeChecker.check_array_index,
+    AssignExpr: TypeChecker.check_assign,
+    CallExpr: TypeChecker.check_call,
+    LogicExpr: TypeChecker.check_logic,
+    BinaryExpr: TypeChecker.check_binary,
+    UnaryExpr: TypeChecker.check_unary,
+    LiteralExpr: TypeChecker.check_literal,
+    IdentifierExpr: TypeChecker.check_identifier,
+    GroupingExpr: TypeChecker.check_grouping,
+}
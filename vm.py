@@ -0,0 +1,254 @@
+from typing import Any, Dict, List
+
+from bytecode import Code, Compiler, BINARY_OPERATORS, LOAD_CONST, LOAD_LOCAL, LOAD_GLOBAL, DECLARE_LOCAL, \
+    DECLARE_GLOBAL, ASSIGN_LOCAL, ASSIGN_GLOBAL, BINARY, NEGATE, NOT, INDEX, BUILD_LIST, CALL, POP, PRINT, JUMP, \
+    POP_JUMP_IF_FALSE, POP_JUMP_IF_NOT_TRUE, JUMP_IF_FALSE_OR_POP, JUMP_IF_TRUE_OR_POP, RETURN, RETURN_FROM_SCRIPT, \
+    RAISE, BINARY_CONST, STORE_LOCAL, TAIL_CALL
+from classes import Environment, Statement, Expr, FunctionStatement, StaticType, check_correct_type, \
+    check_declared_type, check_assigned_type
+from errors import ParserError, ReturnError
+
+# the static types of the values, values of other types are checked by the functions of classes.py
+STATIC_TYPES = {
+    bool: StaticType.BOOLEAN,
+    int: StaticType.INT,
+    float: StaticType.DOUBLE,
+    str: StaticType.STRING,
+    list: StaticType.LIST,
+}
+
+# the default maximum number of nested function calls
+DEFAULT_MAX_DEPTH = 100000
+
+
+class VirtualMachine:
+    """
+    Executes statements by compiling them to bytecode and running it on a stack machine. Global variables are stored
+    in the environment like the tree walker does it, so the results can be read from the same store.
+
+    The vm is stackless: calls of Titanite functions push the state of the caller onto a call stack of the vm instead
+    of the python stack, so the recursion depth is only limited by max_depth.
+    """
+
+    def __init__(self, environment: Environment, max_depth: int = DEFAULT_MAX_DEPTH):
+        """
+        :param max_depth: the maximum number of nested function calls, deeper calls raise a RuntimeError
+        """
+        self.environment = environment
+        self.max_depth = max_depth
+        self.compiler = Compiler()
+        # the code of every function which was called already
+        self.function_codes: Dict[FunctionStatement, Code] = {}
+
+    def interpret(self, statements: List[Statement]) -> Dict[str, Any]:
+        code = self.compiler.compile_script(statements)
+        self.run(code, [None] * code.local_count)
+        return self.environment.evaluated_store
+
+    def evaluate(self, expr: Expr):
+        """
+        Evaluates a single expression, like Evaluator does it
+        """
+        code = self.compiler.compile_expression(expr)
+        return self.run(code, [None] * code.local_count)
+
+    def call_function(self, function: FunctionStatement, arguments: List[Any]):
+        code, frame = self.enter_function(function, arguments)
+        return self.run(code, frame)
+
+    def enter_function(self, function: FunctionStatement, arguments: List[Any]):
+        """
+        :return: the code of the function and its locals with the arguments
+        """
+        code = self.function_codes.get(function)
+        if code is None:
+            code = self.function_codes[function] = self.compiler.compile_function(function)
+        frame = [None] * code.local_count
+        for slot, ((arg_type, _), arg_value) in enumerate(zip(function.parameters, arguments)):
+            check_correct_type(arg_type, arg_value)
+            frame[slot] = arg_value
+        return code, frame
+
+    def run(self, code: Code, frame: List[Any]):
+        """
+        The dispatch loop, it runs the code until it returns. Called functions run in the same loop.
+
+        :param frame: the local variables
+        :return: the return value of the code
+        """
+        instructions = code.instructions
+        constants = code.constants
+        environment = self.environment
+        global_store = environment.environment
+        max_depth = self.max_depth
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+        # the instructions, constants, locals, stack and the next instruction of the callers
+        call_stack = []
+        while True:
+            opcode, argument = instructions[pc]
+            pc += 1
+            # the most frequent instructions come first
+            if opcode == LOAD_LOCAL:
+                push(frame[argument])
+            elif opcode == BINARY_CONST:
+                operator_function, right = constants[argument]
+                stack[-1] = operator_function(stack[-1], right)
+            elif opcode == LOAD_GLOBAL:
+                try:
+                    push(global_store[constants[argument]][1])
+                except KeyError:
+                    push(environment.get_variable_value(constants[argument]))
+            elif opcode == LOAD_CONST:
+                push(constants[argument])
+            elif opcode == BINARY:
+                right = pop()
+                stack[-1] = BINARY_OPERATORS[argument](stack[-1], right)
+            elif opcode == POP_JUMP_IF_NOT_TRUE:
+                value = pop()
+                if value is False:
+                    pc = argument
+                elif value is not True:
+                    raise RuntimeError("Expected a boolean.")
+            elif opcode == POP_JUMP_IF_FALSE:
+                if not pop():
+                    pc = argument
+            elif opcode == JUMP:
+                pc = argument
+            elif opcode == STORE_LOCAL:
+                slot, static_type = constants[argument]
+                value = pop()
+                if STATIC_TYPES.get(type(value)) is not static_type:
+                    check_assigned_type(value, static_type)
+                frame[slot] = value
+            elif opcode == ASSIGN_LOCAL:
+                slot, static_type = constants[argument]
+                value = stack[-1]
+                if STATIC_TYPES.get(type(value)) is not static_type:
+                    check_assigned_type(value, static_type)
+                frame[slot] = value
+            elif opcode == ASSIGN_GLOBAL:
+                name = constants[argument]
+                value = stack[-1]
+                entry = global_store.get(name)
+                if entry is not None and STATIC_TYPES.get(type(value)) is entry[0]:
+                    global_store[name] = (entry[0], value)
+                else:
+                    environment.assign_variable(name, value)
+            elif opcode == POP:
+                pop()
+            elif opcode == CALL:
+                if argument:
+                    arguments = stack[-argument:]
+                    del stack[-argument:]
+                else:
+                    arguments = []
+                function = pop()
+                if len(arguments) != function.arity:
+                    raise RuntimeError(f"Expected {function.arity} arguments, got {len(arguments)} arguments.")
+                if type(function) is not FunctionStatement:
+                    push(function.call(arguments=arguments, env=environment))
+                    continue
+                if len(call_stack) >= max_depth:
+                    raise RuntimeError(f"Maximum recursion depth of {max_depth} calls exceeded in {function.name}.")
+                call_stack.append((instructions, constants, frame, stack, pc))
+                code, frame = self.enter_function(function, arguments)
+                instructions = code.instructions
+                constants = code.constants
+                stack = []
+                push = stack.append
+                pop = stack.pop
+                pc = 0
+            elif opcode == RETURN:
+                if not call_stack:
+                    return pop()
+                value = pop()
+                instructions, constants, frame, stack, pc = call_stack.pop()
+                push = stack.append
+                pop = stack.pop
+                push(value)
+            elif opcode == TAIL_CALL:
+                if argument:
+                    arguments = stack[-argument:]
+                    del stack[-argument:]
+                else:
+                    arguments = []
+                function = pop()
+                if len(arguments) != function.arity:
+                    raise RuntimeError(f"Expected {function.arity} arguments, got {len(arguments)} arguments.")
+                if type(function) is not FunctionStatement:
+                    value = function.call(arguments=arguments, env=environment)
+                    if not call_stack:
+                        return value
+                    instructions, constants, frame, stack, pc = call_stack.pop()
+                    push = stack.append
+                    pop = stack.pop
+                    push(value)
+                    continue
+                # the called function continues in place of the running one
+                code, frame = self.enter_function(function, arguments)
+                instructions = code.instructions
+                constants = code.constants
+                stack.clear()
+                pc = 0
+            elif opcode == DECLARE_LOCAL:
+                slot, name, static_type = constants[argument]
+                value = pop()
+                if STATIC_TYPES.get(type(value)) is not static_type:
+                    check_declared_type(name, value, static_type)
+                frame[slot] = value
+            elif opcode == INDEX:
+                array = pop()
+                index = stack[-1]
+                if not isinstance(index, int):
+                    raise ParserError(f"Expected an integer got {type(index)} ({index})")
+                if not isinstance(array, list):
+                    raise ParserError(f"Expected a list got {type(array)} ({array})")
+                try:
+                    stack[-1] = array[index]
+                except IndexError:
+                    raise RuntimeError(f"Index out of bounds for {constants[argument]}. Got {index} but max length "
+                                       f"is {len(array)}")
+            elif opcode == JUMP_IF_FALSE_OR_POP:
+                value = stack[-1]
+                if not isinstance(value, bool):
+                    raise RuntimeError("Expected a boolean type for logic operators.")
+                if value:
+                    pop()
+                else:
+                    pc = argument
+            elif opcode == JUMP_IF_TRUE_OR_POP:
+                value = stack[-1]
+                if not isinstance(value, bool):
+                    raise RuntimeError("Expected a boolean type for logic operators.")
+                if value:
+                    pc = argument
+                else:
+                    pop()
+            elif opcode == NOT:
+                stack[-1] = not stack[-1]
+            elif opcode == NEGATE:
+                value = stack[-1]
+                if not isinstance(value, (int, float)):
+                    raise ParserError(f"Cannot negate a non number: {value}")
+                stack[-1] = -value
+            elif opcode == DECLARE_GLOBAL:
+                name, var_type = constants[argument]
+                environment.declare_variable(name, pop(), var_type)
+            elif opcode == BUILD_LIST:
+                if argument:
+                    values = stack[-argument:]
+                    del stack[-argument:]
+                else:
+                    values = []
+                push(values)
+            elif opcode == PRINT:
+                print(pop())
+            elif opcode == RETURN_FROM_SCRIPT:
+                raise ReturnError(pop())
+            elif opcode == RAISE:
+                raise constants[argument]
+            else:
+                raise RuntimeError(f"Unknown opcode {opcode}")